@@ -1,4 +1,4 @@
-import React, { useState, useRef } from 'react';
+import React, { useState, useRef, useEffect } from 'react';
 import { Play, Download, Wand2, Upload, Video, Image as ImageIcon, Loader2 } from 'lucide-react';
 import { toast } from 'sonner';
 
@@ -17,6 +17,13 @@ export const VideoStudioLayout: React.FC = () => {
 
     const fileInputRef = useRef<HTMLInputElement>(null);
 
+    // Release the previous video's object URL when it is replaced
+    useEffect(() => {
+        return () => {
+            if (generatedVideo) URL.revokeObjectURL(generatedVideo);
+        };
+    }, [generatedVideo]);
+
     const handleImageUpload = (e: React.ChangeEvent<HTMLInputElement>) => {
         const file = e.target.files?.[0];
         if (file) {
@@ -47,6 +54,7 @@ export const VideoStudioLayout: React.FC = () => {
             formData.append('prompt', prompt || (activeTab === 'image' ? "Animate this image" : "")); // Default prompt for image if empty
             formData.append('width', width.toString());
             formData.append('height', height.toString());
+            formData.append('response_format', 'binary');
             console.log("Generating with params:", { prompt, width, height, activeTab });
 
             let response;
@@ -54,7 +62,7 @@ export const VideoStudioLayout: React.FC = () => {
                 response = await fetch('http://localhost:8002/generate', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ prompt, width, height }),
+                    body: JSON.stringify({ prompt, width, height, response_format: 'binary' }),
                 });
             } else {
                 if (imageFile) {
@@ -71,11 +79,9 @@ export const VideoStudioLayout: React.FC = () => {
                 throw new Error(errorText || 'Generation failed');
             }
 
-            const data = await response.json();
-            if (data.video) {
-                setGeneratedVideo(`data:video/mp4;base64,${data.video}`);
-                toast.success('Video generated successfully!');
-            }
+            const video = await response.blob();
+            setGeneratedVideo(URL.createObjectURL(video));
+            toast.success('Video generated successfully!');
         } catch (error) {
             console.error('Generation error:', error);
             toast.error('Failed to generate video. Ensure video service is running.');
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import zipfile
+
+from fastapi import HTTPException, UploadFile
+
+from uploads import bucket_size, displayed_size, read_upload
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff")
+
+
+class BatchItem:
+    """
+    One input of a batch edit: raw bytes plus what is needed to schedule it.
+    `digest` is the sha256 of `contents` when the reader already computed it.
+    """
+
+    def __init__(self, index: int, filename: str, contents: bytes, digest: str = None):
+        self.index = index
+        self.filename = filename
+        self.contents = contents
+        self.digest = digest or hashlib.sha256(contents).hexdigest()
+        self.bucket = None
+        self.error = None
+        try:
+            self.bucket = bucket_size(*displayed_size(contents))
+        except Exception as e:
+            # Reported per item when the batch runs; the rest of the batch continues
+            self.error = f"Unreadable image: {e}"
+
+
+async def collect_batch_items(files, archive: UploadFile, max_items: int, max_item_bytes: int, max_total_bytes: int):
+    """
+    Read all batch inputs up front (uploads are closed once the endpoint returns,
+    before a streaming body runs). Zip archives are read member by member from the
+    spooled upload, so only image members count against the limits.
+    """
+    items = []
+    total = 0
+
+    def add(filename, contents, digest=None):
+        nonlocal total
+        if len(items) >= max_items:
+            raise HTTPException(status_code=413, detail=f"Batch exceeds {max_items} images.")
+        total += len(contents)
+        if total > max_total_bytes:
+            raise HTTPException(status_code=413, detail="Batch exceeds the total upload size limit.")
+        items.append(BatchItem(len(items), filename, contents, digest))
+
+    for upload in files or []:
+        # read_upload hashes while reading; zip members are hashed in BatchItem
+        contents, digest = await read_upload(upload, max_item_bytes)
+        add(upload.filename, contents, digest)
+
+    if archive is not None:
+        try:
+            with zipfile.ZipFile(archive.file) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    if os.path.basename(info.filename).startswith("."):
+                        continue
+                    if info.file_size > max_item_bytes:
+                        raise HTTPException(status_code=413, detail=f"{info.filename} exceeds the per-image size limit.")
+                    add(info.filename, zf.read(info))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="archive is not a valid zip file.")
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No images in batch.")
+    return items
+
+
+def bucket_order(items):
+    """Order items so images of the same resolution bucket run back to back."""
+    return sorted(items, key=lambda item: (item.bucket or (0, 0), item.index))
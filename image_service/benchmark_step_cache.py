@@ -0,0 +1,87 @@
+"""
+Benchmark the step-caching acceleration presets against full computation.
+
+Runs the text-to-image pipeline once per preset for each prompt (same seed) and
+reports wall time, speedup over "off", the fraction of skipped transformer calls
+and image-difference metrics (mean absolute error and PSNR) against the "off" image.
+
+Usage (from the image_service directory):
+    python benchmark_step_cache.py --steps 50 --size 1024
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+import torch
+
+from config import settings
+from main import load_txt2img_pipe
+from residency import PipelineResidencyManager
+from step_cache import STEP_CACHE_PRESETS, step_cache
+
+PROMPTS = [
+    "A lighthouse on a rocky coast at sunset, oil painting",
+    "A minimalist flat illustration of a robot reading a book",
+    "Close-up photo of a bowl of ramen, studio lighting",
+]
+
+
+def image_metrics(reference, candidate):
+    ref = np.asarray(reference, dtype=np.float32)
+    cand = np.asarray(candidate, dtype=np.float32)
+    mse = float(np.mean((ref - cand) ** 2))
+    psnr = float("inf") if mse == 0 else 10 * math.log10(255.0 ** 2 / mse)
+    return float(np.mean(np.abs(ref - cand))), psnr
+
+
+def run(pipe, prompt, preset, args):
+    generator = torch.Generator(device=settings.DEVICE).manual_seed(args.seed)
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    with torch.inference_mode(), step_cache(pipe, preset, args.steps) as cache:
+        image = pipe(
+            prompt=prompt,
+            negative_prompt=" ",
+            width=args.size,
+            height=args.size,
+            num_inference_steps=args.steps,
+            true_cfg_scale=4.0,
+            generator=generator,
+        ).images[0]
+        skip_ratio = cache.stats()["skip_ratio"] if cache is not None else 0.0
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    return image, time.perf_counter() - start, skip_ratio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    manager = PipelineResidencyManager(settings.DEVICE, settings.OFFLOAD_MODE, settings.GPU_HEADROOM_BYTES)
+    manager.register("txt2img", load_txt2img_pipe)
+
+    print(f"{'preset':<10} {'time (s)':>9} {'speedup':>8} {'skipped':>8} {'MAE':>7} {'PSNR':>7}")
+    with manager.use("txt2img") as pipe:
+        for prompt in PROMPTS:
+            print(f"\n{prompt}")
+            reference, reference_time, _ = run(pipe, prompt, "off", args)
+            print(f"{'off':<10} {reference_time:>9.2f} {1.0:>8.2f} {0.0:>8.2f} {0.0:>7.2f} {'inf':>7}")
+            for preset in STEP_CACHE_PRESETS:
+                if preset == "off":
+                    continue
+                image, elapsed, skip_ratio = run(pipe, prompt, preset, args)
+                mae, psnr = image_metrics(reference, image)
+                print(
+                    f"{preset:<10} {elapsed:>9.2f} {reference_time / elapsed:>8.2f} "
+                    f"{skip_ratio:>8.2f} {mae:>7.2f} {psnr:>7.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
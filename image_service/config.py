@@ -1,4 +1,5 @@
 import os
+import json
 import torch
 
 class Settings:
@@ -11,10 +12,69 @@ class Settings:
     # Use bfloat16 if on CUDA, otherwise float32
     TORCH_DTYPE = torch.bfloat16 if DEVICE == "cuda" else torch.float32
 
+    # Pipeline residency: which pipelines to load at startup (others load on first
+    # use) and how to place the active one ("auto" picks from free device memory,
+    # or force "device", "model" or "sequential" offload)
+    PRELOAD_PIPELINES = [
+        name.strip() for name in os.environ.get("IMAGE_PRELOAD_PIPELINES", "txt2img").split(",") if name.strip()
+    ]
+    OFFLOAD_MODE = os.environ.get("IMAGE_OFFLOAD_MODE", "auto")
+    # Device memory kept free for activations when choosing the placement mode
+    GPU_HEADROOM_BYTES = int(float(os.environ.get("IMAGE_GPU_HEADROOM_GB", 6)) * 1024 ** 3)
+
+    # Default interval (in denoising steps) between live previews on the /stream endpoints
+    PREVIEW_EVERY_N_STEPS = int(os.environ.get("IMAGE_PREVIEW_EVERY_N_STEPS", 5))
+
+    # Step-caching preset used when a request does not pick one ("off" keeps full quality)
+    DEFAULT_ACCELERATION = os.environ.get("IMAGE_DEFAULT_ACCELERATION", "off")
+
+    # Requests with at least this many output pixels decode/encode through the VAE in
+    # overlapping tiles (TILE_SIZE px every TILE_STRIDE px) to bound peak memory
+    VAE_TILING_MIN_PIXELS = int(os.environ.get("IMAGE_VAE_TILING_MIN_PIXELS", 1536 * 1536))
+    VAE_TILE_SIZE = int(os.environ.get("IMAGE_VAE_TILE_SIZE", 512))
+    VAE_TILE_STRIDE = int(os.environ.get("IMAGE_VAE_TILE_STRIDE", 448))
+
+    # Default zlib level for PNG responses (0-9). Low levels are several times faster
+    # to encode at 1024x1024 for a slightly larger, still lossless payload.
+    PNG_COMPRESSION_LEVEL = int(os.environ.get("IMAGE_PNG_COMPRESSION_LEVEL", 1))
+
+    # /edit upload limits: raw upload size and decoded pixel count (decompression bombs)
+    MAX_UPLOAD_BYTES = int(os.environ.get("IMAGE_MAX_UPLOAD_MB", 25)) * 1024 * 1024
+    MAX_INPUT_PIXELS = int(os.environ.get("IMAGE_MAX_INPUT_PIXELS", 100_000_000))
+
+    # Region (mask / bbox) edits: largest canvas kept for blending back, context added
+    # around the region (fraction of its size, at least MIN_PADDING px) and seam feathering
+    REGION_CANVAS_MAX_PIXELS = int(os.environ.get("IMAGE_REGION_CANVAS_MAX_PIXELS", 4 * 1024 * 1024))
+    REGION_PADDING_RATIO = float(os.environ.get("IMAGE_REGION_PADDING_RATIO", 0.25))
+    REGION_MIN_PADDING = 64
+    REGION_FEATHER = 16
+
+    # /edit/batch limits
+    BATCH_MAX_ITEMS = int(os.environ.get("IMAGE_BATCH_MAX_ITEMS", 500))
+    BATCH_MAX_TOTAL_BYTES = int(os.environ.get("IMAGE_BATCH_MAX_TOTAL_MB", 1024)) * 1024 * 1024
+
+    # LoRA adapters registered at startup, as JSON:
+    # {"name": {"source": "<path or repo>", "weight_name": "...", "pipeline": "txt2img"}}
+    LORA_ADAPTERS = json.loads(os.environ.get("IMAGE_LORA_ADAPTERS", "{}"))
+    # Adapter state dicts kept in host RAM / injected per pipeline, and how many
+    # consecutive requests for the same single adapter trigger fusing it (0 disables)
+    LORA_MAX_HOST_ADAPTERS = int(os.environ.get("IMAGE_LORA_MAX_HOST_ADAPTERS", 8))
+    LORA_MAX_RESIDENT_ADAPTERS = int(os.environ.get("IMAGE_LORA_MAX_RESIDENT_ADAPTERS", 4))
+    LORA_FUSE_AFTER = int(os.environ.get("IMAGE_LORA_FUSE_AFTER", 3))
+    # Sources POST /adapters may load from: absolute local directories and Hugging
+    # Face repo ids ("owner/" allows all of an owner's repos). Empty disables
+    # registration at runtime; IMAGE_LORA_ADAPTERS is trusted as configured.
+    LORA_ALLOWED_SOURCES = [
+        entry.strip() for entry in os.environ.get("IMAGE_LORA_ALLOWED_SOURCES", "").split(",") if entry.strip()
+    ]
+
     # Server settings
     HOST = "0.0.0.0"
     PORT = int(os.environ.get("IMAGE_SERVICE_PORT", 8000))
 
+    # Number of (model, text) prompt embeddings kept by the LRU prompt cache
+    PROMPT_CACHE_SIZE = int(os.environ.get("IMAGE_PROMPT_CACHE_SIZE", 256))
+
     class Config:
         env_file = "../.env"
 
@@ -22,6 +82,10 @@ class Settings:
     # Output directory
     OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "outputs")
 
+    # Content-addressed result cache (lives under OUTPUT_DIR, 0 disables it)
+    RESULT_CACHE_DIR = os.path.join(OUTPUT_DIR, "cache")
+    RESULT_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_RESULT_CACHE_MAX_MB", 2048)) * 1024 * 1024
+
 settings = Settings()
 
 # Ensure output directory exists
@@ -0,0 +1,103 @@
+import numpy as np
+import torch
+import torch.nn.functional as F
+from diffusers.pipelines.qwenimage.pipeline_qwenimage import calculate_shift
+
+from step_cache import step_cache
+
+# Fast-draft presets for /generate. The draft pass denoises at `scale` times the
+# requested width/height with `step_fraction` of the steps; the latent is then
+# upscaled and re-noised to the last `refine_strength` of the full schedule, which
+# is run at the requested size. Cost is roughly
+#     scale^2 * step_fraction + refine_strength
+# of a full-resolution run ("draft" ~0.375, "fast_draft" ~0.24).
+RESOLUTION_MODES = {
+    "full": None,
+    "draft": {"scale": 0.5, "step_fraction": 0.5, "refine_strength": 0.25},
+    "fast_draft": {"scale": 0.5, "step_fraction": 0.35, "refine_strength": 0.15},
+}
+
+
+def snap(value: float, multiple: int = 16) -> int:
+    return max(multiple, int(round(value / multiple)) * multiple)
+
+
+def refine_sigmas(num_steps: int, strength: float):
+    """Tail of the default (unshifted) flow-matching schedule covering `strength` of it."""
+    sigmas = np.linspace(1.0, 1 / num_steps, num_steps)
+    start = min(num_steps - 1, int(round(num_steps * (1 - strength))))
+    return sigmas[start:]
+
+
+def upscale_packed_latents(pipe, latents, from_size, to_size):
+    """Unpack, bicubically upscale and re-pack Qwen-Image latents between output sizes."""
+    factor = pipe.vae_scale_factor
+    (from_width, from_height), (to_width, to_height) = from_size, to_size
+    latents = pipe._unpack_latents(latents, from_height, from_width, factor).squeeze(2)
+
+    target_height = 2 * (int(to_height) // (factor * 2))
+    target_width = 2 * (int(to_width) // (factor * 2))
+    upscaled = F.interpolate(
+        latents.float(), size=(target_height, target_width), mode="bicubic", align_corners=False
+    ).to(latents.dtype)
+    batch_size, channels = upscaled.shape[:2]
+    return pipe._pack_latents(upscaled, batch_size, channels, target_height, target_width)
+
+
+def draft_then_refine(pipe, mode: str, width: int, height: int, steps: int, generator,
+                      acceleration: str = "off", **call_kwargs):
+    """
+    Run the two-pass draft path of `mode` on a Qwen text-to-image pipeline.
+    Returns the pipeline output of the refinement pass and a metadata dict.
+    """
+    preset = RESOLUTION_MODES[mode]
+    draft_width = snap(width * preset["scale"])
+    draft_height = snap(height * preset["scale"])
+    draft_steps = max(1, round(steps * preset["step_fraction"]))
+
+    with step_cache(pipe, acceleration, draft_steps):
+        draft_latents = pipe(
+            **call_kwargs,
+            width=draft_width,
+            height=draft_height,
+            num_inference_steps=draft_steps,
+            generator=generator,
+            output_type="latent",
+        ).images
+
+    latents = upscale_packed_latents(pipe, draft_latents, (draft_width, draft_height), (width, height))
+
+    # Re-noise the upscaled latent to the first sigma of the refinement schedule. The
+    # scheduler applies the resolution-dependent shift, so ask it for the real value.
+    sigmas = refine_sigmas(steps, preset["refine_strength"])
+    scheduler_config = pipe.scheduler.config
+    mu = calculate_shift(
+        latents.shape[1],
+        scheduler_config.get("base_image_seq_len", 256),
+        scheduler_config.get("max_image_seq_len", 4096),
+        scheduler_config.get("base_shift", 0.5),
+        scheduler_config.get("max_shift", 1.15),
+    )
+    pipe.scheduler.set_timesteps(sigmas=sigmas, device=latents.device, mu=mu)
+    start_sigma = pipe.scheduler.sigmas[0].to(latents.device, latents.dtype)
+    noise = torch.randn(latents.shape, generator=generator, device=generator.device, dtype=latents.dtype)
+    latents = (1 - start_sigma) * latents + start_sigma * noise.to(latents.device)
+
+    with step_cache(pipe, acceleration, len(sigmas)):
+        output = pipe(
+            **call_kwargs,
+            width=width,
+            height=height,
+            num_inference_steps=len(sigmas),
+            sigmas=sigmas,
+            latents=latents,
+            generator=generator,
+        )
+
+    metadata = {
+        "resolution_mode": mode,
+        "draft_size": [draft_width, draft_height],
+        "draft_steps": draft_steps,
+        "refine_steps": len(sigmas),
+    }
+    return output, metadata
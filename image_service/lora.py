@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+
+def source_allowed(source: str, weight_name: str, allowed) -> bool:
+    """
+    Whether adapter weights may be loaded from `source`. Each `allowed` entry is
+    either a local directory (the source, and the weight file inside it, must
+    resolve under it) or a Hugging Face repo id, where "owner/" allows every
+    repo of that owner.
+    """
+    for entry in allowed:
+        if os.path.isabs(entry):
+            root = os.path.realpath(entry)
+            paths = [os.path.realpath(source)]
+            if weight_name:
+                paths.append(os.path.realpath(os.path.join(source, weight_name)))
+            if all(os.path.commonpath([root, path]) == root for path in paths):
+                return True
+        elif entry.endswith("/") and source.startswith(entry) and "/" not in source[len(entry):]:
+            return True
+        elif source == entry:
+            return True
+    return False
+
+
+class LoraAdapterRegistry:
+    """
+    Named LoRA adapters for the resident image pipelines.
+
+    Adapter weights are read once into a host-RAM LRU (`max_host_adapters` state
+    dicts) and injected into a pipeline's transformer the first time a request on
+    that pipeline asks for them; up to `max_resident_adapters` stay injected per
+    pipeline, the least recently used beyond that are deleted. Each request then only
+    switches adapters and scales with `set_adapters`, never reloading the base
+    model. A single adapter requested `fuse_after` times in a row at the same scale
+    is fused into the base weights, and unfused as soon as a request differs.
+    Re-registering a name bumps its version: pipelines still holding the old
+    weights (injected or fused) delete or unfuse them on their next activation.
+    """
+
+    def __init__(self, max_host_adapters: int = 8, max_resident_adapters: int = 4, fuse_after: int = 3):
+        self.max_host_adapters = max_host_adapters
+        self.max_resident_adapters = max_resident_adapters
+        self.fuse_after = fuse_after
+        self._specs = {}
+        self._versions = {}
+        self._state_dicts = OrderedDict()
+        # Per pipeline object, so a pipeline reloaded by the residency manager starts clean
+        self._pipe_state = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.host_loads = 0
+        self.injections = 0
+        self.evictions = 0
+        self.fuses = 0
+
+    def register(self, name: str, source: str, weight_name: str = None, pipeline: str = "txt2img"):
+        with self._lock:
+            self._specs[name] = {"source": source, "weight_name": weight_name, "pipeline": pipeline}
+            # Re-registering a name invalidates cached and injected weights
+            self._versions[name] = self._versions.get(name, 0) + 1
+            self._state_dicts.pop(name, None)
+
+    def fingerprint(self, adapters: dict) -> dict:
+        """
+        {name: [scale, source, weight_name]} for result-cache keys, so results made
+        with an adapter are not served after the name points at other weights.
+        """
+        with self._lock:
+            return {
+                name: [scale, self._specs[name]["source"], self._specs[name]["weight_name"]]
+                for name, scale in adapters.items()
+            }
+
+    def list(self) -> dict:
+        with self._lock:
+            return {
+                name: {**spec, "in_host_memory": name in self._state_dicts}
+                for name, spec in self._specs.items()
+            }
+
+    @staticmethod
+    def parse(value: str) -> dict:
+        """Parse the form encoding "name:scale,name2:scale" (scale defaults to 1.0)."""
+        adapters = {}
+        for part in (value or "").split(","):
+            part = part.strip()
+            if not part:
+                continue
+            name, _, scale = part.partition(":")
+            adapters[name.strip()] = float(scale) if scale else 1.0
+        return adapters
+
+    def validate(self, adapters: dict, pipeline: str):
+        for name in adapters:
+            spec = self._specs.get(name)
+            if spec is None:
+                raise ValueError(f"Unknown adapter '{name}'.")
+            if spec["pipeline"] != pipeline:
+                raise ValueError(f"Adapter '{name}' is registered for the {spec['pipeline']} pipeline.")
+
+    def _host_state_dict(self, pipe, name: str):
+        with self._lock:
+            state_dict = self._state_dicts.get(name)
+            if state_dict is not None:
+                self._state_dicts.move_to_end(name)
+                return state_dict
+            spec = self._specs[name]
+            version = self._versions[name]
+
+        start = time.perf_counter()
+        kwargs = {"weight_name": spec["weight_name"]} if spec["weight_name"] else {}
+        state_dict = pipe.lora_state_dict(spec["source"], **kwargs)
+        print(f"Loaded LoRA adapter {name} into host memory in {time.perf_counter() - start:.2f}s")
+
+        with self._lock:
+            if self._versions[name] != version:
+                # Re-registered while loading: don't cache the old weights
+                return state_dict
+            self._state_dicts[name] = state_dict
+            self.host_loads += 1
+            while len(self._state_dicts) > self.max_host_adapters:
+                self._state_dicts.popitem(last=False)
+        return state_dict
+
+    def activate(self, pipe, adapters: dict):
+        """
+        Make exactly `adapters` ({name: scale}) active on `pipe`. Call while holding
+        the pipeline (inside `PipelineResidencyManager.use`).
+        """
+        state = self._pipe_state.get(pipe)
+        if state is None:
+            state = {"resident": OrderedDict(), "fused": None, "streak": (None, 0)}
+            self._pipe_state[pipe] = state
+
+        with self._lock:
+            versions = {name: self._versions[name] for name in adapters}
+        # Versions are part of the key, so a fused adapter that was re-registered is unfused
+        key = tuple(sorted((name, scale, versions[name]) for name, scale in adapters.items()))
+        if state["fused"] is not None and state["fused"] != key:
+            pipe.unfuse_lora()
+            state["fused"] = None
+
+        previous, count = state["streak"]
+        state["streak"] = (key, count + 1 if key == previous else 1)
+
+        if not adapters:
+            if state["resident"]:
+                pipe.disable_lora()
+            return
+        if state["fused"] == key:
+            return
+
+        # name -> version of the injected weights
+        resident = state["resident"]
+        for name in adapters:
+            if name in resident and resident[name] != versions[name]:
+                pipe.delete_adapters(name)
+                del resident[name]
+            if name not in resident:
+                # load_lora_weights consumes the dict it is given, keep the cached one intact
+                pipe.load_lora_weights(dict(self._host_state_dict(pipe, name)), adapter_name=name)
+                resident[name] = versions[name]
+                self.injections += 1
+            resident.move_to_end(name)
+
+        evictable = [name for name in resident if name not in adapters]
+        while len(resident) > self.max_resident_adapters and evictable:
+            evicted = evictable.pop(0)
+            pipe.delete_adapters(evicted)
+            del resident[evicted]
+            self.evictions += 1
+
+        names = list(adapters)
+        pipe.enable_lora()
+        pipe.set_adapters(names, adapter_weights=[adapters[name] for name in names])
+
+        if len(names) == 1 and self.fuse_after and state["streak"][1] >= self.fuse_after:
+            # Scale is already applied through set_adapters
+            pipe.fuse_lora(adapter_names=names, lora_scale=1.0)
+            state["fused"] = key
+            self.fuses += 1
+            print(f"Fused hot LoRA adapter {names[0]} (scale {adapters[names[0]]})")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "registered": len(self._specs),
+                "in_host_memory": list(self._state_dicts),
+                "host_loads": self.host_loads,
+                "injections": self.injections,
+                "evictions": self.evictions,
+                "fuses": self.fuses,
+            }
@@ -1,82 +1,120 @@
-import io
+import json
+import uuid
+import hashlib
 import base64
+import asyncio
+import threading
 import torch
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import Dict, List, Optional
 from PIL import Image
 from diffusers import QwenImagePipeline, QwenImageEditPlusPipeline
+from diffusers.pipelines.qwenimage.pipeline_qwenimage_edit_plus import CONDITION_IMAGE_SIZE, calculate_dimensions
 import uvicorn
 from contextlib import asynccontextmanager
 
 from config import settings
+from prompt_cache import PromptEmbeddingCache
+from result_cache import ResultCache
+from residency import PipelineResidencyManager, PipelineUnavailable
+from previews import GenerationCancelled, PreviewCallback
+from step_cache import STEP_CACHE_PRESETS, step_cache
+from vae_memory import PeakMemory, vae_tiling_for
+from drafts import RESOLUTION_MODES, draft_then_refine
+from encoding import IMAGE_FORMATS, check_encoding, encode_image, image_response, transcode
+from uploads import decode_mask, decode_to_bucket, displayed_size, read_upload
+from batch import bucket_order, collect_batch_items
+from lora import LoraAdapterRegistry, source_allowed
+from regions import blend_mask, context_box, mask_bbox, parse_bbox, paste_region
 
-# Global variables to hold models
-txt2img_pipe = None
-edit_pipe = None
+# Loads pipelines on demand and keeps the most recently used one on the device
+pipelines = PipelineResidencyManager(
+    device=settings.DEVICE,
+    offload_mode=settings.OFFLOAD_MODE,
+    headroom_bytes=settings.GPU_HEADROOM_BYTES,
+)
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+# Text-encoder outputs shared by both pipelines (keyed by model id)
+prompt_cache = PromptEmbeddingCache(max_entries=settings.PROMPT_CACHE_SIZE)
+
+# Finished images, content-addressed by their generation parameters
+result_cache = ResultCache(settings.RESULT_CACHE_DIR, settings.RESULT_CACHE_MAX_BYTES)
+
+# LoRA adapters activated per request on the resident pipelines
+adapters_registry = LoraAdapterRegistry(
+    max_host_adapters=settings.LORA_MAX_HOST_ADAPTERS,
+    max_resident_adapters=settings.LORA_MAX_RESIDENT_ADAPTERS,
+    fuse_after=settings.LORA_FUSE_AFTER,
+)
+for adapter_name, adapter_spec in settings.LORA_ADAPTERS.items():
+    adapters_registry.register(adapter_name, **adapter_spec)
+
+# Cancel events of in-flight streaming jobs, keyed by job id
+stream_jobs = {}
+
+
+def condition_images_for(edit_pipe, images):
     """
-    Load models on startup and clear memory on shutdown.
-    Warning: These models are very large. Loading both might OOM on consumer GPUs.
-    We will load strictly what is needed if possible, but for this service we load on startup 
-    to be ready.
+    Resize edit inputs the way QwenImageEditPlusPipeline does before feeding them to
+    the VL text encoder, so cached embeddings match what the pipeline would compute.
     """
-    global txt2img_pipe, edit_pipe
-    
+    condition_images = []
+    for img in images:
+        width, height = img.size
+        condition_width, condition_height = calculate_dimensions(CONDITION_IMAGE_SIZE, width / height)
+        condition_images.append(edit_pipe.image_processor.resize(img, condition_height, condition_width))
+    return condition_images
+
+def load_txt2img_pipe():
     print(f"Loading Text-to-Image model: {settings.TEXT_TO_IMAGE_MODEL_ID}...")
-    try:
-        txt2img_pipe = QwenImagePipeline.from_pretrained(
-            settings.TEXT_TO_IMAGE_MODEL_ID,
-            torch_dtype=settings.TORCH_DTYPE,
-            device_map=None
-        )
-        # Enable sequential cpu offload to save memory (slower but necessary for large models)
-        if hasattr(txt2img_pipe, "enable_sequential_cpu_offload"):
-             txt2img_pipe.enable_sequential_cpu_offload()
-        elif hasattr(txt2img_pipe, "enable_model_cpu_offload"):
-             txt2img_pipe.enable_model_cpu_offload()
-
-        # Enable attention slicing for inference memory
-        if hasattr(txt2img_pipe, "enable_attention_slicing"):
-             txt2img_pipe.enable_attention_slicing()
-             
-        print("Text-to-Image model loaded successfully.")
-    except Exception as e:
-        print(f"Failed to load Text-to-Image model: {e}")
+    pipe = QwenImagePipeline.from_pretrained(
+        settings.TEXT_TO_IMAGE_MODEL_ID,
+        torch_dtype=settings.TORCH_DTYPE,
+        device_map=None
+    )
+    # Enable attention slicing for inference memory
+    if hasattr(pipe, "enable_attention_slicing"):
+         pipe.enable_attention_slicing()
+    return pipe
 
+def load_edit_pipe():
     print(f"Loading Image-Edit model: {settings.IMAGE_EDIT_MODEL_ID}...")
-    try:
-        edit_pipe = QwenImageEditPlusPipeline.from_pretrained(
-            settings.IMAGE_EDIT_MODEL_ID,
-            torch_dtype=settings.TORCH_DTYPE,
-            device_map=None
-        )
-        # Enable sequential cpu offload to save memory (slower but necessary for large models)
-        if hasattr(edit_pipe, "enable_sequential_cpu_offload"):
-             edit_pipe.enable_sequential_cpu_offload()
-        elif hasattr(edit_pipe, "enable_model_cpu_offload"):
-             edit_pipe.enable_model_cpu_offload()
-
-        # Enable attention slicing for inference memory
-        if hasattr(edit_pipe, "enable_attention_slicing"):
-             edit_pipe.enable_attention_slicing()
-             
-        # Enable progress bar
-        edit_pipe.set_progress_bar_config(disable=None)
-        print("Image-Edit model loaded successfully.")
-    except Exception as e:
-        print(f"Failed to load Image-Edit model: {e}")
+    pipe = QwenImageEditPlusPipeline.from_pretrained(
+        settings.IMAGE_EDIT_MODEL_ID,
+        torch_dtype=settings.TORCH_DTYPE,
+        device_map=None
+    )
+    # Enable attention slicing for inference memory
+    if hasattr(pipe, "enable_attention_slicing"):
+         pipe.enable_attention_slicing()
+
+    # Enable progress bar
+    pipe.set_progress_bar_config(disable=None)
+    return pipe
+
+pipelines.register("txt2img", load_txt2img_pipe)
+pipelines.register("edit", load_edit_pipe)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Preload the configured pipelines on startup and clear memory on shutdown.
+    These models are very large, so only the pipelines listed in
+    IMAGE_PRELOAD_PIPELINES are loaded eagerly; the residency manager loads the
+    others on first use and swaps them on and off the device as requests alternate.
+    """
+    pipelines.preload(settings.PRELOAD_PIPELINES)
 
     yield
     
     # Cleanup
     print("Cleaning up models...")
-    del txt2img_pipe
-    del edit_pipe
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
+    prompt_cache.clear()
+    result_cache.flush()
+    pipelines.unload_all()
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -99,48 +137,261 @@ class GenerateRequest(BaseModel):
     steps: int = 50
     guidance_scale: float = 4.0 # true_cfg_scale
     seed: int = 42
+    # Step-caching preset: "off", "quality", "balanced" or "fast"
+    acceleration: str = settings.DEFAULT_ACCELERATION
+    # "full", or "draft"/"fast_draft" to denoise at low resolution and refine the upscaled latent
+    resolution_mode: str = "full"
+    # Output encoding: "png", "webp" or "jpeg"; quality applies to webp/jpeg,
+    # compression_level (0-9) to png
+    image_format: str = "png"
+    quality: int = 90
+    compression_level: int = settings.PNG_COMPRESSION_LEVEL
+    # "json" (base64 body, default) or "binary" (raw image bytes)
+    response_format: str = "json"
+    # Registered LoRA adapters to apply, {name: scale}
+    adapters: Dict[str, float] = {}
+
+class StreamGenerateRequest(GenerateRequest):
+    # Emit a latent preview every N denoising steps
+    preview_every: int = settings.PREVIEW_EVERY_N_STEPS
+
+def vae_tiling(pipe, width: int, height: int):
+    return vae_tiling_for(
+        pipe,
+        width,
+        height,
+        min_pixels=settings.VAE_TILING_MIN_PIXELS,
+        tile_size=settings.VAE_TILE_SIZE,
+        tile_stride=settings.VAE_TILE_STRIDE,
+    )
+
+def to_png(image: Image.Image) -> bytes:
+    """Canonical lossless encoding stored in the result cache."""
+    return encode_image(image, "png", compression_level=settings.PNG_COMPRESSION_LEVEL)
+
+async def encoded_response(image, png_bytes, image_format, response_format, quality, compression_level,
+                           cached=False, metadata=None):
+    """
+    Encode the result off the event loop. `png_bytes` is the cached canonical PNG,
+    if any; otherwise `image` is encoded directly.
+    """
+    if png_bytes is not None:
+        data = await run_in_threadpool(
+            transcode, png_bytes, image_format, quality, compression_level, settings.PNG_COMPRESSION_LEVEL
+        )
+    else:
+        data = await run_in_threadpool(encode_image, image, image_format, quality, compression_level)
+    return image_response(data, image_format, response_format, cached=cached, metadata=metadata)
+
+def step_callback_kwargs(callback):
+    if callback is None:
+        return {}
+    return {"callback_on_step_end": callback, "callback_on_step_end_tensor_inputs": ["latents"]}
+
+def check_acceleration(preset: str):
+    if preset not in STEP_CACHE_PRESETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown acceleration preset '{preset}'. Choose from {list(STEP_CACHE_PRESETS)}.",
+        )
+
+class AdapterSpec(BaseModel):
+    name: str
+    # Local path or Hugging Face repo id of the LoRA weights
+    source: str
+    weight_name: Optional[str] = None
+    # "txt2img" or "edit"
+    pipeline: str = "txt2img"
+
+def check_adapters(adapters: dict, pipeline: str):
+    try:
+        adapters_registry.validate(adapters, pipeline)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def parse_adapters(value: str, pipeline: str) -> dict:
+    """Parse and validate the form encoding of adapters ("name:scale,...")."""
+    try:
+        adapters = LoraAdapterRegistry.parse(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="adapters must be 'name:scale,...'.")
+    check_adapters(adapters, pipeline)
+    return adapters
+
+def check_resolution_mode(mode: str):
+    if mode not in RESOLUTION_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown resolution mode '{mode}'. Choose from {list(RESOLUTION_MODES)}.",
+        )
+
+def generate_cache_key(req: GenerateRequest) -> str:
+    return ResultCache.make_key(
+        model=settings.TEXT_TO_IMAGE_MODEL_ID,
+        prompt=req.prompt,
+        negative_prompt=req.negative_prompt,
+        width=req.width,
+        height=req.height,
+        steps=req.steps,
+        guidance_scale=req.guidance_scale,
+        seed=req.seed,
+        acceleration=req.acceleration,
+        resolution_mode=req.resolution_mode,
+        adapters=adapters_registry.fingerprint(req.adapters),
+    )
+
+def edit_cache_key(image_digest, prompt, negative_prompt, steps, guidance_scale, seed, acceleration,
+                   adapters=None) -> str:
+    return ResultCache.make_key(
+        model=settings.IMAGE_EDIT_MODEL_ID,
+        image=image_digest,
+        prompt=prompt,
+        negative_prompt=negative_prompt,
+        steps=steps,
+        guidance_scale=guidance_scale,
+        seed=seed,
+        acceleration=acceleration,
+        adapters=adapters_registry.fingerprint(adapters or {}),
+    )
+
+def run_generate(req: GenerateRequest, callback=None):
+    """
+    Run txt2img_pipe for a request. Blocking; call from a worker thread.
+    Returns the image and a metadata dict describing how it was produced.
+    """
+    generator = torch.Generator(device=settings.DEVICE).manual_seed(req.seed)
+
+    # Qwen-Image specific arguments based on docs
+    # Note: 'true_cfg_scale' is used in the example instead of guidance_scale for some pipelines,
+    # but typically diffusers uses guidance_scale. The example shows: 
+    # true_cfg_scale=4.0
+
+    with pipelines.use("txt2img") as txt2img_pipe:
+        # Prompt and negative prompt come from the embedding cache; the default
+        # negative prompt is only ever encoded once per process.
+        prompt_kwargs = prompt_cache.pipeline_kwargs(
+            txt2img_pipe,
+            settings.TEXT_TO_IMAGE_MODEL_ID,
+            req.prompt,
+            req.negative_prompt,
+        )
+        adapters_registry.activate(txt2img_pipe, req.adapters)
+
+        call_kwargs = {
+            **prompt_kwargs,
+            "true_cfg_scale": req.guidance_scale,
+            **step_callback_kwargs(callback),
+        }
+
+        with PeakMemory() as peak, vae_tiling(txt2img_pipe, req.width, req.height) as tiled, \
+                torch.inference_mode():
+            if req.resolution_mode == "full":
+                with step_cache(txt2img_pipe, req.acceleration, req.steps):
+                    output = txt2img_pipe(
+                        **call_kwargs,
+                        width=req.width,
+                        height=req.height,
+                        num_inference_steps=req.steps,
+                        generator=generator,
+                    )
+                path = {"resolution_mode": "full"}
+            else:
+                output, path = draft_then_refine(
+                    txt2img_pipe,
+                    req.resolution_mode,
+                    req.width,
+                    req.height,
+                    req.steps,
+                    generator,
+                    acceleration=req.acceleration,
+                    **call_kwargs,
+                )
+
+    if not output.images:
+        raise RuntimeError("Model failed to generate image.")
+    metadata = {**path, "adapters": req.adapters, "vae_tiling": tiled, "peak_memory_mb": peak.peak_mb}
+    print(f"Generated {req.width}x{req.height}: {metadata}")
+    return output.images[0], metadata
+
+def run_edit(image1: Image.Image, image_digest: str, prompt: str, negative_prompt: str,
+             steps: int, guidance_scale: float, seed: int, acceleration: str = "off",
+             callback=None, width: int = None, height: int = None, adapters: dict = None):
+    """
+    Run edit_pipe on a decoded input image. Blocking; call from a worker thread.
+    Returns the image and a metadata dict describing how it was produced.
+    """
+    generator = torch.manual_seed(seed)
+
+    with pipelines.use("edit") as edit_pipe:
+        # The edit text encoder also sees the (resized) input image, so its
+        # embeddings are keyed on the image bytes as well as the text.
+        prompt_kwargs = prompt_cache.pipeline_kwargs(
+            edit_pipe,
+            settings.IMAGE_EDIT_MODEL_ID,
+            prompt,
+            negative_prompt,
+            image=condition_images_for(edit_pipe, [image1]),
+            image_key=image_digest,
+        )
+        adapters_registry.activate(edit_pipe, adapters or {})
+
+        # Qwen-Image-Edit-2511 inputs
+        inputs = {
+            "image": [image1], # The model expects a list of images based on example
+            **prompt_kwargs,
+            "generator": generator,
+            "true_cfg_scale": guidance_scale,
+            "num_inference_steps": steps,
+            "guidance_scale": 1.0, # The example sets guidance_scale to 1.0 and uses true_cfg_scale
+            "num_images_per_prompt": 1,
+            **step_callback_kwargs(callback),
+        }
+
+        if width is not None and height is not None:
+            # Explicit output size (region edits run at the crop size)
+            inputs["width"], inputs["height"] = width, height
+            out_width, out_height = width, height
+        else:
+            # The edit pipeline works at ~1MP with the input's aspect ratio
+            out_width, out_height = calculate_dimensions(1024 * 1024, image1.width / image1.height)
+        with PeakMemory() as peak, vae_tiling(edit_pipe, out_width, out_height) as tiled, \
+                torch.inference_mode(), step_cache(edit_pipe, acceleration, steps):
+            output = edit_pipe(**inputs)
+
+    if not output.images:
+        raise RuntimeError("Model failed to edit image.")
+    metadata = {"adapters": adapters or {}, "vae_tiling": tiled, "peak_memory_mb": peak.peak_mb}
+    print(f"Edited {out_width}x{out_height}: {metadata}")
+    return output.images[0], metadata
 
 @app.post("/generate")
 async def generate_image(req: GenerateRequest):
-    # Ensure memory is clean before starting
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
-        
-    global txt2img_pipe
-    if txt2img_pipe is None:
-        raise HTTPException(status_code=503, detail="Text-to-Image model not loaded.")
-    
+    check_acceleration(req.acceleration)
+    check_resolution_mode(req.resolution_mode)
+    check_adapters(req.adapters, "txt2img")
+    check_encoding(req.image_format, req.response_format, req.quality, req.compression_level)
+    encoding = (req.image_format, req.response_format, req.quality, req.compression_level)
+
+    # Identical requests produce identical images, so serve repeats from disk
+    cache_key = generate_cache_key(req)
+    cached = await run_in_threadpool(result_cache.get, cache_key)
+    if cached is not None:
+        return await encoded_response(None, cached, *encoding, cached=True, metadata=result_cache.metadata(cache_key))
+
     try:
-        generator = torch.Generator(device=settings.DEVICE).manual_seed(req.seed)
-        
-        # Qwen-Image specific arguments based on docs
-        # Note: 'true_cfg_scale' is used in the example instead of guidance_scale for some pipelines,
-        # but typically diffusers uses guidance_scale. The example shows: 
-        # true_cfg_scale=4.0
-        
-        with torch.inference_mode():
-            output = txt2img_pipe(
-                prompt=req.prompt,
-                negative_prompt=req.negative_prompt,
-                width=req.width,
-                height=req.height,
-                num_inference_steps=req.steps,
-                true_cfg_scale=req.guidance_scale,
-                generator=generator
-            )
-            
-        if not output.images:
-             raise HTTPException(status_code=500, detail="Model failed to generate image.")
-
-        image = output.images[0]
-        
-        # Convert to base64
-        buffered = io.BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-        
-        return JSONResponse(content={"image": img_str, "format": "base64", "media_type": "image/png"})
+        image, metadata = await run_in_threadpool(run_generate, req)
+
+        png_bytes = None
+        if result_cache.enabled:
+            png_bytes = await run_in_threadpool(to_png, image)
+            await run_in_threadpool(result_cache.put, cache_key, png_bytes, metadata=metadata)
 
+        if png_bytes is not None and req.image_format == "png":
+            return await encoded_response(None, png_bytes, *encoding, metadata=metadata)
+        return await encoded_response(image, None, *encoding, metadata=metadata)
+
+    except PipelineUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Generation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -153,53 +404,331 @@ async def edit_image(
     negative_prompt: str = Form(" "),
     steps: int = Form(40),
     guidance_scale: float = Form(4.0), # true_cfg_scale
-    seed: int = Form(42)
+    seed: int = Form(42),
+    acceleration: str = Form(settings.DEFAULT_ACCELERATION),
+    image_format: str = Form("png"),
+    quality: int = Form(90),
+    compression_level: int = Form(settings.PNG_COMPRESSION_LEVEL),
+    response_format: str = Form("json"),
+    # Optional edit region: a mask (white = edit) or "x0,y0,x1,y1" in pixels of the upload.
+    # Only that area plus some context is run through the pipeline.
+    mask: Optional[UploadFile] = File(None),
+    bbox: Optional[str] = Form(None),
+    # LoRA adapters as "name:scale,name2:scale"
+    adapters: str = Form("")
 ):
-    # Ensure memory is clean before starting
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
+    check_acceleration(acceleration)
+    adapter_scales = parse_adapters(adapters, "edit")
+    check_encoding(image_format, response_format, quality, compression_level)
+    encoding = (image_format, response_format, quality, compression_level)
 
-    global edit_pipe
-    if edit_pipe is None:
-        raise HTTPException(status_code=503, detail="Image-Edit model not loaded.")
+    # Read image (bounded, hashed while streaming in)
+    contents, image_digest = await read_upload(file, settings.MAX_UPLOAD_BYTES)
+    mask_contents, mask_digest = None, None
+    if mask is not None:
+        mask_contents, mask_digest = await read_upload(mask, settings.MAX_UPLOAD_BYTES)
 
-    try:
-        # Read image
-        contents = await file.read()
-        image1 = Image.open(io.BytesIO(contents)).convert("RGB")
-        
-        generator = torch.manual_seed(seed)
-        
-        # Qwen-Image-Edit-2511 inputs
-        inputs = {
-            "image": [image1], # The model expects a list of images based on example
-            "prompt": prompt,
-            "generator": generator,
-            "true_cfg_scale": guidance_scale,
-            "negative_prompt": negative_prompt,
-            "num_inference_steps": steps,
-            "guidance_scale": 1.0, # The example sets guidance_scale to 1.0 and uses true_cfg_scale
-            "num_images_per_prompt": 1,
-        }
+    cache_key = edit_cache_key(
+        image_digest, prompt, negative_prompt, steps, guidance_scale, seed, acceleration, adapter_scales
+    )
+    if mask_digest or bbox:
+        cache_key = ResultCache.make_key(edit=cache_key, mask=mask_digest, bbox=bbox)
+    cached = await run_in_threadpool(result_cache.get, cache_key)
+    if cached is not None:
+        return await encoded_response(None, cached, *encoding, cached=True, metadata=result_cache.metadata(cache_key))
 
-        with torch.inference_mode():
-            output = edit_pipe(**inputs)
-            
-        if not output.images:
-             raise HTTPException(status_code=500, detail="Model failed to edit image.")
+    if mask_contents is None and bbox is None:
+        # Decode straight to the pipeline's resolution bucket
+        image1 = await run_in_threadpool(decode_to_bucket, contents, settings.MAX_INPUT_PIXELS)
+        edit = lambda: run_edit(
+            image1, image_digest, prompt, negative_prompt, steps, guidance_scale, seed, acceleration,
+            adapters=adapter_scales,
+        )
+    else:
+        # Region edit: keep the full image (bounded) as the canvas
+        canvas = await run_in_threadpool(
+            decode_to_bucket, contents, settings.MAX_INPUT_PIXELS, settings.REGION_CANVAS_MAX_PIXELS, False
+        )
+        region_mask = None
+        if mask_contents is not None:
+            region_mask = await run_in_threadpool(
+                decode_mask, mask_contents, canvas.size, settings.MAX_INPUT_PIXELS
+            )
+            region = mask_bbox(region_mask)
+            if region is None:
+                raise HTTPException(status_code=400, detail="Mask does not select any pixels.")
+        else:
+            region = parse_bbox(bbox, displayed_size(contents), canvas.size)
+        edit = lambda: run_region_edit(
+            canvas, region, region_mask, image_digest, prompt, negative_prompt, steps, guidance_scale, seed,
+            acceleration, adapters=adapter_scales,
+        )
+    del contents, mask_contents
+
+    try:
+        output_image, metadata = await run_in_threadpool(edit)
 
-        output_image = output.images[0]
+        png_bytes = None
+        if result_cache.enabled:
+            png_bytes = await run_in_threadpool(to_png, output_image)
+            await run_in_threadpool(result_cache.put, cache_key, png_bytes, metadata=metadata)
 
-        # Convert to base64
-        buffered = io.BytesIO()
-        output_image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-        
-        return JSONResponse(content={"image": img_str, "format": "base64", "media_type": "image/png"})
+        if png_bytes is not None and image_format == "png":
+            return await encoded_response(None, png_bytes, *encoding, metadata=metadata)
+        return await encoded_response(output_image, None, *encoding, metadata=metadata)
 
+    except PipelineUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Editing error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def run_region_edit(canvas: Image.Image, region, mask, image_digest: str, prompt: str, negative_prompt: str,
+                    steps: int, guidance_scale: float, seed: int, acceleration: str = "off",
+                    adapters: dict = None):
+    """
+    Edit only `region` of the canvas: crop it with context padding, run edit_pipe at
+    the crop size and blend the result back with a feathered mask.
+    """
+    crop_box = context_box(
+        region, canvas.size, settings.REGION_PADDING_RATIO, settings.REGION_MIN_PADDING
+    )
+    crop = canvas.crop(crop_box)
+    crop_digest = hashlib.sha256(f"{image_digest}:{crop_box}".encode("utf-8")).hexdigest()
+
+    edited, metadata = run_edit(
+        crop, crop_digest, prompt, negative_prompt, steps, guidance_scale, seed, acceleration,
+        width=crop.width, height=crop.height, adapters=adapters,
+    )
+    alpha = blend_mask(crop_box, region, settings.REGION_FEATHER, mask=mask)
+    result = paste_region(canvas, edited, crop_box, alpha)
+    metadata = {**metadata, "region": list(region), "crop": list(crop_box)}
+    return result, metadata
+
+@app.post("/edit/batch")
+async def edit_batch(
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    prompt: str = Form(...),
+    negative_prompt: str = Form(" "),
+    steps: int = Form(40),
+    guidance_scale: float = Form(4.0), # true_cfg_scale
+    seed: int = Form(42),
+    acceleration: str = Form(settings.DEFAULT_ACCELERATION),
+    image_format: str = Form("png"),
+    quality: int = Form(90),
+    compression_level: int = Form(settings.PNG_COMPRESSION_LEVEL),
+    adapters: str = Form("")
+):
+    """
+    Apply one edit prompt to many images (multipart `files` and/or a zip `archive`).
+
+    Results stream back as newline-delimited JSON, one line per image in completion
+    order (`index`, `filename`, `status` and either the base64 `image` or an error
+    `detail`), followed by a summary line. Images are processed grouped by resolution
+    bucket; a failing image is reported and the batch continues.
+    """
+    check_acceleration(acceleration)
+    check_encoding(image_format, "json", quality, compression_level)
+    adapter_scales = parse_adapters(adapters, "edit")
+    items = await collect_batch_items(
+        files,
+        archive,
+        max_items=settings.BATCH_MAX_ITEMS,
+        max_item_bytes=settings.MAX_UPLOAD_BYTES,
+        max_total_bytes=settings.BATCH_MAX_TOTAL_BYTES,
+    )
+    _, media_type = IMAGE_FORMATS[image_format]
+
+    async def edit_item(item):
+        cache_key = edit_cache_key(
+            item.digest, prompt, negative_prompt, steps, guidance_scale, seed, acceleration, adapter_scales
+        )
+        png_bytes = await run_in_threadpool(result_cache.get, cache_key)
+        if png_bytes is not None:
+            data = await run_in_threadpool(
+                transcode, png_bytes, image_format, quality, compression_level, settings.PNG_COMPRESSION_LEVEL
+            )
+            return data, {**result_cache.metadata(cache_key), "cached": True}
+
+        image1 = await run_in_threadpool(decode_to_bucket, item.contents, settings.MAX_INPUT_PIXELS)
+        output_image, metadata = await run_in_threadpool(
+            run_edit, image1, item.digest, prompt, negative_prompt, steps, guidance_scale, seed, acceleration,
+            adapters=adapter_scales,
+        )
+        if result_cache.enabled:
+            png_bytes = await run_in_threadpool(to_png, output_image)
+            await run_in_threadpool(result_cache.put, cache_key, png_bytes, metadata=metadata)
+        if png_bytes is not None and image_format == "png":
+            return png_bytes, metadata
+        data = await run_in_threadpool(encode_image, output_image, image_format, quality, compression_level)
+        return data, metadata
+
+    async def results():
+        succeeded = failed = 0
+        for item in bucket_order(items):
+            line = {"index": item.index, "filename": item.filename}
+            try:
+                if item.error:
+                    raise ValueError(item.error)
+                data, metadata = await edit_item(item)
+                line.update({
+                    "status": "ok",
+                    "image": base64.b64encode(data).decode("utf-8"),
+                    "format": "base64",
+                    "media_type": media_type,
+                    "metadata": metadata,
+                })
+                succeeded += 1
+            except Exception as e:
+                print(f"Batch edit error ({item.filename}): {e}")
+                line.update({"status": "error", "detail": getattr(e, "detail", str(e))})
+                failed += 1
+            # Drop the upload bytes as soon as the item is done
+            item.contents = None
+            yield json.dumps(line) + "\n"
+        yield json.dumps({"done": True, "total": len(items), "succeeded": succeeded, "failed": failed}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_job(run, aspect: float, preview_every: int, total_steps: int, cache_key: str):
+    """
+    Run a pipeline call in a worker thread and stream Server-Sent Events:
+    `started` (with the job id used for cancelling), `preview` every few steps,
+    then `result`, `cancelled` or `error`.
+    """
+    job_id = uuid.uuid4().hex
+    cancel_event = threading.Event()
+    stream_jobs[job_id] = cancel_event
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def emit(event, data):
+            loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+        def worker():
+            callback = PreviewCallback(emit, aspect, preview_every, total_steps, cancel_event)
+            try:
+                image, metadata = run(callback)
+                png_bytes = to_png(image)
+                result_cache.put(cache_key, png_bytes, metadata=metadata)
+                emit("result", {
+                    "image": base64.b64encode(png_bytes).decode("utf-8"),
+                    "format": "base64",
+                    "media_type": "image/png",
+                    "metadata": metadata,
+                })
+            except GenerationCancelled:
+                emit("cancelled", {"job_id": job_id})
+            except Exception as e:
+                print(f"Streaming generation error: {e}")
+                emit("error", {"detail": str(e)})
+            finally:
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                emit(None, None)
+
+        yield sse_event("started", {"job_id": job_id, "total_steps": total_steps})
+        task = loop.run_in_executor(None, worker)
+        try:
+            while True:
+                event, data = await queue.get()
+                if event is None:
+                    break
+                yield sse_event(event, data)
+            await task
+        finally:
+            # Client went away (or we finished): stop the denoising loop at the next step
+            cancel_event.set()
+            stream_jobs.pop(job_id, None)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Job-Id": job_id},
+    )
+
+@app.post("/generate/stream")
+async def generate_image_stream(req: StreamGenerateRequest):
+    check_acceleration(req.acceleration)
+    check_resolution_mode(req.resolution_mode)
+    check_adapters(req.adapters, "txt2img")
+    return stream_job(
+        lambda callback: run_generate(req, callback=callback),
+        aspect=req.width / req.height,
+        preview_every=req.preview_every,
+        total_steps=req.steps,
+        cache_key=generate_cache_key(req),
+    )
+
+@app.post("/edit/stream")
+async def edit_image_stream(
+    file: UploadFile = File(...),
+    prompt: str = Form(...),
+    negative_prompt: str = Form(" "),
+    steps: int = Form(40),
+    guidance_scale: float = Form(4.0), # true_cfg_scale
+    seed: int = Form(42),
+    acceleration: str = Form(settings.DEFAULT_ACCELERATION),
+    preview_every: int = Form(settings.PREVIEW_EVERY_N_STEPS),
+    adapters: str = Form("")
+):
+    check_acceleration(acceleration)
+    adapter_scales = parse_adapters(adapters, "edit")
+    contents, image_digest = await read_upload(file, settings.MAX_UPLOAD_BYTES)
+    image1 = await run_in_threadpool(decode_to_bucket, contents, settings.MAX_INPUT_PIXELS)
+    del contents
+
+    return stream_job(
+        lambda callback: run_edit(
+            image1, image_digest, prompt, negative_prompt, steps, guidance_scale, seed, acceleration,
+            callback=callback, adapters=adapter_scales,
+        ),
+        aspect=image1.width / image1.height,
+        preview_every=preview_every,
+        total_steps=steps,
+        cache_key=edit_cache_key(
+            image_digest, prompt, negative_prompt, steps, guidance_scale, seed, acceleration, adapter_scales
+        ),
+    )
+
+@app.post("/stream/{job_id}/cancel")
+async def cancel_stream(job_id: str):
+    cancel_event = stream_jobs.get(job_id)
+    if cancel_event is None:
+        raise HTTPException(status_code=404, detail="Unknown or finished job.")
+    cancel_event.set()
+    return {"job_id": job_id, "status": "cancelling"}
+
+@app.get("/adapters")
+async def list_adapters():
+    return adapters_registry.list()
+
+@app.post("/adapters")
+async def register_adapter(spec: AdapterSpec):
+    if spec.pipeline not in ("txt2img", "edit"):
+        raise HTTPException(status_code=400, detail="pipeline must be 'txt2img' or 'edit'.")
+    if not source_allowed(spec.source, spec.weight_name, settings.LORA_ALLOWED_SOURCES):
+        raise HTTPException(
+            status_code=403,
+            detail="Adapter source is not in IMAGE_LORA_ALLOWED_SOURCES.",
+        )
+    adapters_registry.register(spec.name, spec.source, weight_name=spec.weight_name, pipeline=spec.pipeline)
+    return {"name": spec.name, "status": "registered"}
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "prompt_cache": prompt_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "pipelines": pipelines.stats(),
+        "adapters": adapters_registry.stats(),
+    }
+
 if __name__ == "__main__":
     uvicorn.run(app, host=settings.HOST, port=settings.PORT)
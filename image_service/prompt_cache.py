@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+
+import torch
+
+
+class PromptEmbeddingCache:
+    """
+    LRU cache of text-encoder outputs for the Qwen image pipelines.
+
+    The Qwen2.5-VL text encoder is re-run for every call, including the constant
+    negative prompt. Entries are keyed by (model_id, text, image_key) and hold the
+    (prompt_embeds, prompt_embeds_mask) pair returned by `pipe.encode_prompt`, which
+    the pipelines accept back through their `*_prompt_embeds` arguments.
+
+    The edit pipeline conditions the text encoder on the input image as well, so
+    callers must pass an `image_key` (e.g. a digest of the image bytes) for it.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_encode(self, pipe, model_id: str, text: str, image=None, image_key: str = None):
+        key = (model_id, text, image_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        encode_kwargs = {
+            "prompt": [text],
+            "device": pipe._execution_device,
+            "num_images_per_prompt": 1,
+        }
+        if image is not None:
+            encode_kwargs["image"] = image
+
+        with torch.inference_mode():
+            prompt_embeds, prompt_embeds_mask = pipe.encode_prompt(**encode_kwargs)
+
+        # Newer diffusers return mask=None when nothing is padded. The pipelines only
+        # honour negative embeds when a mask is passed too, so store an explicit one.
+        if prompt_embeds_mask is None:
+            prompt_embeds_mask = torch.ones(
+                prompt_embeds.shape[:2], dtype=torch.long, device=prompt_embeds.device
+            )
+
+        entry = (prompt_embeds, prompt_embeds_mask)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def pipeline_kwargs(self, pipe, model_id: str, prompt: str, negative_prompt: str = None,
+                        image=None, image_key: str = None) -> dict:
+        """Build the prompt-embeds keyword arguments for a pipeline call."""
+        prompt_embeds, prompt_embeds_mask = self.get_or_encode(
+            pipe, model_id, prompt, image=image, image_key=image_key
+        )
+        kwargs = {
+            "prompt_embeds": prompt_embeds,
+            "prompt_embeds_mask": prompt_embeds_mask,
+        }
+        if negative_prompt is not None:
+            negative_embeds, negative_mask = self.get_or_encode(
+                pipe, model_id, negative_prompt, image=image, image_key=image_key
+            )
+            kwargs["negative_prompt_embeds"] = negative_embeds
+            kwargs["negative_prompt_embeds_mask"] = negative_mask
+        return kwargs
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,89 @@
+import math
+
+from fastapi import HTTPException
+from PIL import Image, ImageDraw, ImageFilter
+
+# The edit pipeline works on sides that are multiples of 32
+GRID = 32
+
+
+def parse_bbox(value: str, image_size, canvas_size):
+    """
+    Parse "x0,y0,x1,y1" (pixels of the uploaded image of `image_size`), clamp it
+    to the image and scale it to the canvas.
+    """
+    try:
+        x0, y0, x1, y1 = (float(part) for part in value.split(","))
+        if not all(math.isfinite(part) for part in (x0, y0, x1, y1)):
+            raise ValueError(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be 'x0,y0,x1,y1'.")
+    if x1 <= x0 or y1 <= y0:
+        raise HTTPException(status_code=400, detail="bbox must have x1 > x0 and y1 > y0.")
+
+    width, height = image_size
+    x0, x1 = max(0.0, x0), min(float(width), x1)
+    y0, y1 = max(0.0, y0), min(float(height), y1)
+    if x1 <= x0 or y1 <= y0:
+        raise HTTPException(status_code=400, detail=f"bbox lies outside the {width}x{height} image.")
+
+    canvas_width, canvas_height = canvas_size
+    scale_x, scale_y = canvas_width / width, canvas_height / height
+    # At least one canvas pixel, never past the canvas edge
+    cx0, cy0 = min(int(x0 * scale_x), canvas_width - 1), min(int(y0 * scale_y), canvas_height - 1)
+    cx1 = max(cx0 + 1, min(canvas_width, int(math.ceil(x1 * scale_x))))
+    cy1 = max(cy0 + 1, min(canvas_height, int(math.ceil(y1 * scale_y))))
+    return cx0, cy0, cx1, cy1
+
+
+def mask_bbox(mask: Image.Image):
+    """Bounding box of the white (edited) area of an L-mode mask, or None if empty."""
+    return mask.point(lambda value: 255 if value >= 128 else 0).getbbox()
+
+
+def _grow_axis(start: int, end: int, padding: int, limit: int, min_size: int):
+    start, end = max(0, start - padding), min(limit, end + padding)
+    size = min(limit, max(min_size, int(math.ceil((end - start) / GRID)) * GRID))
+    start = max(0, min(start, limit - size))
+    return start, start + size
+
+
+def context_box(region, canvas_size, padding_ratio: float, min_padding: int, min_size: int = 256):
+    """
+    Expand `region` by context padding and snap it to the 32 px grid inside the
+    canvas. The canvas sides are already multiples of 32, so the crop always fits.
+    """
+    x0, y0, x1, y1 = region
+    width, height = canvas_size
+    padding = max(min_padding, int(max(x1 - x0, y1 - y0) * padding_ratio))
+    cx0, cx1 = _grow_axis(x0, x1, padding, width, min(min_size, width))
+    cy0, cy1 = _grow_axis(y0, y1, padding, height, min(min_size, height))
+    return cx0, cy0, cx1, cy1
+
+
+def blend_mask(crop_box, region, feather: int, mask: Image.Image = None) -> Image.Image:
+    """
+    Alpha mask (crop sized) used to paste the edited crop back: the edit mask (or the
+    region rectangle) blurred by `feather` px so the seam fades into the original.
+    """
+    cx0, cy0, cx1, cy1 = crop_box
+    size = (cx1 - cx0, cy1 - cy0)
+    if mask is not None:
+        alpha = mask.crop(crop_box).point(lambda value: 255 if value >= 128 else 0)
+    else:
+        alpha = Image.new("L", size, 0)
+        x0, y0, x1, y1 = region
+        ImageDraw.Draw(alpha).rectangle((x0 - cx0, y0 - cy0, x1 - cx0 - 1, y1 - cy0 - 1), fill=255)
+    if feather > 0:
+        alpha = alpha.filter(ImageFilter.GaussianBlur(feather))
+    return alpha
+
+
+def paste_region(canvas: Image.Image, edited: Image.Image, crop_box, alpha: Image.Image) -> Image.Image:
+    """Blend the edited crop back into a copy of the canvas."""
+    size = (crop_box[2] - crop_box[0], crop_box[3] - crop_box[1])
+    if edited.size != size:
+        edited = edited.resize(size, Image.LANCZOS)
+    result = canvas.copy()
+    result.paste(edited, crop_box[:2], alpha)
+    return result
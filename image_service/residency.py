@@ -0,0 +1,204 @@
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import torch
+
+
+# Placement modes for IMAGE_OFFLOAD_MODE ("auto" picks one of the others)
+OFFLOAD_MODES = ("auto", "device", "model", "sequential")
+
+
+class PipelineUnavailable(RuntimeError):
+    """Raised when a pipeline cannot be loaded or placed on the device."""
+
+
+def module_bytes(module) -> int:
+    return sum(p.numel() * p.element_size() for p in module.parameters())
+
+
+def pipeline_bytes(pipe):
+    """Return (total, largest component) parameter bytes of a diffusers pipeline."""
+    sizes = [
+        module_bytes(component)
+        for component in pipe.components.values()
+        if isinstance(component, torch.nn.Module)
+    ]
+    return sum(sizes), max(sizes, default=0)
+
+
+def available_host_bytes():
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class PipelineResidencyManager:
+    """
+    Keeps the most recently used image pipeline on the accelerator.
+
+    Pipelines are loaded lazily (or preloaded at startup) through registered loader
+    callables. Activating a pipeline parks the previous one in host RAM when it fits,
+    otherwise drops it so it is reloaded on next use. The placement mode of the
+    active pipeline is picked from the free device memory:
+
+    - "device":     the whole pipeline fits, no offload hooks at all
+    - "model":      only the largest component fits, model-level CPU offload
+    - "sequential": nothing fits, sequential (per-layer) CPU offload
+
+    `use()` holds a lock for the duration of the call so a swap never happens in the
+    middle of a denoising loop.
+    """
+
+    def __init__(self, device: str, offload_mode: str = "auto", headroom_bytes: int = 0):
+        if offload_mode not in OFFLOAD_MODES:
+            raise ValueError(f"Unknown offload mode '{offload_mode}'. Choose from {list(OFFLOAD_MODES)}.")
+        self.device = device
+        self.offload_mode = offload_mode
+        self.headroom_bytes = headroom_bytes
+        self._loaders = {}
+        self._pipes = {}
+        self._modes = {}
+        self._active = None
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.swaps = 0
+        self.swap_seconds = 0.0
+
+    def register(self, name: str, loader):
+        self._loaders[name] = loader
+
+    def preload(self, names):
+        for name in names:
+            try:
+                with self.use(name):
+                    pass
+            except PipelineUnavailable as e:
+                print(f"Failed to preload {name} pipeline: {e}")
+
+    @contextmanager
+    def use(self, name: str):
+        with self._lock:
+            yield self._activate(name)
+
+    def get(self, name: str):
+        """Return the pipeline if it is already loaded (resident or parked), else None."""
+        return self._pipes.get(name)
+
+    def _activate(self, name: str):
+        if name == self._active and name in self._pipes:
+            return self._pipes[name]
+
+        start = time.perf_counter()
+        previous = self._active
+        if previous is not None and previous != name:
+            self._park(previous)
+
+        pipe = self._pipes.get(name)
+        if pipe is None:
+            pipe = self._load(name)
+
+        try:
+            mode = self._place(pipe)
+        except Exception as e:
+            raise PipelineUnavailable(f"Could not place {name} pipeline on {self.device}: {e}") from e
+
+        self._modes[name] = mode
+        self._active = name
+        elapsed = time.perf_counter() - start
+        self.swaps += 1
+        self.swap_seconds += elapsed
+        print(f"Activated {name} pipeline in '{mode}' mode (previous: {previous}) in {elapsed:.2f}s")
+        return pipe
+
+    def _load(self, name: str):
+        loader = self._loaders.get(name)
+        if loader is None:
+            raise PipelineUnavailable(f"Unknown pipeline: {name}")
+        print(f"Loading {name} pipeline...")
+        start = time.perf_counter()
+        try:
+            pipe = loader()
+        except Exception as e:
+            raise PipelineUnavailable(f"Failed to load {name} pipeline: {e}") from e
+        self._pipes[name] = pipe
+        self._modes[name] = "host"
+        self.loads += 1
+        print(f"Loaded {name} pipeline in {time.perf_counter() - start:.2f}s")
+        return pipe
+
+    def _choose_mode(self, pipe) -> str:
+        if self.offload_mode != "auto":
+            return self.offload_mode
+        total, largest = pipeline_bytes(pipe)
+        free, _ = torch.cuda.mem_get_info()
+        budget = free - self.headroom_bytes
+        if total <= budget:
+            return "device"
+        if largest <= budget:
+            return "model"
+        return "sequential"
+
+    def _place(self, pipe) -> str:
+        if self.device != "cuda":
+            # Host-only service: every pipeline already lives in RAM
+            pipe.to(self.device)
+            return "device"
+
+        mode = self._choose_mode(pipe)
+        if mode == "device":
+            pipe.to(self.device)
+        elif mode == "model":
+            pipe.enable_model_cpu_offload()
+        else:
+            pipe.enable_sequential_cpu_offload()
+        return mode
+
+    def _park(self, name: str):
+        pipe = self._pipes.get(name)
+        mode = self._modes.get(name)
+        self._active = None
+        if pipe is None or self.device != "cuda":
+            return
+
+        start = time.perf_counter()
+        total, _ = pipeline_bytes(pipe)
+        host_free = available_host_bytes()
+        # Sequentially offloaded weights live behind accelerate hooks and cannot be
+        # moved back cleanly, so those pipelines are dropped and reloaded on demand.
+        if mode == "sequential" or (host_free is not None and total > host_free):
+            del self._pipes[name]
+            self._modes.pop(name, None)
+            action = "dropped"
+        else:
+            if mode == "model":
+                pipe.remove_all_hooks()
+            pipe.to("cpu")
+            self._modes[name] = "host"
+            action = "parked in host RAM"
+
+        del pipe
+        gc.collect()
+        torch.cuda.empty_cache()
+        print(f"{name} pipeline {action} in {time.perf_counter() - start:.2f}s")
+
+    def unload_all(self):
+        with self._lock:
+            self._pipes.clear()
+            self._modes.clear()
+            self._active = None
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active,
+            "pipelines": dict(self._modes),
+            "loads": self.loads,
+            "swaps": self.swaps,
+            "swap_seconds_total": round(self.swap_seconds, 3),
+        }
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class ResultCache:
+    """
+    Disk-backed, content-addressed cache of generated images.
+
+    Generation is fully determined by its parameters (the seed included), so the
+    encoded result is stored under the SHA-256 of those parameters. An `index.json`
+    next to the blobs records size and last access time of every entry; once the
+    total size exceeds `max_bytes` the least recently used entries are deleted.
+
+    Inserts and evictions rewrite the index right away. Hits only bump an access
+    time, so they mark the index dirty and it is written at most every
+    `flush_interval` seconds (and by `flush()` on shutdown); a crash loses only
+    recent access times, which just skews the LRU order.
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(self, directory: str, max_bytes: int, flush_interval: float = 30.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(**params) -> str:
+        """Hash request parameters into a stable cache key."""
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def _load_index(self) -> dict:
+        index_path = os.path.join(self.directory, self.INDEX_NAME)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Drop entries whose blob disappeared while the service was down
+        return {
+            key: entry for key, entry in index.items()
+            if os.path.exists(self._path(key, entry["extension"]))
+        }
+
+    def _save_index(self):
+        index_path = os.path.join(self.directory, self.INDEX_NAME)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, index_path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def flush(self):
+        """Write pending access-time updates to the index."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def get(self, key: str):
+        """Return the cached bytes for `key`, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key, entry["extension"]), "rb") as f:
+                    data = f.read()
+            except OSError:
+                del self._index[key]
+                self._save_index()
+                self.misses += 1
+                return None
+            entry["last_access"] = time.time()
+            self._dirty = True
+            if time.monotonic() - self._last_save >= self.flush_interval:
+                self._save_index()
+            self.hits += 1
+            return data
+
+    def metadata(self, key: str) -> dict:
+        """Return the metadata stored alongside `key` (empty if unknown)."""
+        with self._lock:
+            entry = self._index.get(key)
+            return dict(entry.get("metadata") or {}) if entry else {}
+
+    def put(self, key: str, data: bytes, extension: str = "png", metadata: dict = None):
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            path = self._path(key, extension)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            now = time.time()
+            self._index[key] = {
+                "extension": extension,
+                "size": len(data),
+                "created": now,
+                "last_access": now,
+                "metadata": metadata or {},
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            try:
+                os.remove(self._path(key, entry["extension"]))
+            except OSError:
+                pass
+            del self._index[key]
+            total -= entry["size"]
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": sum(entry["size"] for entry in self._index.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
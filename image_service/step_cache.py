@@ -0,0 +1,167 @@
+from contextlib import contextmanager
+
+import torch
+
+# Accumulated relative change of the timestep embedding allowed before the
+# transformer blocks are recomputed. Larger thresholds skip more steps.
+STEP_CACHE_PRESETS = {
+    "off": None,
+    "quality": 0.05,
+    "balanced": 0.1,
+    "fast": 0.2,
+}
+
+# Steps at the start of the schedule that are always computed in full; the
+# layout of the image is decided there.
+WARMUP_STEPS = 3
+
+
+class _BranchState:
+    def __init__(self):
+        self.calls = 0
+        self.previous_temb = None
+        self.accumulated = 0.0
+        self.residual = None
+        self.block_input = None
+        self.skip = False
+
+
+class StepCache:
+    """
+    TeaCache/DeepCache-style reuse of transformer block outputs across denoising steps.
+
+    Each transformer call measures the relative L1 change of the timestep embedding
+    since the last fully computed step. While the accumulated change stays below
+    `threshold`, the whole block stack is skipped and the residual it produced last
+    time (output minus input hidden states) is added back instead; only the input
+    and output projections run.
+
+    True CFG calls the transformer twice per step with different text embeddings, so
+    state is tracked per branch, keyed by the encoder hidden states tensor.
+    """
+
+    def __init__(self, transformer, threshold: float, num_steps: int):
+        self.transformer = transformer
+        self.threshold = threshold
+        self.num_steps = num_steps
+        self.branches = {}
+        self.current = None
+        self.computed = 0
+        self.skipped = 0
+        self._saved_forwards = []
+
+    def _branch(self, encoder_hidden_states) -> _BranchState:
+        key = (encoder_hidden_states.data_ptr(), tuple(encoder_hidden_states.shape))
+        if key not in self.branches:
+            self.branches[key] = _BranchState()
+        return self.branches[key]
+
+    def _timestep_embedding(self, hidden_states, timestep, guidance):
+        timestep = timestep.to(hidden_states.dtype)
+        embed = self.transformer.time_text_embed
+        if guidance is None:
+            return embed(timestep, hidden_states)
+        return embed(timestep, guidance.to(hidden_states.dtype) * 1000, hidden_states)
+
+    def _should_skip(self, state: _BranchState, temb) -> bool:
+        step = state.calls
+        state.calls += 1
+        previous, state.previous_temb = state.previous_temb, temb
+        if previous is None or state.residual is None:
+            return False
+        if step < WARMUP_STEPS or step >= self.num_steps - 1:
+            state.accumulated = 0.0
+            return False
+
+        change = ((temb - previous).abs().mean() / previous.abs().mean().clamp(min=1e-6)).item()
+        state.accumulated += change
+        if state.accumulated < self.threshold:
+            return True
+        state.accumulated = 0.0
+        return False
+
+    def _wrap_transformer(self, original):
+        def forward(*args, **kwargs):
+            hidden_states = kwargs.get("hidden_states", args[0] if args else None)
+            encoder_hidden_states = kwargs["encoder_hidden_states"]
+            state = self._branch(encoder_hidden_states)
+            with torch.no_grad():
+                temb = self._timestep_embedding(hidden_states, kwargs["timestep"], kwargs.get("guidance"))
+            state.skip = self._should_skip(state, temb)
+            if state.skip:
+                self.skipped += 1
+            else:
+                self.computed += 1
+            self.current = state
+            return original(*args, **kwargs)
+        return forward
+
+    def _wrap_block(self, original, first: bool, last: bool):
+        def forward(*args, **kwargs):
+            state = self.current
+            if state is not None and state.skip:
+                encoder_hidden_states = kwargs["encoder_hidden_states"]
+                hidden_states = kwargs["hidden_states"]
+                if last:
+                    hidden_states = hidden_states + state.residual
+                return encoder_hidden_states, hidden_states
+
+            if first and state is not None:
+                state.block_input = kwargs["hidden_states"]
+            encoder_hidden_states, hidden_states = original(*args, **kwargs)
+            if last and state is not None:
+                state.residual = hidden_states - state.block_input
+                state.block_input = None
+            return encoder_hidden_states, hidden_states
+        return forward
+
+    def _patch(self, module, wrapper_factory):
+        self._saved_forwards.append((module, module.__dict__.get("forward")))
+        module.forward = wrapper_factory(module.forward)
+
+    def install(self):
+        blocks = list(self.transformer.transformer_blocks)
+        self._patch(self.transformer, self._wrap_transformer)
+        for index, block in enumerate(blocks):
+            self._patch(
+                block,
+                lambda original, first=index == 0, last=index == len(blocks) - 1:
+                    self._wrap_block(original, first, last),
+            )
+
+    def remove(self):
+        for module, saved in reversed(self._saved_forwards):
+            if saved is None:
+                del module.forward
+            else:
+                module.forward = saved
+        self._saved_forwards = []
+        self.branches = {}
+        self.current = None
+
+    def stats(self) -> dict:
+        total = self.computed + self.skipped
+        return {
+            "computed": self.computed,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / total, 4) if total else 0.0,
+        }
+
+
+@contextmanager
+def step_cache(pipe, preset: str, num_steps: int):
+    """Enable step caching on `pipe.transformer` for one pipeline call."""
+    if preset not in STEP_CACHE_PRESETS:
+        raise ValueError(f"Unknown acceleration preset '{preset}'. Choose from {list(STEP_CACHE_PRESETS)}.")
+    threshold = STEP_CACHE_PRESETS[preset]
+    if threshold is None:
+        yield None
+        return
+
+    cache = StepCache(pipe.transformer, threshold, num_steps)
+    cache.install()
+    try:
+        yield cache
+    finally:
+        cache.remove()
+        print(f"Step cache ({preset}): {cache.stats()}")
@@ -3,6 +3,8 @@ from unittest.mock import MagicMock, patch
 import sys
 import os
 
+import torch
+
 # Add project root to path to import image_service
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
@@ -16,6 +18,8 @@ client = TestClient(app)
 def test_generate_image(mock_edit, mock_txt2img):
     # Setup mock capabilities
     mock_pipeline_instance = MagicMock()
+    # Prompts are encoded once and cached: (prompt_embeds, prompt_embeds_mask)
+    mock_pipeline_instance.encode_prompt.return_value = (torch.zeros(1, 4, 8), None)
     mock_txt2img.from_pretrained.return_value = mock_pipeline_instance
     mock_edit.from_pretrained.return_value = MagicMock()
 
@@ -23,7 +27,7 @@ def test_generate_image(mock_edit, mock_txt2img):
     mock_output = MagicMock()
     mock_image = MagicMock()
     # Mock save method
-    def save_side_effect(fp, format):
+    def save_side_effect(fp, format, **kwargs):
         fp.write(b"fake_image_data")
     
     mock_image.save.side_effect = save_side_effect
@@ -43,3 +47,24 @@ def test_edit_image():
     # and TestClient triggers lifespan, we need to be careful.
     # The previous test handles the lifespan context.
     pass
+
+def test_encode_image_formats():
+    import io
+    from PIL import Image
+    from image_service.encoding import encode_image, image_response, transcode
+
+    image = Image.new("RGB", (64, 48), color="red")
+    png = encode_image(image, "png", compression_level=1)
+    assert png.startswith(b"\x89PNG")
+    assert encode_image(image, "jpeg", quality=80).startswith(b"\xff\xd8")
+    assert transcode(png, "png", 90, 1, stored_level=1) is png
+    recompressed = transcode(png, "png", 90, 9, stored_level=1)
+    assert recompressed is not png and Image.open(io.BytesIO(recompressed)).size == (64, 48)
+
+    webp = transcode(png, "webp", 80, 1, stored_level=1)
+    assert Image.open(io.BytesIO(webp)).size == (64, 48)
+
+    binary = image_response(webp, "webp", "binary", metadata={"peak_memory_mb": 1.5})
+    assert binary.media_type == "image/webp"
+    assert binary.body == webp
+    assert binary.headers["X-Peak-Memory-MB"] == "1.5"
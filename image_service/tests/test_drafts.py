@@ -0,0 +1,78 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+import torch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT)
+# drafts imports its sibling modules the way main.py does
+sys.path.append(os.path.join(ROOT, "image_service"))
+
+from image_service import drafts
+from image_service.drafts import draft_then_refine, refine_sigmas, snap
+
+
+def make_pipe():
+    pipe = MagicMock()
+    pipe.scheduler.config = {}
+    pipe.scheduler.sigmas = torch.tensor([0.25, 0.2, 0.1])
+    return pipe
+
+
+@pytest.fixture
+def fake_latents(monkeypatch):
+    monkeypatch.setattr(drafts, "upscale_packed_latents", lambda pipe, latents, *sizes: torch.zeros(1, 64, 16))
+    monkeypatch.setattr(drafts, "calculate_shift", lambda *args: 1.0)
+
+
+def test_snap_rounds_to_multiples_of_16():
+    assert snap(512) == 512
+    assert snap(500) == 496
+    assert snap(505) == 512
+    assert snap(3) == 16
+
+
+@pytest.mark.parametrize("steps, strength, expected", [(20, 0.25, 5), (20, 0.15, 3), (4, 0.1, 1)])
+def test_refine_sigmas_cover_the_schedule_tail(steps, strength, expected):
+    sigmas = refine_sigmas(steps, strength)
+
+    assert len(sigmas) == expected
+    # Always ends on the last sigma of the full schedule
+    assert sigmas[-1] == pytest.approx(1 / steps)
+    assert np.all(np.diff(sigmas) < 0)
+
+
+@pytest.mark.parametrize("mode, draft_steps, refine_steps", [("draft", 10, 5), ("fast_draft", 7, 3)])
+def test_draft_size_and_steps(fake_latents, mode, draft_steps, refine_steps):
+    pipe = make_pipe()
+
+    _, metadata = draft_then_refine(pipe, mode, 1000, 768, 20, torch.Generator(), prompt="a cat")
+
+    assert metadata == {
+        "resolution_mode": mode,
+        "draft_size": [496, 384],
+        "draft_steps": draft_steps,
+        "refine_steps": refine_steps,
+    }
+    draft_call, refine_call = pipe.call_args_list
+    assert draft_call.kwargs["width"] == 496
+    assert draft_call.kwargs["height"] == 384
+    assert draft_call.kwargs["num_inference_steps"] == draft_steps
+    assert draft_call.kwargs["output_type"] == "latent"
+    assert refine_call.kwargs["width"] == 1000
+    assert refine_call.kwargs["height"] == 768
+    assert refine_call.kwargs["num_inference_steps"] == refine_steps
+    assert refine_call.kwargs["prompt"] == "a cat"
+
+
+def test_draft_runs_at_least_one_step(fake_latents):
+    pipe = make_pipe()
+
+    _, metadata = draft_then_refine(pipe, "fast_draft", 64, 64, 1, torch.Generator())
+
+    assert metadata["draft_steps"] == 1
+    assert metadata["refine_steps"] == 1
+    assert metadata["draft_size"] == [32, 32]
@@ -0,0 +1,120 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from image_service.lora import LoraAdapterRegistry, source_allowed
+
+
+def make_registry(**kwargs):
+    registry = LoraAdapterRegistry(**kwargs)
+    registry.register("anime", "user/anime-lora")
+    registry.register("sketch", "user/sketch-lora")
+    registry.register("relight", "user/relight-lora", pipeline="edit")
+    return registry
+
+
+def make_pipe():
+    pipe = MagicMock()
+    pipe.lora_state_dict.side_effect = lambda source, **kwargs: {"source": source}
+    return pipe
+
+
+def test_parse_form_value():
+    assert LoraAdapterRegistry.parse("anime:0.8, sketch") == {"anime": 0.8, "sketch": 1.0}
+    assert LoraAdapterRegistry.parse("") == {}
+    with pytest.raises(ValueError):
+        LoraAdapterRegistry.parse("anime:strong")
+
+
+def test_validate_rejects_unknown_and_wrong_pipeline():
+    registry = make_registry()
+    registry.validate({"anime": 1.0}, "txt2img")
+    with pytest.raises(ValueError):
+        registry.validate({"missing": 1.0}, "txt2img")
+    with pytest.raises(ValueError):
+        registry.validate({"relight": 1.0}, "txt2img")
+
+
+def test_switching_adapters_does_not_reload_weights():
+    registry = make_registry(fuse_after=0)
+    pipe = make_pipe()
+
+    registry.activate(pipe, {"anime": 0.8})
+    registry.activate(pipe, {"sketch": 1.0})
+    registry.activate(pipe, {"anime": 0.5})
+    registry.activate(pipe, {})
+
+    assert pipe.load_lora_weights.call_count == 2
+    assert pipe.lora_state_dict.call_count == 2
+    pipe.set_adapters.assert_called_with(["anime"], adapter_weights=[0.5])
+    pipe.disable_lora.assert_called_once()
+
+
+def test_resident_adapters_are_evicted_lru():
+    registry = make_registry(max_resident_adapters=1, fuse_after=0)
+    pipe = make_pipe()
+
+    registry.activate(pipe, {"anime": 1.0})
+    registry.activate(pipe, {"sketch": 1.0})
+
+    pipe.delete_adapters.assert_called_once_with("anime")
+    assert registry.stats()["evictions"] == 1
+
+
+def test_hot_adapter_is_fused_and_unfused_on_change():
+    registry = make_registry(fuse_after=2)
+    pipe = make_pipe()
+
+    registry.activate(pipe, {"anime": 1.0})
+    registry.activate(pipe, {"anime": 1.0})
+    pipe.fuse_lora.assert_called_once()
+
+    # Further identical requests run on the fused weights untouched
+    registry.activate(pipe, {"anime": 1.0})
+    assert pipe.set_adapters.call_count == 2
+
+    registry.activate(pipe, {"sketch": 1.0})
+    pipe.unfuse_lora.assert_called_once()
+
+
+def test_reregistering_replaces_injected_and_fused_weights():
+    registry = make_registry(fuse_after=2)
+    pipe = make_pipe()
+
+    registry.activate(pipe, {"anime": 1.0})
+    registry.activate(pipe, {"anime": 1.0})
+    assert pipe.fuse_lora.call_count == 1
+
+    registry.register("anime", "user/anime-lora-v2")
+    registry.activate(pipe, {"anime": 1.0})
+
+    pipe.unfuse_lora.assert_called_once()
+    pipe.delete_adapters.assert_called_once_with("anime")
+    assert pipe.load_lora_weights.call_args[0][0] == {"source": "user/anime-lora-v2"}
+
+
+def test_fingerprint_changes_with_source():
+    registry = make_registry()
+    before = registry.fingerprint({"anime": 0.8})
+    registry.register("anime", "user/anime-lora-v2")
+
+    assert registry.fingerprint({"anime": 0.8}) != before
+
+
+def test_source_allow_list(tmp_path):
+    root = tmp_path / "loras"
+    (root / "style").mkdir(parents=True)
+    allowed = [str(root), "trusted/", "other/exact-lora"]
+
+    assert source_allowed(str(root / "style"), "style.safetensors", allowed)
+    assert not source_allowed(str(root / "style"), "../../secret.pt", allowed)
+    assert not source_allowed(str(tmp_path / "elsewhere"), None, allowed)
+    assert source_allowed("trusted/anime-lora", None, allowed)
+    assert not source_allowed("trusted/../evil/lora", None, allowed)
+    assert source_allowed("other/exact-lora", None, allowed)
+    assert not source_allowed("other/another-lora", None, allowed)
+    assert not source_allowed("trusted/anime-lora", None, [])
@@ -0,0 +1,40 @@
+import os
+import sys
+import threading
+
+import pytest
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from image_service.previews import GenerationCancelled, PreviewCallback, latents_to_preview, packed_grid
+
+
+def test_packed_grid_recovers_shape():
+    # 1024x768 output -> 64x48 packed patches
+    assert packed_grid(64 * 48, aspect=1024 / 768) == (48, 64)
+    assert packed_grid(64 * 64, aspect=1.0) == (64, 64)
+
+
+def test_latents_to_preview_size():
+    latents = torch.randn(1, 32 * 16, 64)
+    preview = latents_to_preview(latents, aspect=2.0)
+    # Packed 16x32 patch grid -> 32x64 latent pixels
+    assert preview.size == (64, 32)
+
+
+def test_callback_emits_and_cancels():
+    events = []
+    cancel_event = threading.Event()
+    callback = PreviewCallback(lambda e, d: events.append((e, d)), 1.0, every=2, total_steps=10,
+                               cancel_event=cancel_event)
+    kwargs = {"latents": torch.randn(1, 16, 64)}
+
+    callback(None, 0, None, kwargs)
+    callback(None, 1, None, kwargs)
+    assert [e for e, _ in events] == ["preview"]
+    assert events[0][1]["step"] == 2
+
+    cancel_event.set()
+    with pytest.raises(GenerationCancelled):
+        callback(None, 2, None, kwargs)
@@ -0,0 +1,56 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from image_service.prompt_cache import PromptEmbeddingCache
+
+
+def make_pipe():
+    pipe = MagicMock()
+    pipe._execution_device = "cpu"
+    pipe.encode_prompt.side_effect = lambda **kwargs: (torch.zeros(1, 4, 8), None)
+    return pipe
+
+
+def test_repeated_prompt_is_encoded_once():
+    cache = PromptEmbeddingCache(max_entries=8)
+    pipe = make_pipe()
+
+    first = cache.pipeline_kwargs(pipe, "model", "a cat", " ")
+    second = cache.pipeline_kwargs(pipe, "model", "a cat", " ")
+
+    assert pipe.encode_prompt.call_count == 2  # prompt + negative prompt
+    assert first["prompt_embeds"] is second["prompt_embeds"]
+    # A missing mask is replaced by an explicit all-ones mask
+    assert first["negative_prompt_embeds_mask"].shape == (1, 4)
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_keys_include_model_and_image():
+    cache = PromptEmbeddingCache(max_entries=8)
+    pipe = make_pipe()
+
+    cache.get_or_encode(pipe, "model-a", "a cat")
+    cache.get_or_encode(pipe, "model-b", "a cat")
+    cache.get_or_encode(pipe, "model-b", "a cat", image=[object()], image_key="abc")
+
+    assert pipe.encode_prompt.call_count == 3
+
+
+def test_lru_eviction():
+    cache = PromptEmbeddingCache(max_entries=2)
+    pipe = make_pipe()
+
+    cache.get_or_encode(pipe, "model", "one")
+    cache.get_or_encode(pipe, "model", "two")
+    cache.get_or_encode(pipe, "model", "one")
+    cache.get_or_encode(pipe, "model", "three")  # evicts "two"
+    cache.get_or_encode(pipe, "model", "one")
+
+    assert cache.stats()["entries"] == 2
+    assert pipe.encode_prompt.call_count == 3
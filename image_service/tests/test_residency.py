@@ -0,0 +1,98 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from image_service import residency
+from image_service.residency import PipelineResidencyManager, PipelineUnavailable
+
+GB = 1024 ** 3
+
+
+def make_pipe():
+    pipe = MagicMock()
+    pipe.components = {"transformer": torch.nn.Linear(4, 4), "vae": torch.nn.Linear(2, 2)}
+    return pipe
+
+
+@pytest.fixture
+def sizes(monkeypatch):
+    """Fake pipeline sizes (total, largest component) and free device memory."""
+    state = {"pipeline": (10 * GB, 6 * GB), "free": 40 * GB, "host": 64 * GB}
+    monkeypatch.setattr(residency, "pipeline_bytes", lambda pipe: state["pipeline"])
+    monkeypatch.setattr(residency, "available_host_bytes", lambda: state["host"])
+    monkeypatch.setattr(torch.cuda, "mem_get_info", lambda *args: (state["free"], 80 * GB))
+    monkeypatch.setattr(torch.cuda, "empty_cache", lambda: None)
+    return state
+
+
+def make_manager(mode="auto"):
+    manager = PipelineResidencyManager("cuda", mode, headroom_bytes=2 * GB)
+    pipes = {"txt2img": make_pipe(), "edit": make_pipe()}
+    for name, pipe in pipes.items():
+        manager.register(name, lambda pipe=pipe: pipe)
+    return manager, pipes
+
+
+def test_unknown_offload_mode_is_rejected():
+    with pytest.raises(ValueError):
+        PipelineResidencyManager("cuda", "sequentail")
+
+
+@pytest.mark.parametrize("free, mode", [(40 * GB, "device"), (9 * GB, "model"), (4 * GB, "sequential")])
+def test_auto_mode_follows_free_memory(sizes, free, mode):
+    sizes["free"] = free
+    manager, pipes = make_manager()
+
+    with manager.use("txt2img"):
+        pass
+
+    assert manager.stats()["pipelines"]["txt2img"] == mode
+    if mode == "device":
+        pipes["txt2img"].to.assert_called_with("cuda")
+    elif mode == "model":
+        pipes["txt2img"].enable_model_cpu_offload.assert_called_once()
+    else:
+        pipes["txt2img"].enable_sequential_cpu_offload.assert_called_once()
+
+
+def test_switching_parks_the_previous_pipeline(sizes):
+    manager, pipes = make_manager()
+
+    with manager.use("txt2img"):
+        pass
+    with manager.use("edit"):
+        pass
+
+    pipes["txt2img"].to.assert_called_with("cpu")
+    assert manager.stats()["pipelines"] == {"txt2img": "host", "edit": "device"}
+    assert manager.stats()["loads"] == 2
+
+    # Switching back reuses the parked pipeline instead of loading it again
+    with manager.use("txt2img"):
+        pass
+    assert manager.stats()["loads"] == 2
+
+
+def test_sequential_pipelines_are_dropped_when_parked(sizes):
+    manager, _ = make_manager("sequential")
+
+    with manager.use("txt2img"):
+        pass
+    with manager.use("edit"):
+        pass
+
+    assert "txt2img" not in manager.stats()["pipelines"]
+
+
+def test_loader_failure_is_reported():
+    manager = PipelineResidencyManager("cpu")
+    manager.register("broken", MagicMock(side_effect=OSError("missing weights")))
+
+    with pytest.raises(PipelineUnavailable):
+        with manager.use("broken"):
+            pass
@@ -0,0 +1,59 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from image_service.result_cache import ResultCache
+
+
+def test_key_is_order_independent():
+    assert ResultCache.make_key(prompt="a", seed=1) == ResultCache.make_key(seed=1, prompt="a")
+    assert ResultCache.make_key(prompt="a", seed=1) != ResultCache.make_key(prompt="a", seed=2)
+
+
+def test_roundtrip_and_persistence(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1024)
+    assert cache.get("k") is None
+
+    cache.put("k", b"png-bytes")
+    assert cache.get("k") == b"png-bytes"
+    assert cache.stats()["hits"] == 1
+
+    # A fresh instance picks the entry up from the index
+    reopened = ResultCache(str(tmp_path), max_bytes=1024)
+    assert reopened.get("k") == b"png-bytes"
+
+
+def test_lru_eviction_by_size(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    cache.get("a")
+    cache.put("c", b"1234")  # over budget, "b" is least recently used
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.get("c") == b"1234"
+    assert not os.path.exists(tmp_path / "b.png")
+
+
+def test_disabled_cache(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=0)
+    cache.put("k", b"data")
+    assert cache.get("k") is None
+
+
+def test_hits_defer_index_writes_until_flush(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1024, flush_interval=3600)
+    cache.put("k", b"png-bytes")
+    index_path = tmp_path / ResultCache.INDEX_NAME
+    written = index_path.stat().st_mtime_ns
+    before = ResultCache(str(tmp_path), max_bytes=1024)._index["k"]["last_access"]
+
+    cache.get("k")
+    assert index_path.stat().st_mtime_ns == written
+
+    cache.flush()
+    flushed = ResultCache(str(tmp_path), max_bytes=1024)._index["k"]["last_access"]
+    assert flushed == cache._index["k"]["last_access"] and flushed >= before
+    assert not cache._dirty
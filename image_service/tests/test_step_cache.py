@@ -0,0 +1,78 @@
+import os
+import sys
+
+import torch
+from torch import nn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from image_service.step_cache import StepCache
+
+
+class TimeEmbed(nn.Module):
+    def forward(self, timestep, hidden_states):
+        return timestep.view(-1, 1).repeat(1, 4)
+
+
+class Block(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def forward(self, hidden_states, encoder_hidden_states, temb):
+        self.calls += 1
+        return encoder_hidden_states, hidden_states + 1
+
+
+class TinyTransformer(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.time_text_embed = TimeEmbed()
+        self.transformer_blocks = nn.ModuleList([Block(), Block()])
+
+    def forward(self, hidden_states, encoder_hidden_states, timestep, guidance=None):
+        temb = self.time_text_embed(timestep, hidden_states)
+        for block in self.transformer_blocks:
+            encoder_hidden_states, hidden_states = block(
+                hidden_states=hidden_states, encoder_hidden_states=encoder_hidden_states, temb=temb
+            )
+        return hidden_states
+
+
+def test_skipped_steps_reuse_block_residual():
+    transformer = TinyTransformer()
+    prompt_embeds = torch.zeros(1, 3)
+    num_steps = 10
+    cache = StepCache(transformer, threshold=0.5, num_steps=num_steps)
+    cache.install()
+
+    outputs = []
+    for step in range(num_steps):
+        timestep = torch.tensor([1.0 - step * 0.01])
+        outputs.append(transformer(
+            hidden_states=torch.zeros(1, 2), encoder_hidden_states=prompt_embeds, timestep=timestep
+        ))
+    cache.remove()
+
+    assert cache.skipped > 0
+    assert cache.computed + cache.skipped == num_steps
+    assert transformer.transformer_blocks[0].calls == cache.computed
+    # Skipped steps add the cached residual of both blocks
+    assert all(torch.equal(out, torch.full((1, 2), 2.0)) for out in outputs)
+    # Original forwards are restored
+    assert "forward" not in transformer.__dict__
+
+
+def test_branches_are_tracked_separately():
+    transformer = TinyTransformer()
+    cache = StepCache(transformer, threshold=0.5, num_steps=10)
+    cache.install()
+    cond, uncond = torch.zeros(1, 3), torch.ones(1, 3)
+    for step in range(4):
+        timestep = torch.tensor([1.0 - step * 0.01])
+        for embeds in (cond, uncond):
+            transformer(hidden_states=torch.zeros(1, 2), encoder_hidden_states=embeds, timestep=timestep)
+    cache.remove()
+
+    assert len(cache.branches) == 0  # cleared on remove
+    assert cache.computed + cache.skipped == 8
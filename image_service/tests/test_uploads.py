@@ -0,0 +1,119 @@
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from image_service.uploads import decode_to_bucket, displayed_size, read_upload
+
+
+class FakeUpload:
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    async def read(self, size=-1):
+        return self._stream.read(size)
+
+
+def jpeg_bytes(size, orientation=None):
+    image = Image.new("RGB", size, color="blue")
+    buffered = io.BytesIO()
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    image.save(buffered, format="JPEG", exif=exif)
+    return buffered.getvalue()
+
+
+def test_read_upload_enforces_limit():
+    data = b"x" * 5000
+    contents, digest = asyncio.run(read_upload(FakeUpload(data), max_bytes=10_000, chunk_size=1024))
+    assert contents == data
+    assert len(digest) == 64
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(read_upload(FakeUpload(data), max_bytes=4096, chunk_size=1024))
+    assert exc.value.status_code == 413
+
+
+def test_decode_downscales_to_bucket():
+    image = decode_to_bucket(jpeg_bytes((4000, 3000)), max_pixels=50_000_000)
+    width, height = image.size
+    assert width % 32 == 0 and height % 32 == 0
+    assert abs(width * height - 1024 * 1024) < 100_000
+    assert width > height
+
+
+def test_decode_applies_exif_rotation():
+    # Stored landscape, displayed portrait
+    image = decode_to_bucket(jpeg_bytes((1600, 1200), orientation=6), max_pixels=50_000_000)
+    assert image.height > image.width
+
+
+def test_decode_rejects_large_and_invalid_images():
+    with pytest.raises(HTTPException) as exc:
+        decode_to_bucket(jpeg_bytes((2000, 2000)), max_pixels=1_000_000)
+    assert exc.value.status_code == 413
+
+    with pytest.raises(HTTPException) as exc:
+        decode_to_bucket(b"not an image", max_pixels=1_000_000)
+    assert exc.value.status_code == 400
+
+
+def test_decode_rejects_truncated_images():
+    buffered = io.BytesIO()
+    Image.effect_noise((512, 512), 64).convert("RGB").save(buffered, format="PNG")
+    truncated = buffered.getvalue()[:len(buffered.getvalue()) // 2]
+
+    with pytest.raises(HTTPException) as exc:
+        decode_to_bucket(truncated, max_pixels=1_000_000)
+    assert exc.value.status_code == 400
+
+    with pytest.raises(HTTPException) as exc:
+        displayed_size(truncated)
+    assert exc.value.status_code == 400
+
+
+def test_region_crop_and_blend():
+    from image_service.regions import blend_mask, context_box, mask_bbox, paste_region
+
+    canvas = Image.new("RGB", (1024, 768), color="black")
+    mask = Image.new("L", canvas.size, 0)
+    mask.paste(255, (500, 300, 600, 380))
+    region = mask_bbox(mask)
+    assert region == (500, 300, 600, 380)
+
+    crop_box = context_box(region, canvas.size, padding_ratio=0.25, min_padding=64)
+    x0, y0, x1, y1 = crop_box
+    assert x0 <= 436 and y0 <= 236 and x1 >= 664 and y1 >= 444
+    assert (x1 - x0) % 32 == 0 and (y1 - y0) % 32 == 0
+    assert x1 <= 1024 and y1 <= 768
+
+    edited = Image.new("RGB", (x1 - x0, y1 - y0), color="white")
+    result = paste_region(canvas, edited, crop_box, blend_mask(crop_box, region, 8, mask=mask))
+    assert result.getpixel((550, 340)) == (255, 255, 255)
+    assert result.getpixel((x0 + 1, y0 + 1)) == (0, 0, 0)
+    assert result.getpixel((10, 10)) == (0, 0, 0)
+
+
+def test_bbox_is_clamped_and_scaled_to_the_canvas():
+    from image_service.regions import parse_bbox
+
+    # Upload 2000x1000 shown on a 1024x512 canvas; the box runs past the right edge
+    assert parse_bbox("1000,250,2600,750", (2000, 1000), (1024, 512)) == (512, 128, 1024, 384)
+    assert parse_bbox("-50,-50,100,100", (2000, 1000), (1024, 512)) == (0, 0, 52, 52)
+
+
+@pytest.mark.parametrize("bbox", ["10,10,5,20", "10,10,10,20", "1,2,3", "a,b,c,d", "nan,0,10,10", "0,0,inf,10",
+                                  "2100,0,2200,100", "0,-200,100,-100"])
+def test_invalid_bbox_is_rejected(bbox):
+    from image_service.regions import parse_bbox
+
+    with pytest.raises(HTTPException) as error:
+        parse_bbox(bbox, (2000, 1000), (1024, 512))
+    assert error.value.status_code == 400
@@ -0,0 +1,52 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from image_service.vae_memory import vae_tiling_for
+
+MIN_PIXELS = 1536 * 1536
+
+
+def test_small_requests_keep_single_pass_vae():
+    pipe = MagicMock()
+
+    with vae_tiling_for(pipe, 1024, 1024, MIN_PIXELS, 512, 448) as enabled:
+        assert not enabled
+
+    pipe.vae.enable_tiling.assert_not_called()
+    pipe.vae.enable_slicing.assert_not_called()
+    pipe.vae.disable_tiling.assert_not_called()
+
+
+def test_large_requests_tile_for_the_call_only():
+    pipe = MagicMock()
+
+    # The threshold is inclusive and compares the pixel count, not each side
+    with vae_tiling_for(pipe, 2048, 1152, MIN_PIXELS, 512, 448) as enabled:
+        assert enabled
+        pipe.vae.enable_tiling.assert_called_once_with(
+            tile_sample_min_height=512,
+            tile_sample_min_width=512,
+            tile_sample_stride_height=448,
+            tile_sample_stride_width=448,
+        )
+        pipe.vae.enable_slicing.assert_called_once()
+        pipe.vae.disable_tiling.assert_not_called()
+
+    pipe.vae.disable_tiling.assert_called_once()
+    pipe.vae.disable_slicing.assert_called_once()
+
+
+def test_tiling_is_disabled_when_the_call_fails():
+    pipe = MagicMock()
+
+    with pytest.raises(RuntimeError):
+        with vae_tiling_for(pipe, 1536, 1536, MIN_PIXELS, 512, 448):
+            raise RuntimeError("out of memory")
+
+    pipe.vae.disable_tiling.assert_called_once()
+    pipe.vae.disable_slicing.assert_called_once()
@@ -0,0 +1,122 @@
+import hashlib
+import io
+
+from diffusers.pipelines.qwenimage.pipeline_qwenimage_edit_plus import VAE_IMAGE_SIZE, calculate_dimensions
+from fastapi import HTTPException, UploadFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+EXIF_ORIENTATION = 0x0112
+# EXIF orientations that swap width and height (90/270 degree rotations)
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+async def read_upload(file: UploadFile, max_bytes: int, chunk_size: int = 1024 * 1024):
+    """
+    Read an upload in chunks, hashing as we go and rejecting it with 413 once it
+    exceeds `max_bytes`. Returns (contents, sha256 hex digest).
+
+    FastAPI has already spooled the whole multipart body (to memory, then to a
+    temp file) before the endpoint runs, so this bounds what is held and decoded
+    here, not what the client can send; limit request bodies at the proxy.
+    """
+    digest = hashlib.sha256()
+    chunks = []
+    total = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit.",
+            )
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
+
+
+def bucket_size(width: int, height: int, target_area: int = VAE_IMAGE_SIZE):
+    """Native resolution bucket of the edit pipeline for an image of this aspect ratio."""
+    return calculate_dimensions(target_area, width / height)
+
+
+def is_rotated(image: Image.Image) -> bool:
+    """
+    Whether the EXIF orientation swaps width and height. PNG EXIF can follow the
+    pixel data, so PIL may read the whole file here; truncated uploads get a 400.
+    """
+    try:
+        return image.getexif().get(EXIF_ORIENTATION, 1) in ROTATED_ORIENTATIONS
+    except OSError as e:
+        raise HTTPException(status_code=400, detail=f"Uploaded image could not be decoded: {e}")
+
+
+def displayed_size(contents: bytes):
+    """(width, height) of an encoded image as displayed, i.e. after EXIF rotation."""
+    with Image.open(io.BytesIO(contents)) as image:
+        width, height = image.size
+        if is_rotated(image):
+            return height, width
+        return width, height
+
+
+def decode_to_bucket(contents: bytes, max_pixels: int, target_area: int = VAE_IMAGE_SIZE,
+                     upscale: bool = True) -> Image.Image:
+    """
+    Decode uploaded image bytes straight to the pipeline's resolution bucket.
+
+    Only the header is parsed before the pixel-count check, so oversized images are
+    rejected without being decoded. JPEGs are decoded with libjpeg's DCT scaling
+    (draft mode) at the smallest 1/2, 1/4 or 1/8 scale that still covers the
+    bucket, EXIF orientation is applied, and the result is resized to the bucket.
+    With `upscale=False` images smaller than `target_area` keep their own size
+    (snapped to the bucket grid).
+    """
+    try:
+        image = Image.open(io.BytesIO(contents))
+    except Image.DecompressionBombError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a supported image.")
+
+    width, height = image.size
+    if width * height > max_pixels:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image has {width * height} pixels, the limit is {max_pixels}.",
+        )
+
+    rotated = is_rotated(image)
+    if rotated:
+        width, height = height, width
+    if not upscale:
+        target_area = min(target_area, width * height)
+    target_width, target_height = bucket_size(width, height, target_area)
+
+    try:
+        # Draft sizes are in stored (pre-rotation) orientation
+        image.draft("RGB", (target_height, target_width) if rotated else (target_width, target_height))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+        if image.size != (target_width, target_height):
+            image = image.resize((target_width, target_height), Image.LANCZOS, reducing_gap=3.0)
+    except OSError as e:
+        # Truncated or corrupt pixel data only shows up when decoding
+        raise HTTPException(status_code=400, detail=f"Uploaded image could not be decoded: {e}")
+    return image
+
+
+def decode_mask(contents: bytes, size, max_pixels: int) -> Image.Image:
+    """Decode an edit mask to an L-mode image of `size` (white = edit)."""
+    try:
+        mask = Image.open(io.BytesIO(contents))
+    except (Image.DecompressionBombError, UnidentifiedImageError):
+        raise HTTPException(status_code=400, detail="Mask is not a supported image.")
+    if mask.width * mask.height > max_pixels:
+        raise HTTPException(status_code=413, detail="Mask image is too large.")
+    try:
+        return ImageOps.exif_transpose(mask).convert("L").resize(size, Image.BILINEAR)
+    except OSError as e:
+        raise HTTPException(status_code=400, detail=f"Mask could not be decoded: {e}")
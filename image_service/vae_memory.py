@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+
+import torch
+
+
+@contextmanager
+def vae_tiling_for(pipe, width: int, height: int, min_pixels: int, tile_size: int, tile_stride: int):
+    """
+    Enable tiled (and sliced) VAE encode/decode for one pipeline call when the
+    requested output reaches `min_pixels`.
+
+    The Qwen-Image VAE decodes overlapping `tile_size` tiles every `tile_stride`
+    pixels and blends the overlaps linearly, so peak memory is bounded by the tile
+    instead of the full image. Smaller requests keep the faster single-pass path.
+    Yields whether tiling was enabled.
+    """
+    vae = pipe.vae
+    enabled = width * height >= min_pixels
+    if enabled:
+        vae.enable_tiling(
+            tile_sample_min_height=tile_size,
+            tile_sample_min_width=tile_size,
+            tile_sample_stride_height=tile_stride,
+            tile_sample_stride_width=tile_stride,
+        )
+        vae.enable_slicing()
+    try:
+        yield enabled
+    finally:
+        if enabled:
+            vae.disable_tiling()
+            vae.disable_slicing()
+
+
+class PeakMemory:
+    """Measure peak allocated device memory (in MiB) over a block; None on CPU."""
+
+    def __init__(self):
+        self.peak_mb = None
+
+    def __enter__(self):
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+            self.peak_mb = round(torch.cuda.max_memory_allocated() / 2 ** 20, 1)
+        return False
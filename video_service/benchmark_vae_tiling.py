@@ -0,0 +1,75 @@
+"""
+Benchmark tiled against single-pass VAE decode.
+
+Decodes random latents of each requested size with VAE tiling off and on and
+reports wall time and peak GPU memory. Single-pass decodes that run out of
+memory are reported as OOM, which is the case tiling exists for.
+
+Usage (from the repository root):
+    python -m video_service.benchmark_vae_tiling --sizes 768x512,1280x720,1920x1088 --frames 121
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import torch
+
+from .conditioning import parse_buckets
+from .config import settings
+from .main import load_model, video_pipes
+from .memory import PeakGPUMemory
+from .vae_tiling import vae_tiling_for
+
+# LTX-2 VAE compression: 32x spatially, 8x temporally
+SPATIAL_COMPRESSION = 32
+TEMPORAL_COMPRESSION = 8
+
+
+def decode(vae, latents, tiled: bool, device: str):
+    with PeakGPUMemory(device) as peak, vae_tiling_for(
+        # vae_tiling_for takes a pipeline; wrap the bare VAE as one
+        SimpleNamespace(vae=vae), tiled, settings.VAE_TILE_SIZE, settings.VAE_TILE_STRIDE,
+        settings.VAE_TILE_FRAMES, settings.VAE_TILE_FRAME_STRIDE,
+    ), torch.inference_mode():
+        start = time.perf_counter()
+        vae.decode(latents, return_dict=False)
+        if device.startswith("cuda"):
+            torch.cuda.synchronize(device)
+        elapsed = time.perf_counter() - start
+    return elapsed, peak.peak_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="768x512,1280x720,1920x1088")
+    parser.add_argument("--frames", type=int, default=121)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    device = settings.DEVICE
+    load_model(device)
+    vae = video_pipes[device].vae
+    channels = getattr(vae.config, "latent_channels", 128)
+    generator = torch.Generator(device=device).manual_seed(args.seed)
+
+    print(f"{'size':<11} {'frames':>6} {'tiling':>6} {'time (s)':>9} {'peak MB':>9}")
+    for width, height in parse_buckets(args.sizes):
+        shape = (
+            1, channels, (args.frames - 1) // TEMPORAL_COMPRESSION + 1,
+            height // SPATIAL_COMPRESSION, width // SPATIAL_COMPRESSION,
+        )
+        latents = torch.randn(shape, generator=generator, device=device, dtype=vae.dtype)
+        for tiled in (False, True):
+            label = "on" if tiled else "off"
+            try:
+                elapsed, peak_mb = decode(vae, latents, tiled, device)
+            except torch.cuda.OutOfMemoryError:
+                torch.cuda.empty_cache()
+                print(f"{width}x{height:<6} {args.frames:>6} {label:>6} {'OOM':>9} {'-':>9}")
+                continue
+            print(f"{width}x{height:<6} {args.frames:>6} {label:>6} {elapsed:>9.2f} {peak_mb or 0:>9.1f}")
+        del latents
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import io
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+EXIF_ORIENTATION = 0x0112
+# EXIF orientations that swap width and height (90/270 degree rotations)
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+# LTX-2 frame counts are 8k + 1
+FRAME_MULTIPLE = 8
+
+
+def parse_buckets(value: str):
+    """Parse "768x512,512x768" into [(768, 512), (512, 768)]."""
+    buckets = []
+    for part in value.split(","):
+        part = part.strip().lower()
+        if part:
+            width, _, height = part.partition("x")
+            buckets.append((int(width), int(height)))
+    return buckets
+
+
+def snap(value: int, multiple: int) -> int:
+    return max(multiple, int(round(value / multiple)) * multiple)
+
+
+def snap_num_frames(num_frames: int) -> int:
+    """Nearest valid frame count (8k + 1, at least 9)."""
+    return max(1, int(round((num_frames - 1) / FRAME_MULTIPLE))) * FRAME_MULTIPLE + 1
+
+
+def nearest_bucket(width: int, height: int, buckets):
+    """Bucket whose aspect ratio is closest to width / height (ties: closest area)."""
+    aspect = width / height
+    return min(buckets, key=lambda bucket: (abs(bucket[0] / bucket[1] - aspect), abs(bucket[0] * bucket[1] - width * height)))
+
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """Read a conditioning image upload; 413 if it is larger than `max_bytes`."""
+    # One byte past the limit is enough to reject it
+    contents = await file.read(max_bytes + 1)
+    if len(contents) > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit.",
+        )
+    return contents
+
+
+def open_image(contents: bytes, max_pixels: int) -> Image.Image:
+    """Open an upload lazily (header only) and reject it if it has too many pixels."""
+    try:
+        image = Image.open(io.BytesIO(contents))
+    except Image.DecompressionBombError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a supported image.")
+    if image.width * image.height > max_pixels:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image has {image.width * image.height} pixels, the limit is {max_pixels}.",
+        )
+    return image
+
+
+def displayed_size(image: Image.Image):
+    """(width, height) as displayed, i.e. after EXIF rotation."""
+    try:
+        # PNG EXIF can follow the pixel data, so this may read the whole file
+        rotated = image.getexif().get(EXIF_ORIENTATION, 1) in ROTATED_ORIENTATIONS
+    except OSError as e:
+        raise HTTPException(status_code=400, detail=f"Uploaded image could not be decoded: {e}")
+    if rotated:
+        return image.height, image.width
+    return image.width, image.height
+
+
+def prepare_conditioning_image(image: Image.Image, width: int, height: int) -> Image.Image:
+    """
+    Decode an opened upload to exactly (width, height): JPEGs are decoded at the
+    smallest DCT scale that still covers the target, EXIF orientation is applied,
+    and the image is center-cropped to the target aspect ratio and resized, so the
+    pipeline receives its conditioning frame at the generation size.
+    """
+    source_width, source_height = displayed_size(image)
+    # Smallest size covering the target once cropped to its aspect ratio
+    scale = max(width / source_width, height / source_height)
+    cover = (int(source_width * scale) + 1, int(source_height * scale) + 1)
+    rotated = (source_width, source_height) != image.size
+    try:
+        image.draft("RGB", (cover[1], cover[0]) if rotated else cover)
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        return ImageOps.fit(image, (width, height), Image.LANCZOS, centering=(0.5, 0.5))
+    except OSError as e:
+        # Truncated or corrupt pixel data only shows up when decoding
+        raise HTTPException(status_code=400, detail=f"Uploaded image could not be decoded: {e}")
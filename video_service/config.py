@@ -15,6 +15,53 @@ class Settings(BaseSettings):
     DEFAULT_HEIGHT: int = 512
     DEFAULT_NUM_FRAMES: int = 121 # ~5 seconds at 24fps
     DEFAULT_FPS: int = 24
+
+    # Sizes are snapped to this multiple (stage 1 of the two-stage pipeline runs at
+    # half resolution, which must itself be a multiple of 32) and bounded per side
+    RESOLUTION_MULTIPLE: int = int(os.environ.get("VIDEO_RESOLUTION_MULTIPLE", 64))
+    MIN_SIDE: int = int(os.environ.get("VIDEO_MIN_SIDE", 256))
+    MAX_SIDE: int = int(os.environ.get("VIDEO_MAX_SIDE", 1920))
+    # Sizes used when a request leaves width/height unset, warmed up at startup on GPU
+    RESOLUTION_BUCKETS: str = os.environ.get("VIDEO_RESOLUTION_BUCKETS", "768x512,512x768,640x640,1024x576,576x1024")
+    WARMUP_BUCKETS: bool = os.environ.get("VIDEO_WARMUP_BUCKETS", "true").lower() == "true"
+
+    # Conditioning image uploads
+    MAX_UPLOAD_BYTES: int = int(os.environ.get("VIDEO_MAX_UPLOAD_MB", 25)) * 1024 * 1024
+    MAX_INPUT_PIXELS: int = int(os.environ.get("VIDEO_MAX_INPUT_PIXELS", 100_000_000))
+
+    # Long videos: clips over one window are generated as overlapping windows
+    LONG_VIDEO_WINDOW_FRAMES: int = int(os.environ.get("VIDEO_LONG_WINDOW_FRAMES", 121))
+    LONG_VIDEO_OVERLAP_FRAMES: int = int(os.environ.get("VIDEO_LONG_OVERLAP_FRAMES", 17))
+    MAX_NUM_FRAMES: int = int(os.environ.get("VIDEO_MAX_NUM_FRAMES", 1441)) # 60 seconds at 24fps
+
+    # Tiled VAE decode: spatial tiles of VAE_TILE_SIZE px every VAE_TILE_STRIDE px and
+    # temporal tiles of VAE_TILE_FRAMES frames every VAE_TILE_FRAME_STRIDE frames. In
+    # "auto" mode tiling is used when VAE_DECODE_BYTES_PER_PIXEL x width x height x
+    # frames plus headroom exceeds the device's free memory
+    VAE_TILE_SIZE: int = int(os.environ.get("VIDEO_VAE_TILE_SIZE", 512))
+    VAE_TILE_STRIDE: int = int(os.environ.get("VIDEO_VAE_TILE_STRIDE", 448))
+    VAE_TILE_FRAMES: int = int(os.environ.get("VIDEO_VAE_TILE_FRAMES", 16))
+    VAE_TILE_FRAME_STRIDE: int = int(os.environ.get("VIDEO_VAE_TILE_FRAME_STRIDE", 8))
+    VAE_DECODE_BYTES_PER_PIXEL: int = int(os.environ.get("VIDEO_VAE_DECODE_BYTES_PER_PIXEL", 256))
+    VAE_HEADROOM_BYTES: int = int(float(os.environ.get("VIDEO_VAE_HEADROOM_GB", 2)) * 1024 ** 3)
+
+    # H.264 encode settings of the MP4 output
+    ENCODE_CRF: int = int(os.environ.get("VIDEO_ENCODE_CRF", 18))
+    ENCODE_PRESET: str = os.environ.get("VIDEO_ENCODE_PRESET", "veryfast")
+
+    # How long a job in stage_1_preview=confirm mode waits for a decision, and what it
+    # does when none arrives ("proceed" or "skip"). The device's worker is held
+    # meanwhile, so every other job on that device waits as well.
+    STAGE_2_DECISION_TIMEOUT: float = float(os.environ.get("VIDEO_STAGE_2_DECISION_TIMEOUT", 30))
+    STAGE_2_DEFAULT_ACTION: str = os.environ.get("VIDEO_STAGE_2_DEFAULT_ACTION", "skip")
+
+    # Job queue: SQLite job table plus job inputs and results
+    # Anchored to this package, not the working directory
+    JOBS_DIR: str = os.environ.get("VIDEO_JOBS_DIR", os.path.join(os.path.dirname(__file__), "outputs", "jobs"))
+    # Comma separated devices, one worker and pipeline each (defaults to DEVICE)
+    DEVICES: str = os.environ.get("VIDEO_DEVICES", "")
+    # Finished jobs and their results are deleted after this many hours
+    JOB_RETENTION_HOURS: float = float(os.environ.get("VIDEO_JOB_RETENTION_HOURS", 24))
     
     class Config:
         env_file = "../.env"
@@ -0,0 +1,138 @@
+import os
+import re
+
+import av
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+# Fragmented MP4: an empty moov up front, then a moof/mdat pair per keyframe, so
+# every byte written is final and the file is playable while it is being written
+FRAGMENTED_MOVFLAGS = "frag_keyframe+empty_moov+default_base_moof"
+
+RESPONSE_FORMATS = ("json", "binary")
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def to_rgb_array(frame) -> np.ndarray:
+    """(H, W, 3) uint8 view of a pipeline frame (PIL image, uint8 array or float array in [0, 1])."""
+    array = np.asarray(frame)
+    if array.dtype != np.uint8:
+        array = (np.clip(array, 0.0, 1.0) * 255).round().astype(np.uint8)
+    if array.ndim == 3 and array.shape[2] == 4:
+        array = array[..., :3]
+    return np.ascontiguousarray(array)
+
+
+class FragmentedMP4Writer:
+    """
+    H.264 encoder writing fragmented MP4 to a binary file object as frames arrive,
+    without staging the clip in a temp file. Frames are encoded one at a time, so
+    the only extra memory is the encoder's lookahead.
+    """
+
+    def __init__(self, sink, fps: int, crf: int = 18, preset: str = "veryfast"):
+        self.container = av.open(sink, mode="w", format="mp4", options={"movflags": FRAGMENTED_MOVFLAGS})
+        self.fps = fps
+        self.crf = crf
+        self.preset = preset
+        self.stream = None
+        self.frames = 0
+
+    def _add_stream(self, width: int, height: int):
+        self.stream = self.container.add_stream("libx264", rate=self.fps)
+        # yuv420p needs even dimensions
+        self.stream.width = width - width % 2
+        self.stream.height = height - height % 2
+        self.stream.pix_fmt = "yuv420p"
+        # One keyframe, and so one fragment, per second
+        self.stream.codec_context.gop_size = self.fps
+        self.stream.options = {"crf": str(self.crf), "preset": self.preset}
+
+    def write(self, frame):
+        array = to_rgb_array(frame)
+        if self.stream is None:
+            # Sized by the first frame, which is the pipeline's actual output size
+            self._add_stream(array.shape[1], array.shape[0])
+        array = array[: self.stream.height, : self.stream.width]
+        video_frame = av.VideoFrame.from_ndarray(array, format="rgb24")
+        for packet in self.stream.encode(video_frame):
+            self.container.mux(packet)
+        self.frames += 1
+
+    def close(self):
+        if self.stream is not None:
+            for packet in self.stream.encode():
+                self.container.mux(packet)
+        self.container.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.container.close()
+
+
+def check_response_format(response_format: str):
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown response format '{response_format}'. Choose from {list(RESPONSE_FORMATS)}.",
+        )
+
+
+def parse_range(range_header: str, size: int):
+    """(start, end) inclusive byte range of a single-range Range header, or None for the whole file."""
+    if not range_header:
+        return None
+    match = RANGE_PATTERN.match(range_header.strip())
+    if match is None:
+        raise HTTPException(status_code=416, detail="Only single byte ranges are supported.",
+                            headers={"Content-Range": f"bytes */{size}"})
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    elif last:
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start, end = 0, size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable.",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def video_file_response(path: str, range_header: str = None, filename: str = None,
+                        chunk_size: int = 1024 * 1024) -> Response:
+    """
+    Stream an MP4 from disk in chunks, honouring a Range request (206) so players
+    can seek and clients can resume downloads.
+    """
+    size = os.path.getsize(path)
+    byte_range = parse_range(range_header, size)
+    start, end = byte_range or (0, size - 1)
+
+    def chunks():
+        with open(path, "rb") as video_file:
+            video_file.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = video_file.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1)}
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        chunks(), status_code=206 if byte_range is not None else 200, media_type="video/mp4", headers=headers
+    )
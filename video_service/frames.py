@@ -0,0 +1,50 @@
+import io
+
+import numpy as np
+import torch
+from PIL import Image
+
+
+def frames_to_array(frames) -> np.ndarray:
+    """
+    Convert pipeline output to one contiguous uint8 array of shape (T, H, W, 3).
+
+    This is the only conversion: the encoder, thumbnail and preview stages all take
+    views into the returned array. Tensors are scaled and cast to uint8 on their own
+    device, so only the uint8 frames cross to host memory. A list of frames (PIL
+    images or arrays) is copied frame by frame into a preallocated buffer.
+    """
+    if isinstance(frames, torch.Tensor):
+        video = frames[0] if frames.ndim == 5 else frames
+        # (T, C, H, W) -> (T, H, W, C)
+        if video.shape[1] in (3, 4) and video.shape[-1] not in (3, 4):
+            video = video.permute(0, 2, 3, 1)
+        if video.dtype != torch.uint8:
+            video = video.float().clamp_(0, 1).mul_(255).round_().to(torch.uint8)
+        return np.ascontiguousarray(video[..., :3].cpu().numpy())
+
+    if isinstance(frames, np.ndarray):
+        video = frames[0] if frames.ndim == 5 else frames
+        if video.dtype != np.uint8:
+            video = (np.clip(video, 0.0, 1.0) * 255).round().astype(np.uint8)
+        return np.ascontiguousarray(video[..., :3])
+
+    first = np.asarray(frames[0])
+    height, width = first.shape[:2]
+    buffer = np.empty((len(frames), height, width, 3), dtype=np.uint8)
+    for index, frame in enumerate(frames):
+        frame = np.asarray(frame.convert("RGB") if isinstance(frame, Image.Image) and frame.mode != "RGB" else frame)
+        if frame.dtype != np.uint8:
+            frame = (np.clip(frame, 0.0, 1.0) * 255).round().astype(np.uint8)
+        buffer[index] = frame[..., :3]
+    return buffer
+
+
+def thumbnail_jpeg(video: np.ndarray, max_side: int = 320, quality: int = 85) -> bytes:
+    """JPEG thumbnail of the first frame of a (T, H, W, 3) uint8 video."""
+    # fromarray wraps the frame view without copying it
+    image = Image.fromarray(video[0])
+    image.thumbnail((max_side, max_side), Image.BILINEAR)
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
@@ -0,0 +1,387 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+# Share of a job's overall progress taken by each stage, in order
+STAGE_WEIGHTS = {"stage_1": 0.75, "stage_2": 0.2, "encode": 0.05}
+
+COLUMNS = (
+    "id", "kind", "status", "priority", "params", "input_path", "result_path", "device",
+    "stage", "stage_progress", "progress", "error", "metadata", "created_at", "started_at", "finished_at",
+)
+# Columns stored as JSON text
+JSON_COLUMNS = ("params", "metadata")
+
+
+class JobCancelled(Exception):
+    """Raised from the step callback to stop a running job that was cancelled."""
+
+
+class JobStore:
+    """
+    SQLite job table. Every state change is written through, so queued jobs and
+    finished results survive a restart of the service.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, status TEXT, priority INTEGER, params TEXT, "
+                "input_path TEXT, result_path TEXT, device TEXT, stage TEXT, "
+                "stage_progress REAL, progress REAL, error TEXT, metadata TEXT, "
+                "created_at REAL, started_at REAL, finished_at REAL)"
+            )
+            # Tables created by older versions lack the newer columns
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column in COLUMNS:
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+
+    @staticmethod
+    def _row(row) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        for column in JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] is not None else None
+        return job
+
+    def insert(self, job: dict):
+        values = [json.dumps(job.get(column)) if column in JSON_COLUMNS else job.get(column) for column in COLUMNS]
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                values,
+            )
+
+    def update(self, job_id: str, **fields):
+        fields = {
+            column: json.dumps(value) if column in JSON_COLUMNS else value for column, value in fields.items()
+        }
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._row(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, status: str = None, limit: int = 100) -> List[dict]:
+        query, args = "SELECT * FROM jobs", []
+        if status:
+            query, args = query + " WHERE status = ?", [status]
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY created_at DESC LIMIT ?", [*args, limit]).fetchall()
+        return [self._row(row) for row in rows]
+
+    def unfinished(self) -> List[dict]:
+        """Queued and interrupted jobs, in the order they should run."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY priority DESC, created_at",
+                (QUEUED, RUNNING),
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def finished_before(self, timestamp: float) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED))}) AND finished_at < ?",
+                (*FINISHED, timestamp),
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def delete(self, job_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+class JobProgress:
+    """
+    Progress reporter handed to the job runner. Tracks the current stage and its
+    step fraction, writes both (and the weighted overall percentage) to the job
+    table, and raises JobCancelled at the next step once the job is cancelled.
+    Anything the runner puts in `metadata` is stored with the finished job, or
+    right away with `publish`.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, cancel_event: threading.Event):
+        self.store = store
+        self.job_id = job_id
+        self.cancel_event = cancel_event
+        self.stage = None
+        self.stage_steps = None
+        self.metadata = {}
+        self.window = (0, 1)
+        self._last_step = -1
+        self._decision = None
+        self._decided = threading.Event()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def set_stage(self, stage: str, total_steps: int = None, fraction: float = 0.0):
+        self.check_cancelled()
+        self.stage = stage
+        self.stage_steps = total_steps
+        self._last_step = -1
+        self._report(fraction)
+
+    def set_window(self, index: int, count: int):
+        """For jobs generated in several windows: overall progress spans all of them."""
+        self.window = (index, count)
+        self.publish(window=index + 1, windows=count)
+
+    def _report(self, fraction: float):
+        stages = list(STAGE_WEIGHTS)
+        done = sum(STAGE_WEIGHTS[name] for name in stages[:stages.index(self.stage)]) if self.stage in stages else 0.0
+        index, count = self.window
+        overall = (index + done + STAGE_WEIGHTS.get(self.stage, 0.0) * fraction) / count
+        self.store.update(
+            self.job_id,
+            stage=self.stage,
+            stage_progress=round(100 * fraction, 1),
+            progress=round(100 * overall, 1),
+        )
+
+    def publish(self, **metadata):
+        """Store metadata on the job while it is still running."""
+        self.metadata.update(metadata)
+        self.store.update(self.job_id, metadata=self.metadata)
+
+    def decide(self, action: str):
+        self._decision = action
+        self._decided.set()
+
+    def await_decision(self, timeout: float, default: str) -> str:
+        """
+        Block the job until the client calls `JobManager.decide` (or the job is
+        cancelled); after `timeout` seconds without an answer, `default` is used.
+        """
+        self.publish(awaiting_decision=True)
+        deadline = time.monotonic() + timeout
+        while not self._decided.wait(min(0.5, max(0.0, deadline - time.monotonic()))):
+            self.check_cancelled()
+            if time.monotonic() >= deadline:
+                self._decision = default
+                break
+        self.publish(awaiting_decision=False)
+        return self._decision
+
+    def on_step_end(self, pipe, step: int, timestep, callback_kwargs: dict):
+        """
+        `callback_on_step_end` hook. The two-stage pipeline runs both denoising
+        loops in one call; the first step after the last stage-1 step (or the step
+        index starting over) marks the switch to stage 2.
+        """
+        stage_1_done = self.stage_steps is not None and self._last_step >= self.stage_steps - 1
+        if self.stage == "stage_1" and (step < self._last_step or stage_1_done):
+            self.stage, self.stage_steps = "stage_2", None
+        self._last_step = step
+        total = getattr(pipe, "num_timesteps", None) or self.stage_steps or (step + 1)
+        self._report(min(1.0, (step + 1) / total))
+        self.check_cancelled()
+        return callback_kwargs
+
+
+class JobManager:
+    """
+    Priority queue of video jobs served by one worker thread per device.
+
+    Higher `priority` runs first, ties in submission order. `runner(job, device,
+    progress)` does the actual work and returns the result path. Jobs left queued
+    or running when the service stopped are queued again on `start()`.
+    """
+
+    def __init__(self, store: JobStore, runner: Callable, devices: List[str]):
+        self.store = store
+        self.runner = runner
+        self.devices = devices
+        self._heap = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._cancel_events = {}
+        self._running = {}
+        self._stopping = False
+
+    def start(self):
+        recovered = self.store.unfinished()
+        for job in recovered:
+            self.store.update(job["id"], status=QUEUED, device=None, stage=None, stage_progress=0.0, progress=0.0)
+            self._push(job)
+        if recovered:
+            print(f"Requeued {len(recovered)} unfinished video jobs")
+        self._stopping = False
+        for device in self.devices:
+            threading.Thread(target=self._worker, args=(device,), name=f"video-worker-{device}", daemon=True).start()
+
+    def stop(self):
+        # Running jobs stay marked as running and are requeued on the next start
+        with self._cond:
+            self._stopping = True
+            for event in self._cancel_events.values():
+                event.set()
+            self._cond.notify_all()
+
+    def _push(self, job: dict):
+        with self._cond:
+            heapq.heappush(self._heap, (-job["priority"], next(self._order), job["id"]))
+            self._cond.notify()
+
+    def submit(self, kind: str, params: dict, priority: int = 0, input_path: str = None,
+               job_id: str = None) -> dict:
+        job = {
+            "id": job_id or str(uuid.uuid4()),
+            "kind": kind,
+            "status": QUEUED,
+            "priority": priority,
+            "params": params,
+            "input_path": input_path,
+            "stage_progress": 0.0,
+            "progress": 0.0,
+            "created_at": time.time(),
+        }
+        self.store.insert(job)
+        self._push(job)
+        return self.status(job["id"])
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position among queued jobs, or None if the job is not queued."""
+        with self._cond:
+            queued = [entry[2] for entry in sorted(self._heap)]
+        return queued.index(job_id) + 1 if job_id in queued else None
+
+    def status(self, job_id: str) -> Optional[dict]:
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        job["queue_position"] = self.queue_position(job_id) if job["status"] == QUEUED else None
+        return job
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        with self._cond:
+            event = self._cancel_events.get(job_id)
+            if event is not None:
+                # Running: stopped at its next denoising step
+                event.set()
+            elif job["status"] == QUEUED:
+                self._heap = [entry for entry in self._heap if entry[2] != job_id]
+                heapq.heapify(self._heap)
+                self._finish(job, CANCELLED)
+        return self.status(job_id)
+
+    def decide(self, job_id: str, action: str) -> bool:
+        """Pass a client decision to a running job waiting for one."""
+        with self._cond:
+            progress = self._running.get(job_id)
+        if progress is None or not progress.metadata.get("awaiting_decision"):
+            return False
+        progress.decide(action)
+        return True
+
+    def _finish(self, job: dict, status: str, **fields):
+        self.store.update(job["id"], status=status, finished_at=time.time(), **fields)
+        if job.get("input_path") and os.path.exists(job["input_path"]):
+            os.remove(job["input_path"])
+
+    def _next(self) -> Optional[str]:
+        with self._cond:
+            while not self._heap and not self._stopping:
+                self._cond.wait()
+            if self._stopping:
+                return None
+            job_id = heapq.heappop(self._heap)[2]
+            self._cancel_events[job_id] = threading.Event()
+            return job_id
+
+    def _worker(self, device: str):
+        while True:
+            job_id = self._next()
+            if job_id is None:
+                return
+            try:
+                self._run(job_id, device)
+            finally:
+                with self._cond:
+                    self._cancel_events.pop(job_id, None)
+                    self._running.pop(job_id, None)
+
+    def _run(self, job_id: str, device: str):
+        job = self.store.get(job_id)
+        if job is None or job["status"] != QUEUED:
+            return
+        self.store.update(job_id, status=RUNNING, device=device, started_at=time.time())
+        progress = JobProgress(self.store, job_id, self._cancel_events[job_id])
+        with self._cond:
+            self._running[job_id] = progress
+        start = time.perf_counter()
+        try:
+            result_path = self.runner(job, device, progress)
+        except JobCancelled:
+            if self._stopping:
+                return
+            self._finish(job, CANCELLED, metadata=progress.metadata)
+            print(f"Video job {job_id} cancelled")
+        except Exception as e:
+            print(f"Video job {job_id} failed: {e}")
+            self._finish(job, FAILED, error=str(e), metadata=progress.metadata)
+        else:
+            self._finish(
+                job, COMPLETED, result_path=result_path, stage_progress=100.0, progress=100.0,
+                metadata=progress.metadata,
+            )
+            print(f"Video job {job_id} completed on {device} in {time.perf_counter() - start:.1f}s")
+
+    async def wait(self, job_id: str, poll_interval: float = 0.5) -> dict:
+        """Wait (without blocking the event loop) until a job has finished."""
+        while True:
+            job = self.store.get(job_id)
+            if job is None or job["status"] in FINISHED:
+                return job
+            await asyncio.sleep(poll_interval)
+
+    def purge(self, retention_seconds: float):
+        """Delete finished jobs, and their files, older than the retention window."""
+        expired = self.store.finished_before(time.time() - retention_seconds)
+        for job in expired:
+            metadata = job["metadata"] or {}
+            paths = [job["result_path"]] + [value for key, value in metadata.items() if key.endswith("_path")]
+            for path in paths:
+                if path and os.path.exists(path):
+                    os.remove(path)
+            self.store.delete(job["id"])
+        return len(expired)
+
+    def stats(self) -> dict:
+        with self._cond:
+            running = len(self._cancel_events)
+            queued = len(self._heap)
+        return {"devices": self.devices, "queued": queued, "running": running, "jobs": self.store.counts()}
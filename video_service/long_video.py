@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+
+
+def plan_windows(total_frames: int, window_frames: int, overlap_frames: int):
+    """
+    Split a clip into overlapping windows of `window_frames`. Returns a list of
+    start frames; window i covers [start, start + window_frames) and its first
+    `overlap_frames` frames re-render the tail of window i - 1. The last window is
+    generated at full length and trimmed, so every window has the same cost.
+    """
+    if total_frames <= window_frames:
+        return [0]
+    if not 0 < overlap_frames < window_frames:
+        raise ValueError("overlap_frames must be between 0 and window_frames.")
+    stride = window_frames - overlap_frames
+    count = math.ceil((total_frames - overlap_frames) / stride)
+    return [index * stride for index in range(count)]
+
+
+def crossfade(tail: np.ndarray, head: np.ndarray) -> np.ndarray:
+    """
+    Blend the overlapping frames of two windows, (N, H, W, 3) uint8 each: the
+    weight moves linearly from the previous window's tail to the new window's head.
+    """
+    count = len(tail)
+    weights = (np.arange(1, count + 1, dtype=np.float32) / (count + 1))[:, None, None, None]
+    blended = tail.astype(np.float32) * (1 - weights) + head.astype(np.float32) * weights
+    return blended.round().astype(np.uint8)
+
+
+class SlidingWindowAssembler:
+    """
+    Join window outputs into one frame stream with constant memory: each window's
+    frames are written to `write` as soon as they are final, and only the last
+    `overlap_frames` (still to be blended with the next window) are kept.
+    """
+
+    def __init__(self, write, total_frames: int, overlap_frames: int):
+        self.write = write
+        self.total_frames = total_frames
+        self.overlap_frames = overlap_frames
+        self.written = 0
+        self._tail = None
+
+    def add(self, frames: np.ndarray, last: bool = False):
+        if self._tail is not None:
+            overlap = min(len(self._tail), len(frames))
+            frames = np.concatenate([crossfade(self._tail[:overlap], frames[:overlap]), frames[overlap:]])
+        remaining = self.total_frames - self.written
+        frames = frames[:remaining]
+        keep = 0 if last else min(self.overlap_frames, len(frames))
+        final = frames[: len(frames) - keep]
+        for frame in final:
+            self.write(frame)
+        self.written += len(final)
+        # Copy, so the window's full buffer can be freed
+        self._tail = frames[len(frames) - keep:].copy() if keep else None
+
+    def conditioning_frame(self) -> np.ndarray:
+        """First frame of the held tail: where the next window starts."""
+        return self._tail[0]
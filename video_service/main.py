@@ -1,14 +1,14 @@
-import io
 import base64
 import os
+import time
 import torch
-import tempfile
 import uuid
-from pathlib import Path
+from contextlib import contextmanager
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
 from PIL import Image
 
@@ -20,189 +20,584 @@ except ImportError:
     print("WARNING: ltx_pipelines not found. Model loading will fail.")
     TI2VidTwoStagesPipeline = None
 
+from .conditioning import (
+    displayed_size, nearest_bucket, open_image, parse_buckets, prepare_conditioning_image, read_upload, snap,
+    snap_num_frames,
+)
 from .config import settings
-from .models import GenerateVideoRequest
+from .encoding import FragmentedMP4Writer, check_response_format, video_file_response
+from .frames import frames_to_array, thumbnail_jpeg
+from .interpolation import FRAME_MULTIPLIERS, FrameInterpolator, diffusion_frame_count, interpolation_method
+from .jobs import COMPLETED, JobManager, JobProgress, JobStore
+from .long_video import SlidingWindowAssembler, plan_windows
+from .memory import PeakGPUMemory, PeakRSS
+from .models import GenerateVideoRequest, StageTwoDecision, VideoJobRequest
+from .vae_tiling import VAE_TILING_MODES, should_tile, vae_tiling_for
+from .previews import STAGE_1_PREVIEW_MODES, STAGE_2_ACTIONS, StageTwoSkipped, decode_stage_1
 
-# Global variable to hold the pipeline
-video_pipe = None
+# One pipeline per worker device
+video_pipes = {}
 
-def load_model():
-    """Lengths load the LTX-2 Pipeline."""
-    global video_pipe
+# Devices that each get a pipeline and a job worker
+devices = [device.strip() for device in settings.DEVICES.split(",") if device.strip()] or [settings.DEVICE]
+
+# Resolutions used when a request leaves the size open, warmed up at startup
+resolution_buckets = parse_buckets(settings.RESOLUTION_BUCKETS)
+
+def load_model(device: str = settings.DEVICE):
+    """Load the LTX-2 Pipeline onto `device`."""
     if TI2VidTwoStagesPipeline is None:
         raise RuntimeError("ltx-pipelines library is not installed.")
 
-    print(f"Loading LTX-2 Pipeline from {settings.MODEL_PATH}...")
+    print(f"Loading LTX-2 Pipeline from {settings.MODEL_PATH} on {device}...")
     try:
-        # Load the pipeline. 
+        # Load the pipeline.
         # Assuming typical diffusers-like loading or the specific LTX class method
         # The docs say: TI2VidTwoStagesPipeline.from_pretrained(...)
-        
+
         video_pipe = TI2VidTwoStagesPipeline.from_pretrained(
             settings.MODEL_PATH,
-            torch_dtype=torch.float16 if settings.DEVICE == "cuda" else torch.float32
+            torch_dtype=torch.float16 if device.startswith("cuda") else torch.float32
         )
-        
+
         # Move to device
-        video_pipe.to(settings.DEVICE)
-        
+        video_pipe.to(device)
+
         # Optional: Enable CPU offload or other optimizations for VRAM
-        # video_pipe.enable_model_cpu_offload() 
-        
+        # video_pipe.enable_model_cpu_offload()
+
+        video_pipes[device] = video_pipe
         print("LTX-2 Pipeline loaded successfully.")
     except Exception as e:
         print(f"Failed to load LTX-2 Model: {e}")
-        # We don't raise here to allow the service to start, but endpoints will fail
-        video_pipe = None
+        # We don't raise here to allow the service to start, but jobs will fail
+        video_pipes.pop(device, None)
+
+@contextmanager
+def mp4_writer(output_path: str, fps: int = settings.DEFAULT_FPS):
+    """Fragmented MP4 writer for `output_path`, which only appears once the block completes."""
+    partial_path = output_path + ".part"
+    try:
+        with open(partial_path, "wb") as sink, FragmentedMP4Writer(
+            sink, fps, crf=settings.ENCODE_CRF, preset=settings.ENCODE_PRESET
+        ) as writer:
+            yield writer
+    except BaseException:
+        os.remove(partial_path)
+        raise
+    os.replace(partial_path, output_path)
+
+def warm_up(device: str):
+    """
+    Run each resolution bucket once (one step, nine frames) so kernel selection and
+    allocator growth for those shapes happen at startup, not in the first requests.
+    """
+    video_pipe = video_pipes.get(device)
+    if video_pipe is None or not settings.WARMUP_BUCKETS or not device.startswith("cuda"):
+        return
+    for width, height in resolution_buckets:
+        start = time.perf_counter()
+        try:
+            with torch.inference_mode():
+                video_pipe(
+                    prompt="warm-up", width=width, height=height, num_frames=9, num_inference_steps=1,
+                    generator=torch.Generator(device=device).manual_seed(0), output_type="pt",
+                )
+        except Exception as e:
+            print(f"Warm-up of {width}x{height} on {device} failed: {e}")
+            continue
+        print(f"Warmed up {width}x{height} on {device} in {time.perf_counter() - start:.1f}s")
+    torch.cuda.empty_cache()
+
+def encode_mp4(video, output_path: str, fps: int = settings.DEFAULT_FPS, multiplier: int = 1,
+               limit: int = None):
+    """Encode a (T, H, W, 3) uint8 video, interpolating `multiplier` x frames on the way."""
+    with mp4_writer(output_path, fps) as writer:
+        interpolator = FrameInterpolator(writer.write, multiplier, limit)
+        for frame in video:
+            interpolator.write(frame)
+        interpolator.close()
+
+def generate_frames(video_pipe, device: str, call_kwargs: dict, seed: int, callback, progress: JobProgress,
+                    vae_tiling: str = "auto"):
+    """
+    One pipeline call, returned as a (T, H, W, 3) uint8 array. The VAE decode is
+    tiled when `vae_tiling` is "on", or in "auto" mode when the estimated decode
+    memory does not fit in the device's free memory.
+    """
+    tile = should_tile(
+        vae_tiling, device, call_kwargs["width"], call_kwargs["height"], call_kwargs["num_frames"],
+        settings.VAE_DECODE_BYTES_PER_PIXEL, settings.VAE_HEADROOM_BYTES,
+    )
+    with PeakGPUMemory(device) as peak, vae_tiling_for(
+        video_pipe, tile, settings.VAE_TILE_SIZE, settings.VAE_TILE_STRIDE,
+        settings.VAE_TILE_FRAMES, settings.VAE_TILE_FRAME_STRIDE,
+    ) as tiled, torch.inference_mode():
+        output = video_pipe(
+            **call_kwargs,
+            generator=torch.Generator(device=device).manual_seed(seed),
+            callback_on_step_end=callback,
+            # Tensors are cast to uint8 on the device, skipping per-frame PIL images
+            output_type="pt",
+        )
+        video = frames_to_array(output.frames[0] if hasattr(output, 'frames') else output[0])
+        del output
+
+    progress.metadata["vae_tiling"] = tiled
+    if peak.peak_mb is not None:
+        progress.metadata["peak_gpu_memory_mb"] = max(peak.peak_mb, progress.metadata.get("peak_gpu_memory_mb", 0))
+    return video
+
+def run_long_video(job: dict, video_pipe, device: str, progress: JobProgress, call_kwargs: dict,
+                   output_path: str, thumbnail_path: str, multiplier: int = 1) -> int:
+    """
+    Generate a clip longer than one window as overlapping windows. Each window
+    after the first is conditioned on the first frame of the previous window's
+    tail, the overlapping frames are cross-faded, and finished frames go straight
+    to the encoder, so memory stays at one window however long the clip is.
+    Returns the number of windows.
+    """
+    params = job["params"]
+    window_frames = settings.LONG_VIDEO_WINDOW_FRAMES
+    overlap_frames = params.get("overlap_frames") or settings.LONG_VIDEO_OVERLAP_FRAMES
+    # Windows cover the diffused frames; interpolation expands them to num_frames
+    starts = plan_windows(call_kwargs["num_frames"], window_frames, overlap_frames)
+
+    with mp4_writer(output_path) as writer:
+        interpolator = FrameInterpolator(writer.write, multiplier, params["num_frames"])
+        assembler = SlidingWindowAssembler(interpolator.write, call_kwargs["num_frames"], overlap_frames)
+        for index, start in enumerate(starts):
+            progress.set_window(index, len(starts))
+            progress.set_stage("stage_1", total_steps=params["num_inference_steps"])
+            window_kwargs = {**call_kwargs, "num_frames": window_frames}
+            if index > 0:
+                window_kwargs["image"] = Image.fromarray(assembler.conditioning_frame())
+            print(f"Video job {job['id']}: window {index + 1}/{len(starts)} from frame {start}")
+            frames = generate_frames(
+                video_pipe, device, window_kwargs, params["seed"] + index, progress.on_step_end, progress,
+                params.get("vae_tiling", "auto"),
+            )
+
+            progress.set_stage("encode")
+            if index == 0:
+                with open(thumbnail_path, "wb") as thumbnail_file:
+                    thumbnail_file.write(thumbnail_jpeg(frames))
+            assembler.add(frames, last=index == len(starts) - 1)
+            del frames
+        interpolator.close()
+    return len(starts)
+
+def stage_1_callback(job: dict, progress: JobProgress, preview_path: str, num_frames: int):
+    """
+    Step callback that, at the last stage-1 step, decodes the low-resolution result,
+    publishes it as the job's preview and, in `confirm` mode, waits for the client
+    to proceed with stage 2 or keep the draft.
+    """
+    params = job["params"]
+    mode = params.get("stage_1_preview", "off")
+    last_step = params["num_inference_steps"] - 1
+
+    def on_step_end(pipe, step, timestep, callback_kwargs):
+        callback_kwargs = progress.on_step_end(pipe, step, timestep, callback_kwargs)
+        if mode == "off" or progress.stage != "stage_1" or step != last_step or "latents" not in callback_kwargs:
+            return callback_kwargs
+
+        preview = frames_to_array(decode_stage_1(
+            pipe, callback_kwargs["latents"], num_frames, params["width"] / params["height"]
+        ))
+        # Same duration as the final clip, whatever frame count the preview decoded to
+        fps = max(1, round(settings.DEFAULT_FPS * len(preview) / params["num_frames"]))
+        encode_mp4(preview, preview_path, fps=fps)
+        progress.publish(preview_path=preview_path)
+        print(f"Video job {job['id']}: stage-1 preview ready ({preview.shape[2]}x{preview.shape[1]})")
+
+        if mode == "confirm":
+            action = progress.await_decision(settings.STAGE_2_DECISION_TIMEOUT, settings.STAGE_2_DEFAULT_ACTION)
+            progress.publish(stage_2=action)
+            if action == "skip":
+                raise StageTwoSkipped()
+        return callback_kwargs
+
+    return on_step_end
+
+def run_video_job(job: dict, device: str, progress: JobProgress) -> str:
+    """
+    Run one queued job on the pipeline of `device` and encode its frames straight
+    into a fragmented MP4 next to the job table. Blocking; called from the
+    device's worker thread.
+
+    The output is converted once into a (T, H, W, 3) uint8 array; the thumbnail
+    and the encoder read views of it. If the client skips stage 2, the stage-1
+    preview is the job's result. Clips longer than one window are generated by
+    `run_long_video`. With a frame multiplier, only every N-th frame is diffused
+    and the rest are interpolated on the CPU while encoding.
+    """
+    video_pipe = video_pipes.get(device)
+    if video_pipe is None:
+        raise RuntimeError("Video generation model is not loaded.")
+
+    params = job["params"]
+    multiplier = params.get("frame_multiplier", 1)
+    call_kwargs = {
+        "prompt": params["prompt"],
+        "negative_prompt": params["negative_prompt"],
+        "width": params["width"],
+        "height": params["height"],
+        "num_frames": params["num_frames"],
+        "num_inference_steps": params["num_inference_steps"],
+        "guidance_scale": params["guidance_scale"],
+    }
+    if multiplier > 1:
+        call_kwargs["num_frames"] = diffusion_frame_count(params["num_frames"], multiplier)
+        # Motion is generated for the reduced rate, so the interpolated clip plays at normal speed
+        call_kwargs["frame_rate"] = settings.DEFAULT_FPS / multiplier
+    if job["kind"] == "image_to_video":
+        # Already cropped and resized to the job's size at submit time
+        with Image.open(job["input_path"]) as input_image:
+            call_kwargs["image"] = input_image.convert("RGB")
+
+    print(f"Generating video for prompt: {params['prompt']}")
+    output_path = os.path.join(settings.JOBS_DIR, f"{job['id']}.mp4")
+    thumbnail_path = os.path.join(settings.JOBS_DIR, f"{job['id']}.jpg")
+    preview_path = os.path.join(settings.JOBS_DIR, f"{job['id']}.preview.mp4")
+
+    frame_metadata = {
+        "num_frames": params["num_frames"],
+        "diffused_frames": call_kwargs["num_frames"],
+        "frame_multiplier": multiplier,
+    }
+    if multiplier > 1:
+        frame_metadata["interpolation"] = interpolation_method()
+
+    if call_kwargs["num_frames"] > settings.LONG_VIDEO_WINDOW_FRAMES:
+        with PeakRSS() as rss:
+            windows = run_long_video(
+                job, video_pipe, device, progress, call_kwargs, output_path, thumbnail_path, multiplier
+            )
+        progress.metadata.update({
+            **frame_metadata,
+            "windows": windows,
+            "peak_rss_mb": rss.peak_mb,
+            "rss_growth_mb": rss.growth_mb,
+            "thumbnail_path": thumbnail_path,
+        })
+        print(f"Video job {job['id']}: {windows} windows, peak RSS {rss.peak_mb} MB (+{rss.growth_mb} MB)")
+        return output_path
+
+    with PeakRSS() as rss:
+        progress.set_stage("stage_1", total_steps=params["num_inference_steps"])
+        try:
+            video = generate_frames(
+                video_pipe, device, call_kwargs, params["seed"],
+                stage_1_callback(job, progress, preview_path, call_kwargs["num_frames"]), progress,
+                params.get("vae_tiling", "auto"),
+            )
+        except StageTwoSkipped:
+            video = None
+
+        if video is not None:
+            progress.set_stage("encode")
+            with open(thumbnail_path, "wb") as thumbnail_file:
+                thumbnail_file.write(thumbnail_jpeg(video))
+            encode_mp4(video, output_path, multiplier=multiplier, limit=params["num_frames"])
+
+    if video is None:
+        progress.metadata.update({"peak_rss_mb": rss.peak_mb, "rss_growth_mb": rss.growth_mb})
+        print(f"Video job {job['id']}: stage 2 skipped, keeping the stage-1 draft")
+        return preview_path
+
+    _, height, width, _ = video.shape
+    progress.metadata.update({
+        **frame_metadata,
+        "width": width,
+        "height": height,
+        "frame_buffer_mb": round(video.nbytes / (1024 * 1024), 1),
+        "peak_rss_mb": rss.peak_mb,
+        "rss_growth_mb": rss.growth_mb,
+        "thumbnail_path": thumbnail_path,
+    })
+    print(f"Video job {job['id']}: {len(video)} frames diffused, peak RSS {rss.peak_mb} MB (+{rss.growth_mb} MB)")
+    return output_path
+
+job_manager = JobManager(
+    JobStore(os.path.join(settings.JOBS_DIR, "jobs.db")),
+    runner=run_video_job,
+    devices=devices,
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    load_model()
+    for device in devices:
+        load_model(device)
+        warm_up(device)
+    purged = job_manager.purge(settings.JOB_RETENTION_HOURS * 3600)
+    if purged:
+        print(f"Purged {purged} expired video jobs")
+    job_manager.start()
     yield
     # Cleanup
-    global video_pipe
-    if video_pipe:
-        del video_pipe
+    job_manager.stop()
+    video_pipes.clear()
     if torch.cuda.is_available():
         torch.cuda.empty_cache()
 
 app = FastAPI(title="LTX-2 Video Service", lifespan=lifespan)
 
-@app.post("/generate")
-async def generate_video(req: GenerateVideoRequest):
-    global video_pipe
-    if video_pipe is None:
+def check_model_loaded():
+    if not video_pipes:
         raise HTTPException(status_code=503, detail="Video generation model is not loaded.")
 
-    try:
-        print(f"Generating video for prompt: {req.prompt}")
-        
-        # Generate video frames
-        # usage might vary based on the specific API of TI2VidTwoStagesPipeline
-        # Based on typical diffusers usage + LTX docs implying separate stages hidden or explicit
-        # We'll assume the pipeline handles the 2 stages internally if we call it once, 
-        # or we might need to verify the exact call signature.
-        
-        with torch.inference_mode():
-            output = video_pipe(
-                prompt=req.prompt,
-                negative_prompt=req.negative_prompt,
-                width=req.width,
-                height=req.height,
-                num_frames=req.num_frames,
-                num_inference_steps=req.num_inference_steps,
-                guidance_scale=req.guidance_scale,
-                generator=torch.Generator(device=settings.DEVICE).manual_seed(req.seed)
+def normalize_request(req: GenerateVideoRequest, image_size=None):
+    """
+    Snap the requested size to multiples the pipeline supports (stage 1 runs at half
+    resolution) and num_frames to 8k + 1, in place. An unset size uses the bucket
+    closest to the conditioning image's aspect ratio, or the default size.
+    """
+    if req.width is None or req.height is None:
+        if image_size is not None:
+            req.width, req.height = nearest_bucket(*image_size, resolution_buckets)
+        else:
+            req.width, req.height = settings.DEFAULT_WIDTH, settings.DEFAULT_HEIGHT
+    req.width = snap(req.width, settings.RESOLUTION_MULTIPLE)
+    req.height = snap(req.height, settings.RESOLUTION_MULTIPLE)
+    for side in (req.width, req.height):
+        if not settings.MIN_SIDE <= side <= settings.MAX_SIDE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"width and height must be between {settings.MIN_SIDE} and {settings.MAX_SIDE}.",
             )
+    req.num_frames = snap_num_frames(req.num_frames or settings.DEFAULT_NUM_FRAMES)
+
+async def read_conditioning_image(file: UploadFile):
+    """Read the upload (bounded) and parse only its header."""
+    contents = await read_upload(file, settings.MAX_UPLOAD_BYTES)
+    return open_image(contents, settings.MAX_INPUT_PIXELS)
+
+async def save_job_input(image, req: GenerateVideoRequest, job_id: str) -> str:
+    """Decode, crop and resize the conditioning image to the job's size once, at submit time."""
+    prepared = await run_in_threadpool(prepare_conditioning_image, image, req.width, req.height)
+    input_path = os.path.join(settings.JOBS_DIR, f"{job_id}.input")
+    await run_in_threadpool(prepared.save, input_path, format="PNG", compress_level=1)
+    return input_path
 
-        # Output is likely a list of frames or a video tensor.
-        # We need to convert this to an MP4 video.
-        
-        # Assuming output.frames is a list of PIL images or similar
-        # If it returns a tensor, we convert to PIL.
-        
-        frames = output.frames[0] if hasattr(output, 'frames') else output[0]
-        
-        # Save to temp mp4 file using utility (e.g. export_to_video from diffusers or manually)
-        # For simplicity, let's use a standard export helper or cv2/moviepy if available, 
-        # or typical diffusers export_to_video
-        
-        from diffusers.utils import export_to_video
-        
-        # export_to_video usually returns path or saves to path.
-        # Let's create a temp file
-        temp_dir = Path(tempfile.gettempdir())
-        output_filename = f"{uuid.uuid4()}.mp4"
-        output_path = temp_dir / output_filename
-        
-        export_to_video(frames, str(output_path), fps=settings.DEFAULT_FPS)
-        
-        # Read the file and return as base64
-        with open(output_path, "rb") as video_file:
-            video_bytes = video_file.read()
-            video_str = base64.b64encode(video_bytes).decode("utf-8")
-            
-        # Clean up temp file
-        os.remove(output_path)
-        
-        return JSONResponse(
-            content={
-                "video": video_str, 
-                "format": "base64", 
-                "media_type": "video/mp4"
-            }
+def check_stage_1_preview(mode: str, num_inference_steps: int):
+    if mode not in STAGE_1_PREVIEW_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown stage_1_preview '{mode}'. Choose from {list(STAGE_1_PREVIEW_MODES)}.",
         )
+    if mode != "off" and num_inference_steps < 2:
+        raise HTTPException(status_code=400, detail="stage_1_preview needs num_inference_steps of at least 2.")
 
-    except Exception as e:
-        print(f"Video generation error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+def check_num_frames(req: GenerateVideoRequest):
+    if req.vae_tiling not in VAE_TILING_MODES:
+        raise HTTPException(status_code=400, detail=f"vae_tiling must be one of {list(VAE_TILING_MODES)}.")
+    if req.frame_multiplier not in FRAME_MULTIPLIERS:
+        raise HTTPException(status_code=400, detail=f"frame_multiplier must be one of {list(FRAME_MULTIPLIERS)}.")
+    if req.num_frames > settings.MAX_NUM_FRAMES:
+        raise HTTPException(status_code=400, detail=f"num_frames is limited to {settings.MAX_NUM_FRAMES}.")
+    diffused_frames = req.num_frames
+    if req.frame_multiplier > 1:
+        diffused_frames = diffusion_frame_count(req.num_frames, req.frame_multiplier)
+    if diffused_frames <= settings.LONG_VIDEO_WINDOW_FRAMES:
+        return
+    overlap_frames = req.overlap_frames or settings.LONG_VIDEO_OVERLAP_FRAMES
+    if not 0 < overlap_frames < settings.LONG_VIDEO_WINDOW_FRAMES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"overlap_frames must be between 1 and {settings.LONG_VIDEO_WINDOW_FRAMES - 1}.",
+        )
+    if getattr(req, "stage_1_preview", "off") != "off":
+        raise HTTPException(status_code=400, detail="stage_1_preview is not available for long videos.")
+
+def job_params(req: GenerateVideoRequest) -> dict:
+    return req.model_dump(exclude={"priority", "response_format"})
+
+async def wait_for_result(job: dict, response_format: str = "json"):
+    """
+    Wait for a job submitted by the blocking endpoints. `binary` streams the MP4
+    as is; `json` keeps the original base64 body for existing clients.
+    """
+    job = await job_manager.wait(job["id"])
+    if job["status"] != COMPLETED:
+        print(f"Video generation error: {job['error'] or job['status']}")
+        raise HTTPException(status_code=500, detail=job["error"] or f"Job {job['status']}.")
+
+    metadata = job["metadata"] or {}
+    headers = {"X-Job-Id": job["id"]}
+    if metadata.get("peak_rss_mb") is not None:
+        headers["X-Peak-RSS-MB"] = str(metadata["peak_rss_mb"])
+
+    if response_format == "binary":
+        response = video_file_response(job["result_path"])
+        response.headers.update(headers)
+        return response
+
+    with open(job["result_path"], "rb") as video_file:
+        video_bytes = video_file.read()
+        video_str = base64.b64encode(video_bytes).decode("utf-8")
+
+    return JSONResponse(
+        content={
+            "video": video_str,
+            "format": "base64",
+            "media_type": "video/mp4",
+            "job_id": job["id"],
+            "metadata": metadata,
+        },
+        headers=headers,
+    )
+
+@app.post("/generate")
+async def generate_video(req: GenerateVideoRequest):
+    """Text-to-video, waiting for the result. Runs through the job queue like /jobs."""
+    check_model_loaded()
+    check_response_format(req.response_format)
+    normalize_request(req)
+    check_num_frames(req)
+    job = job_manager.submit("text_to_video", job_params(req))
+    return await wait_for_result(job, req.response_format)
 
 @app.post("/image-to-video")
 async def image_to_video(
     file: UploadFile = File(...),
     prompt: str = Form(...),
     negative_prompt: str = Form("worst quality, inconsistent motion, blurry, jittery, distorted"),
-    width: Optional[int] = Form(768),
-    height: Optional[int] = Form(512),
+    # Left unset, the size is the resolution bucket closest to the image's aspect ratio
+    width: Optional[int] = Form(None),
+    height: Optional[int] = Form(None),
     num_frames: Optional[int] = Form(121),
     num_inference_steps: int = Form(50),
     guidance_scale: float = Form(3.0),
-    seed: int = Form(42)
+    seed: int = Form(42),
+    overlap_frames: Optional[int] = Form(None),
+    frame_multiplier: int = Form(1),
+    vae_tiling: str = Form("auto"),
+    # "json" (base64 body, default) or "binary" (raw MP4)
+    response_format: str = Form("json")
 ):
-    global video_pipe
-    if video_pipe is None:
-        raise HTTPException(status_code=503, detail="Video generation model is not loaded.")
+    check_model_loaded()
+    check_response_format(response_format)
+    req = GenerateVideoRequest(
+        prompt=prompt, negative_prompt=negative_prompt, width=width, height=height, num_frames=num_frames,
+        num_inference_steps=num_inference_steps, guidance_scale=guidance_scale, seed=seed,
+        overlap_frames=overlap_frames, frame_multiplier=frame_multiplier, vae_tiling=vae_tiling,
+    )
+    image = await read_conditioning_image(file)
+    normalize_request(req, displayed_size(image))
+    check_num_frames(req)
+    job_id = str(uuid.uuid4())
+    input_path = await save_job_input(image, req, job_id)
+    job = job_manager.submit("image_to_video", job_params(req), input_path=input_path, job_id=job_id)
+    return await wait_for_result(job, response_format)
 
-    try:
-        # Read and process input image
-        contents = await file.read()
-        input_image = Image.open(io.BytesIO(contents)).convert("RGB")
-        
-        # Resize image to match request or model requirements if needed
-        # For now, pass directly
-        
-        print(f"Generating video from image + prompt: {prompt}")
-        
-        with torch.inference_mode():
-            output = video_pipe(
-                image=input_image,
-                prompt=prompt,
-                negative_prompt=negative_prompt,
-                width=width,
-                height=height,
-                num_frames=num_frames,
-                num_inference_steps=num_inference_steps,
-                guidance_scale=guidance_scale,
-                generator=torch.Generator(device=settings.DEVICE).manual_seed(seed)
-            )
+@app.post("/jobs")
+async def submit_video_job(req: VideoJobRequest):
+    """Queue a text-to-video job and return immediately with its id and queue position."""
+    check_model_loaded()
+    check_stage_1_preview(req.stage_1_preview, req.num_inference_steps)
+    normalize_request(req)
+    check_num_frames(req)
+    return job_manager.submit("text_to_video", job_params(req), priority=req.priority)
 
-        frames = output.frames[0] if hasattr(output, 'frames') else output[0]
-        
-        from diffusers.utils import export_to_video
-        
-        temp_dir = Path(tempfile.gettempdir())
-        output_filename = f"{uuid.uuid4()}.mp4"
-        output_path = temp_dir / output_filename
-        
-        export_to_video(frames, str(output_path), fps=settings.DEFAULT_FPS)
-        
-        with open(output_path, "rb") as video_file:
-            video_bytes = video_file.read()
-            video_str = base64.b64encode(video_bytes).decode("utf-8")
-            
-        os.remove(output_path)
-        
-        return JSONResponse(
-            content={
-                "video": video_str, 
-                "format": "base64", 
-                "media_type": "video/mp4"
-            }
-        )
+@app.post("/jobs/image-to-video")
+async def submit_image_to_video_job(
+    file: UploadFile = File(...),
+    prompt: str = Form(...),
+    negative_prompt: str = Form("worst quality, inconsistent motion, blurry, jittery, distorted"),
+    # Left unset, the size is the resolution bucket closest to the image's aspect ratio
+    width: Optional[int] = Form(None),
+    height: Optional[int] = Form(None),
+    num_frames: Optional[int] = Form(121),
+    num_inference_steps: int = Form(50),
+    guidance_scale: float = Form(3.0),
+    seed: int = Form(42),
+    overlap_frames: Optional[int] = Form(None),
+    frame_multiplier: int = Form(1),
+    vae_tiling: str = Form("auto"),
+    priority: int = Form(0),
+    stage_1_preview: str = Form("off")
+):
+    check_model_loaded()
+    check_stage_1_preview(stage_1_preview, num_inference_steps)
+    req = VideoJobRequest(
+        prompt=prompt, negative_prompt=negative_prompt, width=width, height=height, num_frames=num_frames,
+        num_inference_steps=num_inference_steps, guidance_scale=guidance_scale, seed=seed,
+        overlap_frames=overlap_frames, frame_multiplier=frame_multiplier, vae_tiling=vae_tiling,
+        stage_1_preview=stage_1_preview,
+    )
+    image = await read_conditioning_image(file)
+    normalize_request(req, displayed_size(image))
+    check_num_frames(req)
+    job_id = str(uuid.uuid4())
+    input_path = await save_job_input(image, req, job_id)
+    return job_manager.submit(
+        "image_to_video", job_params(req), priority=priority, input_path=input_path, job_id=job_id
+    )
 
-    except Exception as e:
-        print(f"Image-to-Video generation error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+@app.get("/jobs")
+async def list_video_jobs(status: Optional[str] = None, limit: int = 100):
+    return job_manager.store.list(status=status, limit=limit)
+
+@app.get("/jobs/{job_id}")
+async def get_video_job(job_id: str):
+    job = job_manager.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    return job
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_video_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+async def get_video_job_result(job_id: str, range: Optional[str] = Header(None)):
+    job = job_manager.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    if job["status"] != COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}.")
+    return video_file_response(job["result_path"], range, filename=f"{job_id}.mp4")
+
+@app.get("/jobs/{job_id}/preview")
+async def get_video_job_preview(job_id: str, range: Optional[str] = Header(None)):
+    """The stage-1 low-resolution video, available while stage 2 is still running."""
+    job = job_manager.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    preview_path = (job["metadata"] or {}).get("preview_path")
+    if not preview_path or not os.path.exists(preview_path):
+        raise HTTPException(status_code=409, detail="No stage-1 preview for this job (yet).")
+    return video_file_response(preview_path, range, filename=f"{job_id}.preview.mp4")
+
+@app.post("/jobs/{job_id}/decision")
+async def decide_video_job_stage_2(job_id: str, decision: StageTwoDecision):
+    """Proceed with stage 2, or skip it and keep the stage-1 draft as the result."""
+    if decision.action not in STAGE_2_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"action must be one of {list(STAGE_2_ACTIONS)}.")
+    if job_manager.status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    if not job_manager.decide(job_id, decision.action):
+        raise HTTPException(status_code=409, detail="Job is not waiting for a stage-2 decision.")
+    return job_manager.status(job_id)
+
+@app.get("/jobs/{job_id}/thumbnail")
+async def get_video_job_thumbnail(job_id: str):
+    job = job_manager.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    thumbnail_path = (job["metadata"] or {}).get("thumbnail_path")
+    if job["status"] != COMPLETED or not thumbnail_path or not os.path.exists(thumbnail_path):
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}.")
+    with open(thumbnail_path, "rb") as thumbnail_file:
+        return Response(content=thumbnail_file.read(), media_type="image/jpeg")
+
+@app.get("/metrics")
+async def metrics():
+    return {"jobs": job_manager.stats(), "loaded_devices": list(video_pipes)}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,86 @@
+import os
+import sys
+import threading
+
+import torch
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, from /proc on Linux."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0
+        # ru_maxrss is the lifetime peak (KiB on Linux, bytes on macOS), the best available here
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakRSS:
+    """
+    Track the process's peak resident memory while the block runs, by sampling
+    RSS from a background thread. The process-lifetime ru_maxrss cannot tell one
+    request from the next, so this reports the peak within the block and how far
+    it rose above the RSS at entry.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start_bytes = 0
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+
+    def __enter__(self):
+        self.start_bytes = self.peak_bytes = current_rss_bytes()
+        self._thread = threading.Thread(target=self._sample, name="peak-rss", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+        return False
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak_bytes / (1024 * 1024), 1)
+
+    @property
+    def growth_mb(self) -> float:
+        return round((self.peak_bytes - self.start_bytes) / (1024 * 1024), 1)
+
+
+class PeakGPUMemory:
+    """Measure peak allocated memory (in MiB) of a CUDA device over a block; None elsewhere."""
+
+    def __init__(self, device: str):
+        self.device = device
+        self.peak_mb = None
+
+    def __enter__(self):
+        if self.device.startswith("cuda") and torch.cuda.is_available():
+            torch.cuda.synchronize(self.device)
+            torch.cuda.reset_peak_memory_stats(self.device)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.device.startswith("cuda") and torch.cuda.is_available():
+            torch.cuda.synchronize(self.device)
+            self.peak_mb = round(torch.cuda.max_memory_allocated(self.device) / 2 ** 20, 1)
+        return False
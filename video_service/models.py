@@ -10,7 +10,26 @@ class GenerateVideoRequest(BaseModel):
     num_inference_steps: int = 50
     guidance_scale: float = 3.0
     seed: int = 42
+    # Frames shared by consecutive windows when num_frames exceeds one window
+    overlap_frames: Optional[int] = None
+    # Diffuse 1/N of the frames (1, 2 or 4) and interpolate the rest
+    frame_multiplier: int = 1
+    # Tiled VAE decode: "auto" (when the full decode would not fit), "on" or "off"
+    vae_tiling: str = "auto"
+    # "json" (base64 body, default) or "binary" (raw MP4)
+    response_format: str = "json"
 
 class ImageToVideoRequest(GenerateVideoRequest):
     # Image will be passed as file upload, but we can have extra params here if needed
     pass
+
+class VideoJobRequest(GenerateVideoRequest):
+    # Higher priority jobs run first
+    priority: int = 0
+    # Stage-1 low-res result: "off", "preview" (publish it and continue) or
+    # "confirm" (publish it and wait for POST /jobs/{id}/decision)
+    stage_1_preview: str = "off"
+
+class StageTwoDecision(BaseModel):
+    # "proceed" with stage 2 or "skip" it and keep the stage-1 draft
+    action: str
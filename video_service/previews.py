@@ -0,0 +1,69 @@
+import math
+
+import torch
+import torch.nn.functional as F
+
+# How a job treats the stage-1 (low resolution) result
+#   off:     no preview, run both stages
+#   preview: encode and publish the stage-1 video, then continue with stage 2
+#   confirm: publish it and wait for the client to proceed with or skip stage 2
+STAGE_1_PREVIEW_MODES = ("off", "preview", "confirm")
+
+STAGE_2_ACTIONS = ("proceed", "skip")
+
+
+class StageTwoSkipped(Exception):
+    """Raised from the step callback when the client keeps the stage-1 draft."""
+
+
+def unpack_latents(pipe, latents: torch.Tensor, num_frames: int, aspect: float) -> torch.Tensor:
+    """
+    Bring stage-1 latents to (B, C, F, H, W). Packed token latents (B, F*H*W, C)
+    carry no shape, so F comes from the frame count and the VAE's temporal
+    compression, and H x W from the token count and the requested aspect ratio.
+    """
+    if latents.ndim == 5:
+        return latents
+    batch, tokens, channels = latents.shape
+    temporal = getattr(pipe, "vae_temporal_compression_ratio", 8)
+    latent_frames = (num_frames - 1) // temporal + 1
+    per_frame = tokens // latent_frames
+    height = max(1, round(math.sqrt(per_frame / aspect)))
+    width = per_frame // height
+    latents = latents[:, : latent_frames * height * width]
+    return latents.reshape(batch, latent_frames, height, width, channels).permute(0, 4, 1, 2, 3)
+
+
+def project_latents(latents: torch.Tensor, scale: int = 8) -> torch.Tensor:
+    """
+    VAE-free fallback: the first three latent channels, normalised per channel and
+    upscaled, as a (F, 3, H, W) video in [0, 1]. Rough, but shows layout and motion.
+    """
+    rgb = latents[0, :3].float()
+    low = rgb.amin(dim=(1, 2, 3), keepdim=True)
+    high = rgb.amax(dim=(1, 2, 3), keepdim=True)
+    rgb = ((rgb - low) / (high - low).clamp_min(1e-6)).permute(1, 0, 2, 3)
+    return F.interpolate(rgb, scale_factor=scale, mode="bilinear", align_corners=False)
+
+
+def decode_stage_1(pipe, latents: torch.Tensor, num_frames: int, aspect: float) -> torch.Tensor:
+    """
+    Decode the final stage-1 latents to a (F, 3, H, W) video in [0, 1] with the
+    pipeline's VAE, falling back to a latent projection if it cannot decode them.
+    """
+    latents = unpack_latents(pipe, latents, num_frames, aspect)
+    vae = getattr(pipe, "vae", None)
+    if vae is not None:
+        try:
+            decoded = latents
+            if hasattr(pipe, "_denormalize_latents") and hasattr(vae, "latents_mean"):
+                decoded = pipe._denormalize_latents(
+                    decoded, vae.latents_mean, vae.latents_std, vae.config.scaling_factor
+                )
+            with torch.inference_mode():
+                video = vae.decode(decoded.to(vae.dtype), return_dict=False)[0]
+            # (B, 3, F, H, W) in [-1, 1]
+            return ((video[0].float() + 1) / 2).clamp(0, 1).permute(1, 0, 2, 3)
+        except Exception as e:
+            print(f"Stage-1 VAE decode failed, using latent projection: {e}")
+    return project_latents(latents)
@@ -0,0 +1,84 @@
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from video_service.conditioning import (
+    displayed_size, nearest_bucket, open_image, parse_buckets, prepare_conditioning_image, read_upload, snap,
+    snap_num_frames,
+)
+
+BUCKETS = parse_buckets("768x512,512x768,640x640")
+
+
+def encode(image, format="JPEG"):
+    buffered = io.BytesIO()
+    image.save(buffered, format=format)
+    return buffered.getvalue()
+
+
+def test_snapping():
+    assert snap(770, 64) == 768
+    assert snap(10, 64) == 64
+    assert snap_num_frames(121) == 121
+    assert snap_num_frames(100) == 97
+    assert snap_num_frames(1) == 9
+
+
+def test_nearest_bucket_follows_aspect_ratio():
+    assert nearest_bucket(1920, 1080, BUCKETS) == (768, 512)
+    assert nearest_bucket(1080, 1920, BUCKETS) == (512, 768)
+    assert nearest_bucket(1000, 1000, BUCKETS) == (640, 640)
+
+
+def test_prepare_center_crops_to_exact_size():
+    # Left half red, right half blue; a square crop keeps the middle
+    source = Image.new("RGB", (2000, 1000), (255, 0, 0))
+    source.paste((0, 0, 255), (1000, 0, 2000, 1000))
+
+    prepared = prepare_conditioning_image(open_image(encode(source), 10_000_000), 640, 640)
+
+    assert prepared.size == (640, 640)
+    assert prepared.getpixel((10, 320))[0] > 200
+    assert prepared.getpixel((630, 320))[2] > 200
+
+
+def test_read_upload_enforces_limit():
+    class Upload:
+        def __init__(self, data):
+            self.data = data
+
+        async def read(self, size=-1):
+            return self.data[:size] if size >= 0 else self.data
+
+    assert asyncio.run(read_upload(Upload(b"x" * 4096), max_bytes=4096)) == b"x" * 4096
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_upload(Upload(b"x" * 4097), max_bytes=4096))
+    assert error.value.status_code == 413
+
+
+def test_oversized_image_is_rejected_before_decoding():
+    with pytest.raises(HTTPException) as error:
+        open_image(encode(Image.new("RGB", (1000, 1000))), max_pixels=100_000)
+    assert error.value.status_code == 413
+
+
+def test_truncated_image_is_rejected_when_decoding():
+    data = encode(Image.effect_noise((512, 512), 64).convert("RGB"), format="PNG")
+    image = open_image(data[:len(data) // 2], max_pixels=10_000_000)
+
+    # The endpoints size the request from the EXIF orientation before decoding
+    with pytest.raises(HTTPException) as exc:
+        displayed_size(image)
+    assert exc.value.status_code == 400
+
+    with pytest.raises(HTTPException) as exc:
+        prepare_conditioning_image(image, 256, 256)
+    assert exc.value.status_code == 400
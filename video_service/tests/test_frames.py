@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import torch
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from video_service.frames import frames_to_array, thumbnail_jpeg
+from video_service.memory import PeakRSS
+
+
+def test_pil_frames_become_one_uint8_buffer():
+    frames = [Image.new("RGB", (64, 32), color=(index, 0, 0)) for index in range(5)]
+
+    video = frames_to_array(frames)
+
+    assert video.shape == (5, 32, 64, 3)
+    assert video.dtype == np.uint8
+    assert video.flags["C_CONTIGUOUS"]
+    assert video[3, 0, 0, 0] == 3
+
+
+def test_float_tensor_output_is_scaled_and_channels_last():
+    # (B, T, C, H, W) in [0, 1], as returned with output_type="pt"
+    frames = torch.ones(1, 4, 3, 16, 24)
+
+    video = frames_to_array(frames)
+
+    assert video.shape == (4, 16, 24, 3)
+    assert video.dtype == np.uint8
+    assert (video == 255).all()
+
+
+def test_frame_views_share_the_buffer():
+    video = frames_to_array(np.zeros((3, 8, 8, 3), dtype=np.uint8))
+
+    frame = video[1]
+
+    assert np.shares_memory(frame, video)
+    assert frame.flags["C_CONTIGUOUS"]
+
+
+def test_thumbnail_is_jpeg():
+    video = np.zeros((2, 480, 640, 3), dtype=np.uint8)
+
+    data = thumbnail_jpeg(video, max_side=160)
+
+    assert data[:2] == b"\xff\xd8"
+
+
+def test_peak_rss_reports_growth():
+    with PeakRSS(interval=0.01) as rss:
+        block = np.ones(64 * 1024 * 1024, dtype=np.uint8)
+        del block
+
+    assert rss.peak_mb > 0
+    assert rss.growth_mb >= 0
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from video_service import interpolation
+from video_service.interpolation import FrameInterpolator, diffusion_frame_count
+
+
+def test_diffusion_frame_count_covers_target_in_8k_plus_1():
+    assert diffusion_frame_count(121, 2) == 65
+    assert diffusion_frame_count(121, 4) == 33
+    for multiplier in (2, 4):
+        frames = diffusion_frame_count(121, multiplier)
+        assert (frames - 1) % 8 == 0
+        assert (frames - 1) * multiplier + 1 >= 121
+
+
+def test_linear_fallback_inserts_in_betweens(monkeypatch):
+    monkeypatch.setattr(interpolation, "cv2", None)
+    written = []
+    interpolator = FrameInterpolator(written.append, multiplier=4)
+
+    for value in (0, 200):
+        interpolator.write(np.full((2, 2, 3), value, dtype=np.uint8))
+    interpolator.close()
+
+    assert [frame[0, 0, 0] for frame in written] == [0, 50, 100, 150, 200]
+
+
+def test_limit_trims_output(monkeypatch):
+    monkeypatch.setattr(interpolation, "cv2", None)
+    written = []
+    interpolator = FrameInterpolator(written.append, multiplier=2, limit=4)
+
+    for value in range(5):
+        interpolator.write(np.full((2, 2, 3), value, dtype=np.uint8))
+    interpolator.close()
+
+    assert len(written) == 4
+
+
+def test_multiplier_one_passes_frames_through():
+    written = []
+    interpolator = FrameInterpolator(written.append)
+
+    frames = [np.full((2, 2, 3), value, dtype=np.uint8) for value in range(3)]
+    for frame in frames:
+        interpolator.write(frame)
+    interpolator.close()
+
+    assert all(a is b for a, b in zip(written, frames))
@@ -0,0 +1,155 @@
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from video_service.jobs import (
+    CANCELLED, COMPLETED, FAILED, QUEUED, RUNNING, JobCancelled, JobManager, JobProgress, JobStore,
+)
+
+
+def wait_finished(manager, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.store.get(job_id)
+        if job["status"] not in (QUEUED, RUNNING):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def test_priority_order_and_queue_position(store):
+    manager = JobManager(store, runner=MagicMock(), devices=["cpu"])
+    low = manager.submit("text_to_video", {"prompt": "low"})
+    high = manager.submit("text_to_video", {"prompt": "high"}, priority=5)
+    later = manager.submit("text_to_video", {"prompt": "later"})
+
+    assert manager.status(high["id"])["queue_position"] == 1
+    assert manager.status(low["id"])["queue_position"] == 2
+    assert manager.status(later["id"])["queue_position"] == 3
+
+
+def test_cancel_queued_job(store):
+    manager = JobManager(store, runner=MagicMock(), devices=["cpu"])
+    first = manager.submit("text_to_video", {"prompt": "a"})
+    second = manager.submit("text_to_video", {"prompt": "b"})
+
+    job = manager.cancel(first["id"])
+
+    assert job["status"] == CANCELLED
+    assert manager.status(second["id"])["queue_position"] == 1
+
+
+def test_worker_runs_jobs_and_records_results(store):
+    def runner(job, device, progress):
+        progress.set_stage("stage_1", total_steps=2)
+        if job["params"]["prompt"] == "boom":
+            raise RuntimeError("out of memory")
+        return f"/results/{job['id']}.mp4"
+
+    manager = JobManager(store, runner=runner, devices=["cpu"])
+    manager.start()
+    try:
+        ok = manager.submit("text_to_video", {"prompt": "a"})
+        bad = manager.submit("text_to_video", {"prompt": "boom"})
+        ok_job, bad_job = wait_finished(manager, ok["id"]), wait_finished(manager, bad["id"])
+    finally:
+        manager.stop()
+
+    assert ok_job["status"] == COMPLETED
+    assert ok_job["progress"] == 100.0
+    assert ok_job["result_path"].endswith(".mp4")
+    assert bad_job["status"] == FAILED
+    assert "out of memory" in bad_job["error"]
+
+
+def test_unfinished_jobs_survive_restart(store, tmp_path):
+    manager = JobManager(store, runner=MagicMock(), devices=["cpu"])
+    job = manager.submit("text_to_video", {"prompt": "a"})
+    store.update(job["id"], status=RUNNING, device="cpu")
+
+    restarted = JobManager(JobStore(str(tmp_path / "jobs.db")), runner=lambda job, device, progress: "out.mp4",
+                           devices=["cpu"])
+    restarted.start()
+    try:
+        assert wait_finished(restarted, job["id"])["status"] == COMPLETED
+    finally:
+        restarted.stop()
+
+
+def test_progress_tracks_stages_and_cancellation(store):
+    job_id = "job"
+    store.insert({"id": job_id, "kind": "text_to_video", "status": RUNNING, "priority": 0, "params": {}})
+    cancel_event = threading.Event()
+    progress = JobProgress(store, job_id, cancel_event)
+    pipe = MagicMock(spec=[])
+
+    progress.set_stage("stage_1", total_steps=4)
+    progress.on_step_end(pipe, 1, None, {})
+    assert store.get(job_id)["stage_progress"] == 50.0
+    assert store.get(job_id)["progress"] == 37.5
+
+    # The step index starting over marks the second denoising stage
+    progress.on_step_end(pipe, 3, None, {})
+    progress.on_step_end(pipe, 0, None, {})
+    assert store.get(job_id)["stage"] == "stage_2"
+
+    cancel_event.set()
+    with pytest.raises(JobCancelled):
+        progress.on_step_end(pipe, 1, None, {})
+
+
+def test_single_step_stage_1_still_switches_to_stage_2(store):
+    store.insert({"id": "job", "kind": "text_to_video", "status": RUNNING, "priority": 0, "params": {}})
+    progress = JobProgress(store, "job", threading.Event())
+    pipe = MagicMock(spec=[])
+
+    progress.set_stage("stage_1", total_steps=1)
+    progress.on_step_end(pipe, 0, None, {})
+    assert progress.stage == "stage_1"
+
+    # The step index does not go down, but stage 1 had only one step
+    progress.on_step_end(pipe, 0, None, {})
+    assert progress.stage == "stage_2"
+
+
+def test_running_job_waits_for_stage_2_decision(store):
+    def runner(job, device, progress):
+        progress.publish(preview_path="/results/preview.mp4")
+        action = progress.await_decision(timeout=5.0, default="proceed")
+        return f"/results/{action}.mp4"
+
+    manager = JobManager(store, runner=runner, devices=["cpu"])
+    manager.start()
+    try:
+        job = manager.submit("text_to_video", {"prompt": "a"})
+        deadline = time.time() + 5.0
+        while not (store.get(job["id"])["metadata"] or {}).get("awaiting_decision"):
+            assert time.time() < deadline
+            time.sleep(0.01)
+        assert manager.decide(job["id"], "skip")
+        finished = wait_finished(manager, job["id"])
+    finally:
+        manager.stop()
+
+    assert finished["result_path"] == "/results/skip.mp4"
+    assert finished["metadata"]["preview_path"] == "/results/preview.mp4"
+    assert finished["metadata"]["awaiting_decision"] is False
+
+
+def test_decision_times_out_to_default(store):
+    store.insert({"id": "job", "kind": "text_to_video", "status": RUNNING, "priority": 0, "params": {}})
+    progress = JobProgress(store, "job", threading.Event())
+
+    assert progress.await_decision(timeout=0.05, default="skip") == "skip"
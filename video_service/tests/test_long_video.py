@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from video_service.long_video import SlidingWindowAssembler, crossfade, plan_windows
+
+
+def test_short_clip_is_one_window():
+    assert plan_windows(121, 121, 17) == [0]
+
+
+def test_windows_overlap_and_cover_the_clip():
+    starts = plan_windows(481, 121, 17)
+
+    assert starts[1] - starts[0] == 104
+    assert starts[-1] + 121 >= 481
+    assert starts[-2] + 121 < 481
+
+
+def test_invalid_overlap():
+    with pytest.raises(ValueError):
+        plan_windows(481, 121, 121)
+
+
+def test_crossfade_moves_from_tail_to_head():
+    tail = np.zeros((3, 2, 2, 3), dtype=np.uint8)
+    head = np.full((3, 2, 2, 3), 200, dtype=np.uint8)
+
+    blended = crossfade(tail, head)
+
+    assert blended[0, 0, 0, 0] == 50
+    assert blended[1, 0, 0, 0] == 100
+    assert blended[2, 0, 0, 0] == 150
+
+
+def test_assembler_streams_exactly_total_frames():
+    total, window, overlap = 40, 16, 4
+    written = []
+    assembler = SlidingWindowAssembler(written.append, total, overlap)
+    starts = plan_windows(total, window, overlap)
+
+    for index, start in enumerate(starts):
+        frames = np.full((window, 2, 2, 3), index * 10, dtype=np.uint8)
+        if index > 0:
+            assert assembler.conditioning_frame().shape == (2, 2, 3)
+        assembler.add(frames, last=index == len(starts) - 1)
+        # Only the overlap is held back between windows
+        assert len(written) == min(total, start + window) - (0 if index == len(starts) - 1 else overlap)
+
+    assert len(written) == total
@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 from unittest.mock import MagicMock, patch
 import pytest
 from fastapi.testclient import TestClient
@@ -7,14 +8,16 @@ from fastapi.testclient import TestClient
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
+# Keep the job database and job files out of the source tree: the job store is
+# created when main is imported
+os.environ.setdefault("VIDEO_JOBS_DIR", tempfile.mkdtemp(prefix="video-jobs-"))
+
 # Mock ltx_pipelines before importing main
 sys.modules["ltx_pipelines"] = MagicMock()
 from ltx_pipelines import TI2VidTwoStagesPipeline
 
 from video_service.main import app
 
-client = TestClient(app)
-
 @pytest.fixture
 def mock_pipeline():
     with patch("video_service.main.TI2VidTwoStagesPipeline") as mock:
@@ -33,30 +36,43 @@ def mock_pipeline():
         yield pipeline_instance
 
 @pytest.fixture
-def mock_export():
-    with patch("diffusers.utils.export_to_video") as mock:
-        mock.return_value = "dummy.mp4" # return generated path
+def mock_encoder():
+    # The encoder writes into the job's result file; stand in a few fixed bytes
+    def fake_writer(sink, fps, **kwargs):
+        sink.write(b"fake video data")
+        return MagicMock()
+
+    with patch("video_service.main.FragmentedMP4Writer", side_effect=fake_writer) as mock:
         yield mock
 
-def test_generate_video(mock_pipeline, mock_export):
-    with patch("builtins.open", new_callable=MagicMock) as mock_open:
-        file_handle = MagicMock()
-        file_handle.read.return_value = b"fake video data"
-        mock_open.return_value.__enter__.return_value = file_handle
-        
-        with patch("os.remove"):
-            response = client.post("/generate", json={
-                "prompt": "Test video",
-                "width": 128,
-                "height": 128,
-                "num_frames": 16
-            })
-            
+def test_generate_video(mock_pipeline, mock_encoder):
+    with TestClient(app) as client:
+        response = client.post("/generate", json={
+            "prompt": "Test video",
+            "width": 256,
+            "height": 256,
+            "num_frames": 17
+        })
+
     assert response.status_code == 200
     data = response.json()
     assert "video" in data
 
-def test_image_to_video(mock_pipeline, mock_export):
+def test_generate_video_binary_with_range(mock_pipeline, mock_encoder):
+    with TestClient(app) as client:
+        response = client.post("/generate", json={"prompt": "Test video", "response_format": "binary"})
+        assert response.status_code == 200
+        assert response.content == b"fake video data"
+        assert response.headers["accept-ranges"] == "bytes"
+
+        job_id = response.headers["x-job-id"]
+        partial = client.get(f"/jobs/{job_id}/result", headers={"Range": "bytes=5-9"})
+
+    assert partial.status_code == 206
+    assert partial.content == b"video"
+    assert partial.headers["content-range"] == "bytes 5-9/15"
+
+def test_image_to_video(mock_pipeline, mock_encoder):
     from io import BytesIO
     from PIL import Image
     
@@ -65,22 +81,27 @@ def test_image_to_video(mock_pipeline, mock_export):
     img.save(img_byte_arr, format='PNG')
     img_byte_arr.seek(0)
     
-    with patch("builtins.open", new_callable=MagicMock) as mock_open:
-        file_handle = MagicMock()
-        file_handle.read.return_value = b"fake video data"
-        mock_open.return_value.__enter__.return_value = file_handle
-        
-        with patch("os.remove"):
-            response = client.post(
-                "/image-to-video",
-                data={
-                    "prompt": "Test image to video",
-                },
-                files={
-                    "file": ("test.png", img_byte_arr, "image/png")
-                }
-            )
+    with TestClient(app) as client:
+        response = client.post(
+            "/image-to-video",
+            data={
+                "prompt": "Test image to video",
+            },
+            files={
+                "file": ("test.png", img_byte_arr, "image/png")
+            }
+        )
 
     assert response.status_code == 200
     data = response.json()
     assert "video" in data
+
+def test_stage_1_preview_needs_two_steps(mock_pipeline, mock_encoder):
+    with TestClient(app) as client:
+        response = client.post("/jobs", json={
+            "prompt": "Test video",
+            "num_inference_steps": 1,
+            "stage_1_preview": "confirm",
+        })
+
+    assert response.status_code == 400
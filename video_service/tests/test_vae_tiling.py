@@ -0,0 +1,51 @@
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from video_service import vae_tiling
+from video_service.vae_tiling import should_tile, vae_tiling_for
+
+
+class FakeVAE:
+    def __init__(self):
+        self.calls = []
+
+    def enable_tiling(self, **kwargs):
+        self.calls.append(("enable", kwargs))
+
+    def disable_tiling(self):
+        self.calls.append(("disable", None))
+
+
+class FakePipe:
+    def __init__(self):
+        self.vae = FakeVAE()
+
+
+def test_explicit_modes_ignore_memory():
+    assert should_tile("on", "cpu", 768, 512, 121, 256, 0)
+    assert not should_tile("off", "cuda:0", 1920, 1088, 1441, 256, 0)
+
+
+def test_auto_tiles_when_decode_does_not_fit(monkeypatch):
+    monkeypatch.setattr(vae_tiling, "free_device_bytes", lambda device: 20 * 1024 ** 3)
+
+    assert not should_tile("auto", "cuda:0", 768, 512, 121, 256, 2 * 1024 ** 3)
+    assert should_tile("auto", "cuda:0", 1920, 1088, 121, 256, 2 * 1024 ** 3)
+    assert not should_tile("auto", "cpu", 1920, 1088, 121, 256, 2 * 1024 ** 3)
+
+
+def test_tiling_is_enabled_for_the_block_only():
+    pipe = FakePipe()
+
+    with vae_tiling_for(pipe, True, 512, 448, 16, 8) as tiled:
+        assert tiled
+        assert pipe.vae.calls[0][0] == "enable"
+        assert pipe.vae.calls[0][1]["tile_sample_stride_num_frames"] == 8
+    assert pipe.vae.calls[-1][0] == "disable"
+
+    with vae_tiling_for(pipe, False, 512, 448, 16, 8) as tiled:
+        assert not tiled
+    assert len(pipe.vae.calls) == 2
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+
+import torch
+
+VAE_TILING_MODES = ("auto", "on", "off")
+
+
+def estimate_decode_bytes(width: int, height: int, num_frames: int, bytes_per_pixel: int) -> int:
+    """Rough peak activation memory of a single-pass decode: linear in output pixels x frames."""
+    return width * height * num_frames * bytes_per_pixel
+
+
+def free_device_bytes(device: str) -> int:
+    if not device.startswith("cuda") or not torch.cuda.is_available():
+        return 0
+    free, _ = torch.cuda.mem_get_info(torch.device(device))
+    return free
+
+
+def should_tile(mode: str, device: str, width: int, height: int, num_frames: int, bytes_per_pixel: int,
+                headroom_bytes: int) -> bool:
+    if mode != "auto":
+        return mode == "on"
+    if not device.startswith("cuda"):
+        return False
+    needed = estimate_decode_bytes(width, height, num_frames, bytes_per_pixel)
+    return needed + headroom_bytes > free_device_bytes(device)
+
+
+@contextmanager
+def vae_tiling_for(pipe, enabled: bool, tile_size: int, tile_stride: int, tile_frames: int, tile_frame_stride: int):
+    """
+    Decode with spatially and temporally tiled VAE passes for one pipeline call.
+
+    The LTX video VAE then decodes overlapping `tile_size` x `tile_size` tiles of
+    `tile_frames` frames, stepping `tile_stride` pixels and `tile_frame_stride`
+    frames, and blends the overlaps linearly, so peak memory is bounded by one
+    tile instead of the whole clip. Yields whether tiling was enabled.
+    """
+    vae = getattr(pipe, "vae", None)
+    enabled = enabled and vae is not None and hasattr(vae, "enable_tiling")
+    if enabled:
+        vae.enable_tiling(
+            tile_sample_min_height=tile_size,
+            tile_sample_min_width=tile_size,
+            tile_sample_min_num_frames=tile_frames,
+            tile_sample_stride_height=tile_stride,
+            tile_sample_stride_width=tile_stride,
+            tile_sample_stride_num_frames=tile_frame_stride,
+        )
+    try:
+        yield enabled
+    finally:
+        if enabled:
+            vae.disable_tiling()
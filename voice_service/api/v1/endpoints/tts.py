@@ -1,50 +1,156 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
-import shutil
-import os
-import uuid
-import io
+import logging
 
+from voice_service.core.config import settings
+from voice_service.core.model import model_manager
 from voice_service.services.audio_service import audio_service
+from voice_service.services.reference_audio import ReferenceAudioError, decode_reference
+from voice_service.services.voice_cache import is_voice_id, voice_key
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
+
+async def stream_response(audio_stream):
+    """
+    Wrap a streaming WAV generator in a StreamingResponse. The first sentence is
+    synthesized before the response starts so that failures still return a 500.
+    """
+    # Empty text streams nothing
+    first = await run_in_threadpool(next, audio_stream, b"")
+
+    def body():
+        try:
+            yield first
+            yield from audio_stream
+        except Exception as e:
+            # Headers are already sent: the stream just ends early
+            logger.error(f"Streaming synthesis failed: {e}")
+
+    return StreamingResponse(body(), media_type="audio/wav")
+
+
+# ------------------------
+# Model pool
+# ------------------------
+@router.get("/models")
+async def models():
+    """Resident models, memory use, and load/eviction counters."""
+    return model_manager.stats()
+
 # ------------------------
 # Voice Clone
 # ------------------------
-@router.post("/clone")
-async def voice_clone(
-    text: str = Form(...),
+async def read_reference(ref_audio: UploadFile) -> bytes:
+    """Read a reference clip upload, rejecting it with 413 above REF_MAX_UPLOAD_BYTES."""
+    max_bytes = settings.REF_MAX_UPLOAD_BYTES
+    contents = await ref_audio.read(max_bytes + 1)
+    if len(contents) > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Reference audio exceeds the {max_bytes // (1024 * 1024)} MB limit.",
+        )
+    return contents
+
+
+async def resolve_voice(ref_audio: UploadFile, ref_text: str):
+    """
+    Return (voice_id, clone prompt) for a reference upload. The prompt is looked
+    up by content hash first, so the reference is only decoded on a cache miss,
+    and then entirely in memory.
+    """
+    contents = await read_reference(ref_audio)
+    voice_id = voice_key(contents, ref_text, settings.MODEL_BASE)
+    # A disk-tier hit unpickles the prompt: keep it off the event loop
+    prompt = await run_in_threadpool(audio_service.cached_voice, voice_id)
+    if prompt is not None:
+        return voice_id, prompt
+
+    try:
+        # Decoding and resampling are CPU-bound
+        reference = await run_in_threadpool(
+            decode_reference,
+            contents, settings.REF_SAMPLE_RATE, settings.REF_MAX_SECONDS, settings.REF_MAX_DECODE_SECONDS
+        )
+    except ReferenceAudioError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return voice_id, await run_in_threadpool(audio_service.create_voice, voice_id, reference, ref_text)
+
+
+@router.post("/voices")
+async def register_voice(
     ref_text: str = Form(...),
-    language: str = Form("English"),
     ref_audio: UploadFile = File(...)
 ):
-    temp_filename = f"temp_{uuid.uuid4()}.wav"
-
+    """Extract a voice once; pass the returned voice_id to /clone instead of the reference."""
     try:
-        with open(temp_filename, "wb") as buffer:
-            shutil.copyfileobj(ref_audio.file, buffer)
+        voice_id, _ = await resolve_voice(ref_audio, ref_text)
+        return {"voice_id": voice_id}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        audio_buffer = audio_service.generate_clone(
-            text=text,
-            ref_audio_path=temp_filename,
-            ref_text=ref_text,
-            language=language
-        )
 
-        return Response(
-            content=audio_buffer.read(),
-            media_type="audio/wav"
-        )
+@router.get("/voices")
+async def voice_cache_stats():
+    return audio_service.voice_cache.stats()
+
+
+@router.get("/batching")
+async def batching_stats():
+    """Per-model batch sizes, throughput and latency percentiles over recent requests."""
+    return audio_service.batching_stats()
 
+
+@router.post("/clone")
+async def voice_clone(
+    text: str = Form(...),
+    ref_text: Optional[str] = Form(None),
+    language: str = Form("English"),
+    ref_audio: Optional[UploadFile] = File(None),
+    # A voice registered through /voices, instead of ref_audio and ref_text
+    voice_id: Optional[str] = Form(None),
+    # Stream the WAV sentence by sentence instead of returning it when complete
+    stream: bool = Form(False)
+):
+    if voice_id:
+        if not is_voice_id(voice_id):
+            raise HTTPException(status_code=400, detail="voice_id must be a 32-character hex id from /voices.")
+        prompt = await run_in_threadpool(audio_service.cached_voice, voice_id)
+        if prompt is None:
+            raise HTTPException(status_code=404, detail=f"Unknown voice_id {voice_id}; register the voice again.")
+    elif ref_audio is None or not ref_text:
+        raise HTTPException(status_code=400, detail="Provide either voice_id or ref_audio and ref_text.")
+
+    try:
+        if not voice_id:
+            voice_id, prompt = await resolve_voice(ref_audio, ref_text)
+
+        if stream:
+            response = await stream_response(audio_service.stream_clone(text, prompt, language))
+        else:
+            audio_buffer = await run_in_threadpool(
+                audio_service.generate_clone,
+                text=text,
+                voice_prompt=prompt,
+                language=language
+            )
+            response = Response(
+                content=audio_buffer.read(),
+                media_type="audio/wav"
+            )
+        response.headers["X-Voice-Id"] = voice_id
+        return response
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    finally:
-        if os.path.exists(temp_filename):
-            os.remove(temp_filename)
-
 
 # ------------------------
 # Voice Design
@@ -53,10 +159,15 @@ async def voice_clone(
 async def voice_design(
     text: str = Form(...),
     instruct: str = Form(...),
-    language: str = Form("English")
+    language: str = Form("English"),
+    stream: bool = Form(False)
 ):
     try:
-        audio_buffer = audio_service.generate_design(
+        if stream:
+            return await stream_response(audio_service.stream_design(text, instruct, language))
+
+        audio_buffer = await run_in_threadpool(
+            audio_service.generate_design,
             text=text,
             instruct=instruct,
             language=language
@@ -79,10 +190,15 @@ async def custom_voice(
     text: str = Form(...),
     speaker: str = Form(...),
     language: str = Form("English"),
-    instruct: Optional[str] = Form(None)
+    instruct: Optional[str] = Form(None),
+    stream: bool = Form(False)
 ):
     try:
-        audio_buffer = audio_service.generate_custom(
+        if stream:
+            return await stream_response(audio_service.stream_custom(text, speaker, language, instruct))
+
+        audio_buffer = await run_in_threadpool(
+            audio_service.generate_custom,
             text=text,
             speaker=speaker,
             language=language,
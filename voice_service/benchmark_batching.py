@@ -0,0 +1,69 @@
+"""
+Measure TTS throughput and latency under concurrency against a running service.
+
+Sends `--requests` /tts/custom requests from `--concurrency` client threads and
+reports requests per second and p50/p95 latency, then the server's batching
+statistics. Run it once with VOICE_BATCH_MAX_SIZE=1 and once with the default to
+compare unbatched and batched synthesis.
+
+Usage (with the service running):
+    python benchmark_batching.py --url http://localhost:5003 --concurrency 1,4,8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+API_PREFIX = "/api/v1"
+TEXTS = [
+    "Hello, how can I help you today?",
+    "The weather is lovely this afternoon.",
+    "Please hold while I transfer your call.",
+    "Your order has shipped and will arrive on Tuesday.",
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def synthesize(url, index, speaker):
+    start = time.perf_counter()
+    resp = requests.post(
+        f"{url}{API_PREFIX}/tts/custom",
+        data={"text": TEXTS[index % len(TEXTS)], "speaker": speaker, "language": "English"},
+    )
+    resp.raise_for_status()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5003")
+    parser.add_argument("--concurrency", default="1,4,8")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--speaker", default="Vivian")
+    args = parser.parse_args()
+
+    # Warm-up: load the model before timing
+    synthesize(args.url, 0, args.speaker)
+
+    print(f"{'clients':>7} {'req/s':>7} {'p50 (s)':>8} {'p95 (s)':>8}")
+    for concurrency in [int(value) for value in args.concurrency.split(",")]:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(lambda i: synthesize(args.url, i, args.speaker), range(args.requests)))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{concurrency:>7} {args.requests / elapsed:>7.2f} "
+            f"{percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f}"
+        )
+
+    print("\nServer batching stats:")
+    print(requests.get(f"{args.url}{API_PREFIX}/tts/batching").json())
+
+
+if __name__ == "__main__":
+    main()
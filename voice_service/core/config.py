@@ -1,5 +1,13 @@
+import os
 import torch
 
+
+def _model_list(value: str, aliases: dict) -> list:
+    """Comma-separated model IDs, where "base", "custom" and "design" name the configured models."""
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    return [aliases.get(name.lower(), name) for name in names]
+
+
 class Settings:
     PROJECT_NAME: str = "Qwen3-TTS Microservice"
     API_V1_STR: str = "/api/v1"
@@ -9,10 +17,40 @@ class Settings:
     MODEL_BASE: str = "Qwen/Qwen3-TTS-12Hz-1.7B-Base"
     MODEL_CUSTOM: str = "Qwen/Qwen3-TTS-12Hz-1.7B-CustomVoice"
     MODEL_DESIGN: str = "Qwen/Qwen3-TTS-12Hz-1.7B-VoiceDesign"
-    
+    MODEL_ALIASES = {"base": MODEL_BASE, "custom": MODEL_CUSTOM, "design": MODEL_DESIGN}
+
+    # Model pool: models stay resident while they fit in the budget (default: device
+    # memory minus the headroom), least recently used unpinned models are evicted first
+    MODEL_MEMORY_BUDGET_BYTES: int = int(float(os.environ.get("VOICE_MODEL_MEMORY_BUDGET_GB", 0)) * 1024 ** 3)
+    MODEL_HEADROOM_BYTES: int = int(float(os.environ.get("VOICE_MODEL_HEADROOM_GB", 4)) * 1024 ** 3)
+    PRELOAD_MODELS = _model_list(os.environ.get("VOICE_PRELOAD_MODELS", ""), MODEL_ALIASES)
+    PINNED_MODELS = _model_list(os.environ.get("VOICE_PINNED_MODELS", ""), MODEL_ALIASES)
+
+    # Streaming synthesis: text is split into sentences, short ones merged up to
+    # STREAM_MIN_CHARS and long ones cut at clause breaks to STREAM_MAX_CHARS
+    STREAM_MIN_CHARS: int = int(os.environ.get("VOICE_STREAM_MIN_CHARS", 20))
+    STREAM_MAX_CHARS: int = int(os.environ.get("VOICE_STREAM_MAX_CHARS", 300))
+
+    # Voice-clone prompt cache: the VOICE_CACHE_SIZE most recently used prompts stay
+    # in memory; with VOICE_CACHE_DIR set, all are also kept on disk
+    VOICE_CACHE_SIZE: int = int(os.environ.get("VOICE_CACHE_SIZE", 64))
+    VOICE_CACHE_DIR: str = os.environ.get("VOICE_CACHE_DIR", "")
+
+    # Clone reference uploads: rejected above REF_MAX_UPLOAD_BYTES, decoded in memory
+    # (at most REF_MAX_DECODE_SECONDS), edge silence trimmed, capped to
+    # REF_MAX_SECONDS and resampled to REF_SAMPLE_RATE
+    REF_MAX_UPLOAD_BYTES: int = int(float(os.environ.get("VOICE_REF_MAX_UPLOAD_MB", 20)) * 1024 * 1024)
+    REF_MAX_DECODE_SECONDS: float = float(os.environ.get("VOICE_REF_MAX_DECODE_SECONDS", 60))
+    REF_MAX_SECONDS: float = float(os.environ.get("VOICE_REF_MAX_SECONDS", 20))
+    REF_SAMPLE_RATE: int = int(os.environ.get("VOICE_REF_SAMPLE_RATE", 24000))
+
+    # Micro-batching: concurrent requests for the same model arriving within
+    # BATCH_WINDOW_SECONDS of each other run as one generate call of up to
+    # BATCH_MAX_SIZE texts (1 disables batching)
+    BATCH_MAX_SIZE: int = int(os.environ.get("VOICE_BATCH_MAX_SIZE", 8))
+    BATCH_WINDOW_SECONDS: float = float(os.environ.get("VOICE_BATCH_WINDOW_MS", 20)) / 1000
+
     # Server settings
-    import os
     PORT: int = int(os.environ.get("VOICE_SERVICE_PORT", 5003))
 
 settings = Settings()
-
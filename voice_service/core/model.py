@@ -1,6 +1,11 @@
+import os
+import time
+import threading
 import torch
 import logging
 import gc
+from collections import OrderedDict
+from concurrent.futures import Future
 from typing import Optional, Any
 from voice_service.core.config import settings
 
@@ -14,60 +19,183 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+
+def model_bytes(model: Any) -> int:
+    """Parameter and buffer bytes of a loaded model (Qwen3TTSModel wraps the torch module)."""
+    module = model if isinstance(model, torch.nn.Module) else getattr(model, "model", None)
+    if not isinstance(module, torch.nn.Module):
+        return 0
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def default_memory_budget() -> Optional[int]:
+    """Device (or host) memory minus headroom for activations; None if unknown."""
+    if settings.DEVICE == "cuda":
+        total = torch.cuda.get_device_properties(0).total_memory
+    else:
+        try:
+            total = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (ValueError, OSError, AttributeError):
+            return None
+    return max(0, total - settings.MODEL_HEADROOM_BYTES)
+
+
 class ModelManager:
+    """
+    Pool of resident Qwen3-TTS models.
+
+    Models are loaded on first use (or preloaded at startup) and kept resident
+    while their combined size fits in the memory budget. Loading a model that does
+    not fit evicts the least recently used unpinned models first; pinned models are
+    never evicted. A model evicted while a request is still using it is freed once
+    that request finishes. Loads run outside the pool lock: requests for resident
+    models are served meanwhile, and concurrent requests for the model being
+    loaded wait for that one load.
+    """
     _instance = None
-    model: Any = None
-    current_model_name: Optional[str] = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ModelManager, cls).__new__(cls)
+            cls._instance._init_pool()
         return cls._instance
 
+    def _init_pool(self):
+        # Most recently used last
+        self.models: "OrderedDict[str, Any]" = OrderedDict()
+        self.sizes = {}
+        self.pinned = set(settings.PINNED_MODELS)
+        self.memory_budget = settings.MODEL_MEMORY_BUDGET_BYTES or default_memory_budget()
+        self._lock = threading.RLock()
+        # model name -> Future of an in-flight load
+        self._loading = {}
+        self.loads = 0
+        self.evictions = 0
+        self.hits = 0
+        self.load_seconds = 0.0
+
+    def resident_bytes(self) -> int:
+        return sum(self.sizes.values())
+
+    def _estimated_bytes(self) -> int:
+        # All three variants are 1.7B models; size a new one like the largest seen so far
+        return max(self.sizes.values(), default=0)
+
+    def _evict_for(self, needed: int, keep: Optional[str] = None):
+        if self.memory_budget is None:
+            return
+        for name in list(self.models):
+            if self.resident_bytes() + needed <= self.memory_budget:
+                return
+            if name not in self.pinned and name != keep:
+                self._evict(name)
+
+    def _evict(self, name: str):
+        model = self.models.pop(name)
+        size = self.sizes.pop(name, 0)
+        del model
+        gc.collect()
+        if settings.DEVICE == "cuda":
+            torch.cuda.empty_cache()
+        self.evictions += 1
+        logger.info(f"Evicted model {name} ({size / 2 ** 30:.2f} GiB)")
+
     def load_model(self, model_name: str = settings.MODEL_BASE):
-        if self.model is not None and self.current_model_name == model_name:
-             return self.model
-
-        if Qwen3TTSModel is None:
-            raise ImportError("qwen_tts package is missing.")
-
-        logger.info(f"Switching model from {self.current_model_name} to {model_name}")
-        
-        # Unload previous model
-        if self.model is not None:
-            del self.model
-            self.model = None
-            if settings.DEVICE == "cuda":
-                torch.cuda.empty_cache()
-            gc.collect()
+        with self._lock:
+            if model_name in self.models:
+                self.models.move_to_end(model_name)
+                self.hits += 1
+                return self.models[model_name]
+
+            pending = self._loading.get(model_name)
+            if pending is None:
+                if Qwen3TTSModel is None:
+                    raise ImportError("qwen_tts package is missing.")
+                pending = self._loading[model_name] = Future()
+                # Room for every model currently loading, this one included
+                self._evict_for(self._estimated_bytes() * len(self._loading))
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            # Another request is loading this model; wait for it outside the lock
+            return pending.result()
 
+        # from_pretrained runs outside the lock so requests for resident models
+        # are not held up by a load
         logger.info(f"Loading Qwen3-TTS model: {model_name} on {settings.DEVICE}")
-        
+        start = time.perf_counter()
+
         try:
             # Determine dtype and attention based on device and availability
             dtype = torch.float16 if settings.DEVICE == "cuda" else torch.float32
-            
+
             model_kwargs = {
-    "attn_implementation": "eager"
-}
+                "attn_implementation": "eager"
+            }
 
-            
             # Simple check for FA2 availability (simplified)
             # if settings.DEVICE == "cuda":
             #      kwargs["attn_implementation"] = "flash_attention_2"
 
-            self.model = Qwen3TTSModel.from_pretrained(
+            model = Qwen3TTSModel.from_pretrained(
                 model_name,
                 **model_kwargs
             )
-            self.current_model_name = model_name
-            logger.info("Model loaded successfully.")
-            return self.model
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
+            with self._lock:
+                del self._loading[model_name]
+            pending.set_exception(e)
             raise e
 
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.models[model_name] = model
+            self.sizes[model_name] = model_bytes(model)
+            del self._loading[model_name]
+            self.loads += 1
+            self.load_seconds += elapsed
+            logger.info(f"Model loaded successfully in {elapsed:.2f}s.")
+
+            # The estimate may have been low (first load): trim the others now
+            self._evict_for(0, keep=model_name)
+        pending.set_result(model)
+        return model
+
     def get_model(self, model_name: str = settings.MODEL_BASE):
         return self.load_model(model_name)
 
+    def preload(self, model_names):
+        for model_name in model_names:
+            try:
+                self.load_model(model_name)
+            except Exception as e:
+                logger.error(f"Failed to preload {model_name}: {e}")
+
+    def pin(self, model_name: str):
+        with self._lock:
+            self.pinned.add(model_name)
+
+    def unpin(self, model_name: str):
+        with self._lock:
+            self.pinned.discard(model_name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resident": [
+                    {"model": name, "gb": round(self.sizes.get(name, 0) / 2 ** 30, 2), "pinned": name in self.pinned}
+                    for name in reversed(self.models)
+                ],
+                "resident_gb": round(self.resident_bytes() / 2 ** 30, 2),
+                "memory_budget_gb": None if self.memory_budget is None else round(self.memory_budget / 2 ** 30, 2),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "hits": self.hits,
+                "load_seconds_total": round(self.load_seconds, 3),
+            }
+
 model_manager = ModelManager()
@@ -1,9 +1,17 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from voice_service.api.v1.router import api_router
 from voice_service.core.config import settings
+from voice_service.core.model import model_manager
 
-app = FastAPI(title=settings.PROJECT_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pinned models are never evicted, so they are loaded up front as well
+    model_manager.preload(list(dict.fromkeys(settings.PINNED_MODELS + settings.PRELOAD_MODELS)))
+    yield
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
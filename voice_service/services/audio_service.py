@@ -3,67 +3,152 @@ import io
 import torch
 import numpy as np
 import logging
+import threading
 from voice_service.core.model import model_manager
 from voice_service.core.config import settings
+from voice_service.services.batching import MicroBatcher
+from voice_service.services.streaming import split_sentences, stream_wav
+from voice_service.services.voice_cache import VoicePromptCache
 
 logger = logging.getLogger(__name__)
 
+
+def to_wav_buffer(wav, sr) -> io.BytesIO:
+    buffer = io.BytesIO()
+    sf.write(buffer, wav, sr, format='WAV')
+    buffer.seek(0)
+    return buffer
+
+
+def sentence_chunks(text: str):
+    return split_sentences(text, settings.STREAM_MIN_CHARS, settings.STREAM_MAX_CHARS)
+
+
+# Batched generate calls: each takes the requests gathered by a MicroBatcher and
+# returns one (wav, sr) per request, in order. The Qwen3-TTS generate methods take
+# lists for every per-utterance argument.
+
+def _column(requests, key):
+    return [request[key] for request in requests]
+
+
+def clone_batch(requests):
+    model = model_manager.get_model(settings.MODEL_BASE)
+    # Each cached prompt is a list of prompt items for one reference
+    prompts = []
+    for request in requests:
+        prompt = request["voice_prompt"]
+        prompts.extend(prompt if isinstance(prompt, list) else [prompt])
+    wavs, sr = model.generate_voice_clone(
+        text=_column(requests, "text"),
+        language=_column(requests, "language"),
+        voice_clone_prompt=prompts
+    )
+    return [(wav, sr) for wav in wavs]
+
+
+def design_batch(requests):
+    model = model_manager.get_model(settings.MODEL_DESIGN)
+    if not hasattr(model, 'generate_voice_design'):
+        raise ValueError("Loaded model does not support generate_voice_design")
+    wavs, sr = model.generate_voice_design(
+        text=_column(requests, "text"),
+        language=_column(requests, "language"),
+        instruct=_column(requests, "instruct")
+    )
+    return [(wav, sr) for wav in wavs]
+
+
+def custom_batch(requests):
+    model = model_manager.get_model(settings.MODEL_CUSTOM)
+    if not hasattr(model, 'generate_custom_voice'):
+        raise ValueError("Loaded model does not support generate_custom_voice")
+    wavs, sr = model.generate_custom_voice(
+        text=_column(requests, "text"),
+        language=_column(requests, "language"),
+        speaker=_column(requests, "speaker"),
+        instruct=[request["instruct"] or "" for request in requests]
+    )
+    return [(wav, sr) for wav in wavs]
+
+
+# One batcher per model; they share the device, so only one batch runs at a time
+_generate_lock = threading.Lock()
+clone_batcher = MicroBatcher("clone", clone_batch, settings.BATCH_MAX_SIZE, settings.BATCH_WINDOW_SECONDS, _generate_lock)
+design_batcher = MicroBatcher("design", design_batch, settings.BATCH_MAX_SIZE, settings.BATCH_WINDOW_SECONDS, _generate_lock)
+custom_batcher = MicroBatcher("custom", custom_batch, settings.BATCH_MAX_SIZE, settings.BATCH_WINDOW_SECONDS, _generate_lock)
+
+
 class AudioService:
+    voice_cache = VoicePromptCache(settings.VOICE_CACHE_SIZE, settings.VOICE_CACHE_DIR, settings.DEVICE)
+
     @staticmethod
-    def generate_clone(text: str, ref_audio_path: str, ref_text: str, language: str = "English"):
-        model = model_manager.get_model(settings.MODEL_BASE)
-        
-        logger.info(f"Cloning voice. Text: {text[:20]}... RefText: {ref_text[:20]}...")
-        
-        # Qwen3-TTS generate_voice_clone
-        # ref_audio can be a path or tuple (audio, sr)
-        wavs, sr = model.generate_voice_clone(
-            text=text,
-            language=language,
-            ref_audio=ref_audio_path,
-            ref_text=ref_text
-        )
-        
-        # Return the first generated audio
-        # Convert to bytes
-        buffer = io.BytesIO()
-        sf.write(buffer, wavs[0], sr, format='WAV')
-        buffer.seek(0)
-        return buffer
+    def cached_voice(voice_id: str):
+        return AudioService.voice_cache.get(voice_id)
 
     @staticmethod
-    def generate_design(text: str, instruct: str, language: str = "English"):
-        model = model_manager.get_model(settings.MODEL_DESIGN)
+    def create_voice(voice_id: str, ref_audio, ref_text: str):
+        """Extract the clone prompt (speaker embedding and reference codes) once and cache it."""
+        def create():
+            model = model_manager.get_model(settings.MODEL_BASE)
+            logger.info(f"Extracting voice {voice_id}. RefText: {ref_text[:20]}...")
+            # ref_audio is an in-memory (audio, sr) tuple
+            return model.create_voice_clone_prompt(ref_audio=ref_audio, ref_text=ref_text)
+
+        return AudioService.voice_cache.get_or_create(voice_id, create)
+
+    @staticmethod
+    def synthesize_clone(text: str, voice_prompt, language: str = "English"):
+        logger.info(f"Cloning voice. Text: {text[:20]}...")
+        return clone_batcher({"text": text, "language": language, "voice_prompt": voice_prompt})
+
+    @staticmethod
+    def synthesize_design(text: str, instruct: str, language: str = "English"):
         logger.info(f"Designing voice. Text: {text[:20]}... Instruct: {instruct[:20]}...")
-        
-        if hasattr(model, 'generate_voice_design'):
-            wavs, sr = model.generate_voice_design(
-                text=text,
-                language=language,
-                instruct=instruct
-            )
-            buffer = io.BytesIO()
-            sf.write(buffer, wavs[0], sr, format='WAV')
-            buffer.seek(0)
-            return buffer
-        else:
-             raise ValueError("Loaded model does not support generate_voice_design")
+        return design_batcher({"text": text, "language": language, "instruct": instruct})
+
+    @staticmethod
+    def synthesize_custom(text: str, speaker: str, language: str = "English", instruct: str = ""):
+        return custom_batcher({"text": text, "language": language, "speaker": speaker, "instruct": instruct})
+
+    @staticmethod
+    def batching_stats() -> dict:
+        return {batcher.name: batcher.stats() for batcher in (clone_batcher, design_batcher, custom_batcher)}
+
+    @staticmethod
+    def generate_clone(text: str, voice_prompt, language: str = "English"):
+        return to_wav_buffer(*AudioService.synthesize_clone(text, voice_prompt, language))
+
+    @staticmethod
+    def generate_design(text: str, instruct: str, language: str = "English"):
+        return to_wav_buffer(*AudioService.synthesize_design(text, instruct, language))
 
     @staticmethod
     def generate_custom(text: str, speaker: str, language: str = "English", instruct: str = ""):
-        model = model_manager.get_model(settings.MODEL_CUSTOM)
-        if hasattr(model, 'generate_custom_voice'):
-            wavs, sr = model.generate_custom_voice(
-                text=text,
-                language=language,
-                speaker=speaker,
-                instruct=instruct
-            )
-            buffer = io.BytesIO()
-            sf.write(buffer, wavs[0], sr, format='WAV')
-            buffer.seek(0)
-            return buffer
-        else:
-             raise ValueError("Loaded model does not support generate_custom_voice")
+        return to_wav_buffer(*AudioService.synthesize_custom(text, speaker, language, instruct))
+
+    # Streaming variants: the text is synthesized sentence by sentence and each
+    # sentence's audio is yielded as soon as it is ready (see streaming.stream_wav)
+
+    @staticmethod
+    def stream_clone(text: str, voice_prompt, language: str = "English"):
+        return stream_wav(
+            lambda chunk: AudioService.synthesize_clone(chunk, voice_prompt, language),
+            sentence_chunks(text),
+        )
+
+    @staticmethod
+    def stream_design(text: str, instruct: str, language: str = "English"):
+        return stream_wav(
+            lambda chunk: AudioService.synthesize_design(chunk, instruct, language),
+            sentence_chunks(text),
+        )
+
+    @staticmethod
+    def stream_custom(text: str, speaker: str, language: str = "English", instruct: str = ""):
+        return stream_wav(
+            lambda chunk: AudioService.synthesize_custom(chunk, speaker, language, instruct),
+            sentence_chunks(text),
+        )
 
 audio_service = AudioService()
@@ -0,0 +1,122 @@
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class MicroBatcher:
+    """
+    Cross-request batching for one model. Requests submitted from any thread are
+    gathered for up to `window_seconds` after the first one arrives (or until
+    `max_size` are waiting) and handed to `run_batch` as one list; the i-th result
+    goes back to the i-th caller. A failed batch is retried one request at a time,
+    so each caller gets its own result or error. `run_batch` calls are serialized
+    through `lock`, which batchers for models sharing a device should share, so a
+    new batch gathers while the previous one runs.
+    """
+
+    def __init__(self, name: str, run_batch: Callable[[List[dict]], list], max_size: int = 8,
+                 window_seconds: float = 0.02, lock: threading.Lock = None, history: int = 1000):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_size = max_size
+        self.window_seconds = window_seconds
+        self.lock = lock or threading.Lock()
+        self._queue = queue.Queue()
+        # (finish time, latency) of recent requests, for throughput and percentiles
+        self._recent = deque(maxlen=history)
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._worker, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, request: dict) -> Future:
+        future = Future()
+        self._queue.put((request, future, time.perf_counter()))
+        return future
+
+    def __call__(self, request: dict):
+        """Submit and wait: the blocking call used by the synthesis functions."""
+        return self.submit(request).result()
+
+    def _gather(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window_seconds
+        while len(batch) < self.max_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, requests):
+        with self.lock:
+            results = list(self.run_batch(requests))
+        if len(results) != len(requests):
+            # zip would leave the unmatched callers waiting forever
+            raise RuntimeError(f"{self.name} batch returned {len(results)} results for {len(requests)} requests")
+        return results
+
+    def _worker(self):
+        while True:
+            batch = self._gather()
+            try:
+                outcomes = [(True, result) for result in self._run([request for request, _, _ in batch])]
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(batch)} failed: {e}")
+                if len(batch) == 1:
+                    outcomes = [(False, e)]
+                else:
+                    # One bad request must not fail the callers batched with it
+                    outcomes = []
+                    for request, _, _ in batch:
+                        try:
+                            outcomes.append((True, self._run([request])[0]))
+                        except Exception as item_error:
+                            outcomes.append((False, item_error))
+
+            finished = time.perf_counter()
+            served = [submitted for (_, _, submitted), (ok, _) in zip(batch, outcomes) if ok]
+            if served:
+                with self._stats_lock:
+                    self.requests += len(served)
+                    self.batches += 1
+                    for submitted in served:
+                        self._recent.append((finished, finished - submitted))
+            for (_, future, _), (ok, value) in zip(batch, outcomes):
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            recent = list(self._recent)
+        latencies = [latency for _, latency in recent]
+        span = recent[-1][0] - (recent[0][0] - recent[0][1]) if recent else 0.0
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+            # Over the last `history` requests
+            "throughput_rps": round(len(recent) / span, 3) if span > 0 else 0.0,
+            "latency_p50_s": round(percentile(latencies, 0.5), 3),
+            "latency_p95_s": round(percentile(latencies, 0.95), 3),
+        }
@@ -0,0 +1,50 @@
+import io
+import numpy as np
+import soundfile as sf
+
+
+class ReferenceAudioError(ValueError):
+    """The reference upload is not decodable audio, or is empty after trimming."""
+
+
+def resample(audio: np.ndarray, sr: int, target_sr: int) -> np.ndarray:
+    """Linear-interpolation resample of a mono signal (one vectorized np.interp call)."""
+    if sr == target_sr or len(audio) == 0:
+        return audio
+    duration = len(audio) / sr
+    target_len = max(1, int(round(duration * target_sr)))
+    positions = np.arange(target_len, dtype=np.float64) * (sr / target_sr)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def trim_silence(audio: np.ndarray, threshold: float) -> np.ndarray:
+    """Drop leading and trailing samples below `threshold` (relative to the peak)."""
+    peak = np.abs(audio).max() if len(audio) else 0.0
+    if peak == 0:
+        # Empty or all-zero: nothing to keep
+        return audio[:0]
+    loud = np.flatnonzero(np.abs(audio) >= threshold * peak)
+    return audio[loud[0]:loud[-1] + 1]
+
+
+def decode_reference(contents: bytes, target_sr: int, max_seconds: float, max_decode_seconds: float,
+                     silence_threshold: float = 0.01):
+    """
+    Decode a reference clip in memory to the (audio, sr) tuple `generate_voice_clone`
+    and `create_voice_clone_prompt` accept: mono float32 at `target_sr`, edge silence
+    trimmed, at most `max_seconds` long. At most `max_decode_seconds` of the upload is
+    decoded, so a huge file costs no more than that.
+    """
+    try:
+        with sf.SoundFile(io.BytesIO(contents)) as f:
+            audio = f.read(frames=int(max_decode_seconds * f.samplerate), dtype="float32", always_2d=True)
+            sr = f.samplerate
+    except RuntimeError as e:
+        # soundfile's LibsndfileError is a RuntimeError
+        raise ReferenceAudioError(f"Reference audio could not be decoded: {e}")
+
+    audio = trim_silence(audio.mean(axis=1), silence_threshold)
+    audio = audio[:int(max_seconds * sr)]
+    if len(audio) == 0:
+        raise ReferenceAudioError("Reference audio is empty or silent.")
+    return resample(audio, sr, target_sr), target_sr
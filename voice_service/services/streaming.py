@@ -0,0 +1,97 @@
+import re
+import struct
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends: Latin and CJK terminal punctuation, or a line break
+SENTENCE_END = re.compile(r"(?<=[.!?;。！？；])\s+|(?<=[。！？；])|\n+")
+# Clause breaks where an overlong sentence may be cut
+CLAUSE_END = re.compile(r"(?<=[,:，、：])")
+
+
+def _split_long(sentence: str, max_chars: int):
+    """Cut a sentence longer than `max_chars` at clause breaks, then at spaces."""
+    pieces = []
+    current = ""
+    for part in CLAUSE_END.split(sentence):
+        if current and len(current) + len(part) > max_chars:
+            pieces.append(current.strip())
+            current = ""
+        current += part
+    if current.strip():
+        pieces.append(current.strip())
+
+    result = []
+    for piece in pieces:
+        while len(piece) > max_chars:
+            cut = piece.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            result.append(piece[:cut].strip())
+            piece = piece[cut:].strip()
+        if piece:
+            result.append(piece)
+    return result
+
+
+def split_sentences(text: str, min_chars: int = 20, max_chars: int = 300):
+    """
+    Split text into synthesis chunks: one per sentence, with sentences shorter than
+    `min_chars` merged into the next one (a lone "Hi." makes a poor utterance) and
+    sentences longer than `max_chars` cut at clause breaks.
+    """
+    chunks = []
+    pending = ""
+    for sentence in SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        pending = f"{pending} {sentence}".strip()
+        if len(pending) >= min_chars:
+            chunks.extend(_split_long(pending, max_chars) if len(pending) > max_chars else [pending])
+            pending = ""
+    if pending:
+        if chunks and len(chunks[-1]) + len(pending) < max_chars:
+            chunks[-1] = f"{chunks[-1]} {pending}"
+        else:
+            chunks.append(pending)
+    return chunks
+
+
+def wav_stream_header(sample_rate: int, channels: int = 1, bits: int = 16) -> bytes:
+    """
+    RIFF/WAVE header for 16-bit PCM of unknown length: the RIFF and data sizes are
+    set to the maximum, which players treat as "read until the stream ends".
+    """
+    byte_rate = sample_rate * channels * bits // 8
+    block_align = channels * bits // 8
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, block_align, bits)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+def to_pcm16(wav) -> bytes:
+    """Float waveform in [-1, 1] to little-endian 16-bit PCM bytes."""
+    samples = np.clip(np.asarray(wav, dtype=np.float32), -1.0, 1.0)
+    return (samples * 32767.0).astype("<i2").tobytes()
+
+
+def stream_wav(synthesize, chunks):
+    """
+    Yield a WAV stream for `chunks` of text: the header with the first chunk's audio,
+    then each further chunk's PCM as soon as `synthesize(chunk) -> (wav, sr)` returns.
+    """
+    start = time.perf_counter()
+    sample_rate = None
+    for index, chunk in enumerate(chunks):
+        wav, sr = synthesize(chunk)
+        if sample_rate is None:
+            sample_rate = sr
+            logger.info(f"Time to first audio: {time.perf_counter() - start:.2f}s ({len(chunks)} chunks)")
+            yield wav_stream_header(sr)
+        yield to_pcm16(wav)
+    logger.info(f"Streamed {len(chunks)} chunks in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,112 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+import torch
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# voice_key output; anything else must never reach the disk tier's paths
+VOICE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def is_voice_id(value: str) -> bool:
+    return isinstance(value, str) and VOICE_ID_PATTERN.fullmatch(value) is not None
+
+
+def voice_key(audio: bytes, ref_text: str, model_name: str) -> str:
+    """Content hash of a clone reference: the audio bytes, its transcript and the model."""
+    digest = hashlib.sha256()
+    for part in (model_name.encode(), ref_text.strip().encode(), audio):
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()[:32]
+
+
+class VoicePromptCache:
+    """
+    Cache of voice-clone prompts (the speaker embedding and reference codes that
+    `create_voice_clone_prompt` extracts from a reference clip), keyed by
+    `voice_key`. The memory tier keeps the `max_entries` most recently used
+    prompts; with `disk_dir` set, every prompt is also saved there and reloaded
+    on a memory miss, so registered voices survive eviction and restarts.
+    """
+
+    def __init__(self, max_entries: int = 64, disk_dir: Optional[str] = None, device: str = "cpu"):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir or None
+        self.device = device
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # Keys come from clients (voice_id); the disk tier unpickles what it finds
+        if not is_voice_id(key):
+            raise ValueError(f"Invalid voice id: {key!r}")
+        return os.path.join(self.disk_dir, f"{key}.pt")
+
+    def _remember(self, key: str, prompt: Any):
+        self._entries[key] = prompt
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        if not is_voice_id(key):
+            raise ValueError(f"Invalid voice id: {key!r}")
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            if self.disk_dir and os.path.exists(self._path(key)):
+                try:
+                    # Prompts are the model's own dataclasses, not just tensors
+                    prompt = torch.load(self._path(key), map_location=self.device, weights_only=False)
+                except Exception as e:
+                    logger.warning(f"Could not read cached voice {key}: {e}")
+                    return None
+                self._remember(key, prompt)
+                self.disk_hits += 1
+                return prompt
+            return None
+
+    def put(self, key: str, prompt: Any):
+        with self._lock:
+            self._remember(key, prompt)
+            if self.disk_dir:
+                tmp_path = self._path(key) + ".tmp"
+                torch.save(prompt, tmp_path)
+                os.replace(tmp_path, self._path(key))
+
+    def get_or_create(self, key: str, create: Callable[[], Any]) -> Any:
+        prompt = self.get(key)
+        if prompt is None:
+            with self._lock:
+                self.misses += 1
+            # Extraction runs outside the lock; a concurrent miss on the same key
+            # only repeats the work
+            prompt = create()
+            self.put(key, prompt)
+        return prompt
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_dir": self.disk_dir,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,90 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from voice_service.services.batching import MicroBatcher, percentile
+
+
+def test_concurrent_requests_share_a_batch():
+    batch_sizes = []
+
+    def run_batch(requests):
+        batch_sizes.append(len(requests))
+        return [request["text"].upper() for request in requests]
+
+    batcher = MicroBatcher("test", run_batch, max_size=8, window_seconds=0.2)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda text: batcher({"text": text}), ["a", "b", "c", "d"]))
+
+    # Each caller gets its own result back
+    assert results == ["A", "B", "C", "D"]
+    assert sum(batch_sizes) == 4 and max(batch_sizes) > 1
+    stats = batcher.stats()
+    assert stats["requests"] == 4
+    assert stats["latency_p95_s"] >= stats["latency_p50_s"]
+
+
+def test_batch_size_is_capped():
+    batch_sizes = []
+    gate = threading.Event()
+
+    def run_batch(requests):
+        gate.wait(1)
+        batch_sizes.append(len(requests))
+        return [None] * len(requests)
+
+    batcher = MicroBatcher("test", run_batch, max_size=2, window_seconds=0.2)
+    futures = [batcher.submit({}) for _ in range(5)]
+    gate.set()
+    for future in futures:
+        future.result(timeout=5)
+
+    assert max(batch_sizes) <= 2 and sum(batch_sizes) == 5
+
+
+def test_failures_reach_every_caller():
+    def run_batch(requests):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher("test", run_batch, window_seconds=0.05)
+    futures = [batcher.submit({}) for _ in range(2)]
+
+    for future in futures:
+        assert isinstance(future.exception(timeout=5), ValueError)
+
+
+def test_bad_request_does_not_fail_its_batch():
+    batch_sizes = []
+
+    def run_batch(requests):
+        batch_sizes.append(len(requests))
+        if any(request["text"] == "bad" for request in requests):
+            raise ValueError("bad text")
+        return [request["text"].upper() for request in requests]
+
+    batcher = MicroBatcher("test", run_batch, window_seconds=0.2)
+    futures = [batcher.submit({"text": text}) for text in ["a", "bad", "c"]]
+
+    assert futures[0].result(timeout=5) == "A"
+    assert isinstance(futures[1].exception(timeout=5), ValueError)
+    assert futures[2].result(timeout=5) == "C"
+    # The failed batch was retried one request at a time
+    assert batch_sizes == [3, 1, 1, 1]
+    assert batcher.stats()["requests"] == 2
+
+
+def test_missing_results_fail_instead_of_hanging():
+    batcher = MicroBatcher("test", lambda requests: requests[:-1], window_seconds=0.2)
+    futures = [batcher.submit({}) for _ in range(2)]
+
+    for future in futures:
+        assert isinstance(future.exception(timeout=5), RuntimeError)
+
+
+def test_percentile():
+    assert percentile([], 0.95) == 0.0
+    assert percentile(list(range(1, 101)), 0.95) == 96
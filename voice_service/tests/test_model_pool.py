@@ -0,0 +1,107 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from voice_service.core import model as model_module
+from voice_service.core.model import ModelManager
+
+GB = 1024 ** 3
+
+
+class FakeQwen3TTSModel:
+    loaded = []
+
+    @classmethod
+    def from_pretrained(cls, name, **kwargs):
+        cls.loaded.append(name)
+        return cls()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(model_module, "Qwen3TTSModel", FakeQwen3TTSModel)
+    monkeypatch.setattr(model_module, "model_bytes", lambda model: 4 * GB)
+    monkeypatch.setattr(ModelManager, "_instance", None)
+    FakeQwen3TTSModel.loaded = []
+    manager = ModelManager()
+    manager.memory_budget = 10 * GB
+    manager.pinned = set()
+    return manager
+
+
+def test_resident_models_are_reused(pool):
+    first = pool.get_model("base")
+    pool.get_model("design")
+
+    assert pool.get_model("base") is first
+    assert FakeQwen3TTSModel.loaded == ["base", "design"]
+    assert pool.stats()["hits"] == 1
+
+
+def test_least_recently_used_is_evicted(pool):
+    pool.get_model("base")
+    pool.get_model("design")
+    pool.get_model("base")
+    pool.get_model("custom")
+
+    assert list(pool.models) == ["base", "custom"]
+    assert pool.stats()["evictions"] == 1
+
+
+def test_pinned_models_are_never_evicted(pool):
+    pool.pin("base")
+    pool.get_model("base")
+    pool.get_model("design")
+    pool.get_model("custom")
+
+    assert "base" in pool.models
+    assert "design" not in pool.models
+
+
+def test_loading_does_not_block_resident_models(pool, monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+
+    class SlowModel(FakeQwen3TTSModel):
+        @classmethod
+        def from_pretrained(cls, name, **kwargs):
+            if name == "design":
+                started.set()
+                assert release.wait(5)
+            return super().from_pretrained(name, **kwargs)
+
+    monkeypatch.setattr(model_module, "Qwen3TTSModel", SlowModel)
+    base = pool.get_model("base")
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        loads = [executor.submit(pool.get_model, "design") for _ in range(2)]
+        assert started.wait(5)
+        # Served while design is still loading
+        assert executor.submit(pool.get_model, "base").result(timeout=1) is base
+        release.set()
+        first, second = [load.result(timeout=5) for load in loads]
+
+    # Concurrent requests for the same model share one load
+    assert first is second
+    assert FakeQwen3TTSModel.loaded == ["base", "design"]
+
+
+def test_failed_load_can_be_retried(pool, monkeypatch):
+    class BrokenModel(FakeQwen3TTSModel):
+        @classmethod
+        def from_pretrained(cls, name, **kwargs):
+            raise OSError("missing weights")
+
+    monkeypatch.setattr(model_module, "Qwen3TTSModel", BrokenModel)
+    with pytest.raises(OSError):
+        pool.get_model("base")
+
+    monkeypatch.setattr(model_module, "Qwen3TTSModel", FakeQwen3TTSModel)
+    assert pool.get_model("base") is not None
+    assert pool.stats()["loads"] == 1
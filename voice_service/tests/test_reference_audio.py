@@ -0,0 +1,45 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from voice_service.services.reference_audio import ReferenceAudioError, decode_reference, resample, trim_silence
+
+
+def wav_bytes(audio, sr):
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sr, format="WAV")
+    return buffer.getvalue()
+
+
+def test_decode_mixes_trims_caps_and_resamples():
+    sr = 16000
+    tone = 0.5 * np.sin(2 * np.pi * 220 * np.arange(30 * sr) / sr)
+    silence = np.zeros(sr)
+    stereo = np.stack([np.concatenate([silence, tone])] * 2, axis=1)
+
+    audio, out_sr = decode_reference(wav_bytes(stereo, sr), target_sr=24000, max_seconds=10, max_decode_seconds=20)
+
+    assert out_sr == 24000
+    assert audio.ndim == 1 and audio.dtype == np.float32
+    # Leading second of silence trimmed, then capped at 10 s
+    assert abs(len(audio) - 10 * 24000) <= 1
+    assert abs(audio[0]) < 0.05
+
+
+def test_undecodable_and_silent_references_are_rejected():
+    with pytest.raises(ReferenceAudioError):
+        decode_reference(b"RIFF....WAVEfmt ...data....", 24000, 10, 20)
+    with pytest.raises(ReferenceAudioError):
+        decode_reference(wav_bytes(np.zeros(16000), 16000), 24000, 10, 20)
+
+
+def test_resample_and_trim_helpers():
+    assert len(resample(np.zeros(16000, dtype=np.float32), 16000, 24000)) == 24000
+    assert list(trim_silence(np.array([0, 0, 1.0, 0.5, 0], dtype=np.float32), 0.1)) == [1.0, 0.5]
@@ -0,0 +1,42 @@
+import os
+import struct
+import sys
+
+import numpy as np
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from voice_service.services.streaming import split_sentences, stream_wav, wav_stream_header
+
+
+def test_split_merges_short_and_cuts_long_sentences():
+    chunks = split_sentences("Hi. How are you today? I am fine, thanks for asking!")
+    assert chunks == ["Hi. How are you today?", "I am fine, thanks for asking!"]
+
+    long_text = "one, two, three, " * 30
+    assert all(len(chunk) <= 60 for chunk in split_sentences(long_text, max_chars=60))
+
+
+def test_split_handles_cjk_punctuation():
+    assert split_sentences("今天天气很好，我们去公园散步吧。明天可能会下雨，记得带伞！", min_chars=5) == [
+        "今天天气很好，我们去公园散步吧。",
+        "明天可能会下雨，记得带伞！",
+    ]
+
+
+def test_stream_yields_header_then_audio_per_chunk():
+    calls = []
+
+    def synthesize(chunk):
+        calls.append(chunk)
+        return np.zeros(100, dtype=np.float32), 24000
+
+    stream = stream_wav(synthesize, ["First sentence.", "Second sentence."])
+    header = next(stream)
+
+    # Only the first sentence is synthesized before the first bytes go out
+    assert calls == ["First sentence."]
+    assert header[:4] == b"RIFF" and header == wav_stream_header(24000)
+    assert struct.unpack("<I", header[24:28])[0] == 24000
+    assert [len(part) for part in stream] == [200, 200]
@@ -0,0 +1,56 @@
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pytest
+
+from voice_service.services.voice_cache import VoicePromptCache, voice_key
+
+
+def key(name):
+    return voice_key(name.encode(), "text", "base")
+
+
+def test_key_depends_on_audio_text_and_model():
+    key = voice_key(b"audio", "hello", "base")
+
+    assert key == voice_key(b"audio", " hello ", "base")
+    assert key != voice_key(b"audio", "hello!", "base")
+    assert key != voice_key(b"other", "hello", "base")
+    assert key != voice_key(b"audio", "hello", "custom")
+
+
+def test_memory_tier_is_lru():
+    cache = VoicePromptCache(max_entries=2)
+    created = []
+
+    def create(name):
+        created.append(name)
+        return {"voice": name}
+
+    for name in ("a", "b", "a", "c", "a", "b"):
+        cache.get_or_create(key(name), lambda: create(name))
+
+    # "b" was evicted by "c" and had to be extracted again
+    assert created == ["a", "b", "c", "b"]
+    assert cache.stats()["hits"] == 2
+
+
+def test_disk_tier_survives_eviction_and_restart(tmp_path):
+    cache = VoicePromptCache(max_entries=1, disk_dir=str(tmp_path))
+    cache.put(key("a"), {"voice": "a"})
+    cache.put(key("b"), {"voice": "b"})
+
+    assert cache.get(key("a")) == {"voice": "a"}
+    assert VoicePromptCache(disk_dir=str(tmp_path)).get(key("b")) == {"voice": "b"}
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_keys_that_are_not_voice_ids_are_rejected(tmp_path):
+    cache = VoicePromptCache(disk_dir=str(tmp_path))
+
+    for bad in ("../../etc/model", "A" * 32, key("a")[:31], key("a") + "\n"):
+        with pytest.raises(ValueError):
+            cache.get(bad)